@@ -0,0 +1,291 @@
+"""
+Statistical Analysis Script for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Computes Pearson and Spearman correlations between every pair of numeric
+indicators of the merged dataset, each over the rows where both indicators
+are present (pairwise-complete, as pandas.DataFrame.corr does).
+
+Confidence intervals come from a percentile bootstrap over countries. A batch
+of resamples is drawn as one multiplicity matrix (resamples x rows, holding
+how often each row is drawn), and every correlation is evaluated for the whole
+batch at once as weighted sums over that matrix. Spearman ranks are computed
+the same way: tied and repeated rows share the mean of the ranks they span.
+Pairs with the same complete rows share their ranks, which are built for a
+slice of resamples at a time so memory stays bounded by BATCH_CELLS.
+
+Correlations can also be broken down per continent and per year. Results are
+saved as a long table (one row per group, method and pair of indicators).
+"""
+
+import os
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+from profile_engine import numeric_block
+from storage import DEFAULT_FORMAT, DEFAULT_YEARS, read_partitions
+
+METHODS = ['pearson', 'spearman']
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_SEED = 0
+BREAKDOWNS = ['continent', 'year']
+
+# Identifiers and ranks rather than indicators
+EXCLUDED_COLUMNS = ['year', 'happiness_rank']
+
+# A correlation needs at least this many complete rows; smaller groups are skipped
+MIN_PAIR_ROWS = 3
+MIN_GROUP_ROWS = 10
+
+# Resamples are drawn in batches whose multiplicity matrix has at most this many cells
+BATCH_CELLS = 2_000_000
+
+CORRELATIONS_FILENAME = 'correlations.csv'
+REPORT_FILENAME = 'correlation_report.json'
+
+def indicator_columns(df):
+    """Return the numeric indicator columns of a frame"""
+    numeric = df.select_dtypes(include=[np.number]).columns
+    return [col for col in numeric if col not in EXCLUDED_COLUMNS]
+
+def multiplicities(rows, resamples, rng):
+    """Draw bootstrap resamples as a (resamples x rows) matrix of draw counts"""
+    draws = rng.integers(0, rows, size=(resamples, rows))
+    offsets = np.arange(resamples)[:, None] * rows
+    counts = np.bincount((draws + offsets).ravel(), minlength=resamples * rows)
+    return counts.reshape(resamples, rows).astype(np.float64)
+
+def weighted_ranks(values, weights):
+    """Rank values under each row of weights; tied and repeated values share their mean rank"""
+    if not len(values):
+        return np.empty((len(weights), 0))
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    new_group = np.r_[True, sorted_values[1:] != sorted_values[:-1]]
+    group_of = np.empty(len(values), dtype=np.int64)
+    group_of[order] = np.cumsum(new_group) - 1
+
+    totals = weights[:, order]
+    if not new_group.all():
+        totals = np.add.reduceat(totals, np.flatnonzero(new_group), axis=1)
+    # Rows below a group plus the mean of the ranks it spans
+    ranks = np.cumsum(totals, axis=1)
+    ranks -= (totals - 1) / 2
+    return ranks[:, group_of]
+
+def _correlation(total, cross, x_squares, y_squares):
+    """Correlation from weighted co-moment sums, NaN for too few rows or a constant column"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.clip(cross / np.sqrt(x_squares * y_squares), -1, 1)
+    return np.where((total >= MIN_PAIR_ROWS) & (x_squares > 0) & (y_squares > 0), r, np.nan)
+
+def weighted_pearson(x, y, weights):
+    """Pearson correlation of x and y under each row of weights (resamples x rows)"""
+    # Centring on the full-sample means keeps the one-pass sums accurate
+    x = x - x.mean() if len(x) else x
+    y = y - y.mean() if len(y) else y
+    total = weights.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sum_x, sum_y = weights @ x, weights @ y
+        return _correlation(
+            total,
+            weights @ (x * y) - sum_x * sum_y / total,
+            weights @ (x * x) - sum_x * sum_x / total,
+            weights @ (y * y) - sum_y * sum_y / total
+        )
+
+def weighted_spearman(x_ranks, y_ranks, weights):
+    """Pearson correlation of per-resample ranks, whose weighted mean is (total + 1) / 2"""
+    total = weights.sum(axis=1)
+    offset = total * ((total + 1) / 2) ** 2
+    weighted_x = weights * x_ranks
+    return _correlation(
+        total,
+        np.einsum('ij,ij->i', weighted_x, y_ranks) - offset,
+        np.einsum('ij,ij->i', weighted_x, x_ranks) - offset,
+        np.einsum('ij,ij->i', weights * y_ranks, y_ranks) - offset
+    )
+
+def pair_correlation(x, y, weights, method):
+    """Correlate one pair of complete columns under each row of weights"""
+    if method == 'pearson':
+        return weighted_pearson(x, y, weights)
+    return weighted_spearman(weighted_ranks(x, weights), weighted_ranks(y, weights), weights)
+
+def complete_row_groups(valid, pairs):
+    """Group column pairs by the rows where both columns are present, in first-seen order"""
+    groups = {}
+    for i, j in pairs:
+        complete = valid[:, i] & valid[:, j]
+        groups.setdefault(complete.tobytes(), (complete, []))[1].append((i, j))
+    return list(groups.values())
+
+def grouped_spearman(block, complete, group, weights):
+    """Spearman correlations of the pairs of a row group under each row of weights
+
+    Each column is ranked, weighted and squared once for the group. Resamples
+    are taken in slices so that the ranks held at a time stay within
+    BATCH_CELLS.
+    """
+    columns = sorted({col for pair in group for col in pair})
+    step = max(1, BATCH_CELLS // max(2 * len(columns) * int(complete.sum()), 1))
+    results = {pair: [] for pair in group}
+    for start in range(0, len(weights), step):
+        part = weights[start:start + step]
+        total = part.sum(axis=1)
+        offset = total * ((total + 1) / 2) ** 2
+        ranks = {col: weighted_ranks(block[complete, col], part) for col in columns}
+        weighted = {col: part * ranks[col] for col in columns}
+        squares = {col: np.einsum('ij,ij->i', weighted[col], ranks[col]) - offset
+                   for col in columns}
+        for i, j in group:
+            cross = np.einsum('ij,ij->i', weighted[i], ranks[j]) - offset
+            results[i, j].append(_correlation(total, cross, squares[i], squares[j]))
+    return {pair: np.concatenate(parts) for pair, parts in results.items()}
+
+def correlation_matrix(df, columns=None, method='pearson'):
+    """Pairwise-complete correlation matrix of the given columns, like DataFrame.corr"""
+    columns = list(columns) if columns is not None else indicator_columns(df)
+    table = correlate(df, columns, [method], resamples=0)
+    matrix = pd.DataFrame(np.eye(len(columns)), index=columns, columns=columns)
+    for row in table.itertuples(index=False):
+        matrix.loc[row.var_x, row.var_y] = matrix.loc[row.var_y, row.var_x] = row.r
+    return matrix
+
+@traced
+def correlate(df, columns=None, methods=METHODS, resamples=DEFAULT_RESAMPLES,
+              confidence=DEFAULT_CONFIDENCE, seed=DEFAULT_SEED):
+    """Correlate every pair of indicator columns, with bootstrap confidence intervals
+
+    Rows are resampled as a whole; within each resample a pair uses the rows
+    where both columns are present. Returns a long DataFrame with one row per
+    method and pair: var_x, var_y, n (complete rows), r, ci_low and ci_high.
+    Intervals are NaN when ``resamples`` is 0.
+    """
+    columns = list(columns) if columns is not None else indicator_columns(df)
+    block = numeric_block(df, columns)
+    valid = ~np.isnan(block)
+    pairs = list(zip(*np.triu_indices(len(columns), 1)))
+    rows = len(block)
+
+    boot = {(method, pair): [] for method in methods for pair in pairs}
+    rng = np.random.default_rng(seed)
+    batch = max(1, BATCH_CELLS // max(rows, 1))
+    groups = complete_row_groups(valid, pairs)
+    for start in range(0, resamples, batch):
+        weights = multiplicities(rows, min(batch, resamples - start), rng)
+        for complete, group in groups:
+            pair_weights = weights[:, complete]
+            if 'pearson' in methods:
+                for i, j in group:
+                    boot['pearson', (i, j)].append(
+                        weighted_pearson(block[complete, i], block[complete, j], pair_weights)
+                    )
+            if 'spearman' in methods:
+                for pair, estimates in grouped_spearman(block, complete, group,
+                                                        pair_weights).items():
+                    boot['spearman', pair].append(estimates)
+
+    tail = (1 - confidence) / 2 * 100
+    records = []
+    for method in methods:
+        for i, j in pairs:
+            complete = valid[:, i] & valid[:, j]
+            x, y = block[complete, i], block[complete, j]
+            r = pair_correlation(x, y, np.ones((1, len(x))), method)[0]
+            ci_low = ci_high = np.nan
+            if boot[method, (i, j)]:
+                estimates = np.concatenate(boot[method, (i, j)])
+                if not np.isnan(estimates).all():
+                    ci_low, ci_high = np.nanpercentile(estimates, [tail, 100 - tail])
+            records.append({
+                'method': method, 'var_x': columns[i], 'var_y': columns[j],
+                'n': int(complete.sum()), 'r': r, 'ci_low': ci_low, 'ci_high': ci_high
+            })
+    return pd.DataFrame(records, columns=['method', 'var_x', 'var_y', 'n', 'r', 'ci_low', 'ci_high'])
+
+def correlation_table(df, breakdowns=(), methods=METHODS, resamples=DEFAULT_RESAMPLES,
+                      confidence=DEFAULT_CONFIDENCE, seed=DEFAULT_SEED):
+    """Correlate the whole frame and each group of the requested breakdowns
+
+    Returns the long table with ``group_by`` and ``group`` columns in front
+    (``all`` for the whole frame) and the row count of every group. Groups
+    with fewer than MIN_GROUP_ROWS rows are left out.
+    """
+    columns = indicator_columns(df)
+    groups = [('all', 'all', df)]
+    for key in breakdowns:
+        groups.extend((key, value, group_df)
+                      for value, group_df in df.groupby(key, observed=True, sort=True))
+
+    tables, group_rows = [], {}
+    for key, value, group_df in groups:
+        if key != 'all' and len(group_df) < MIN_GROUP_ROWS:
+            continue
+        table = correlate(group_df, columns, methods, resamples, confidence, seed)
+        table.insert(0, 'group', str(value))
+        table.insert(0, 'group_by', key)
+        tables.append(table)
+        group_rows.setdefault(key, {})[str(value)] = len(group_df)
+    return pd.concat(tables, ignore_index=True), group_rows
+
+def print_strongest_correlations(table, target='happiness_score', count=5):
+    """Print the indicators most strongly correlated with the target"""
+    overall = table[(table['group_by'] == 'all')
+                    & ((table['var_x'] == target) | (table['var_y'] == target))]
+    for method, method_table in overall.groupby('method', sort=False):
+        print(f"\nStrongest {method.capitalize()} correlations with {target}:")
+        ranked = method_table.reindex(method_table['r'].abs().sort_values(ascending=False).index)
+        for row in ranked.head(count).itertuples(index=False):
+            other = row.var_y if row.var_x == target else row.var_x
+            print(f"  {other:<34} r = {row.r:+.3f}  [{row.ci_low:+.3f}, {row.ci_high:+.3f}]  n = {row.n}")
+
+@traced
+def run_analysis(df, output_dir, breakdowns=(), resamples=DEFAULT_RESAMPLES,
+                 confidence=DEFAULT_CONFIDENCE, seed=DEFAULT_SEED):
+    """Correlate the merged dataset and save the table and its parameters"""
+    print(f"\nCorrelating {len(indicator_columns(df))} indicators over {len(df)} rows "
+          f"with {resamples} bootstrap resamples...")
+    table, group_rows = correlation_table(df, breakdowns, METHODS, resamples, confidence, seed)
+
+    os.makedirs(output_dir, exist_ok=True)
+    table_path = os.path.join(output_dir, CORRELATIONS_FILENAME)
+    table.to_csv(table_path, index=False)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'parameters': {
+            'methods': METHODS,
+            'resamples': resamples,
+            'confidence': confidence,
+            'seed': seed,
+            'breakdowns': list(breakdowns),
+            'min_group_rows': MIN_GROUP_ROWS
+        },
+        'indicators': indicator_columns(df),
+        'group_rows': group_rows
+    }
+    report_path = os.path.join(output_dir, REPORT_FILENAME)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_strongest_correlations(table)
+    print(f"\nCorrelation table saved to: {table_path}")
+    print(f"Correlation report saved to: {report_path}")
+    return table
+
+def main():
+    """Main execution function"""
+    processed_dir = 'data/processed'
+
+    df = read_partitions('merged', DEFAULT_YEARS, processed_dir, DEFAULT_FORMAT)
+    run_analysis(df, processed_dir, breakdowns=['continent'])
+
+if __name__ == "__main__":
+    main()
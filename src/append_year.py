@@ -0,0 +1,394 @@
+"""
+Incremental Append for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Adds new World Happiness Report years to the processed store without
+rebuilding the years already there. For each new year only that year is
+cleaned, merged against the matching Gapminder year and profiled; the
+reports are then rebuilt from mergeable state kept per year in
+data/processed/append_state.pkl:
+
+  - the streaming profile and rule check states of both cleaned partitions
+    (see streaming_profile and quality_rules.RuleState), merged across years
+    for data_profile_report.json
+  - the merge counts, unmatched keys, resolved names and memory usage of the
+    merged partition, combined for merge_report.json
+  - the country names of both datasets; all Happiness names are resolved
+    together against the union of the Gapminder names, as in a full run
+
+The cost of an append follows the size of the new year, apart from the scan
+of the raw Gapminder file. If a new year changes how the names of an earlier
+year resolve, that year is merged again, so every merged partition matches a
+full rebuild. --verify rebuilds every stored year from scratch in a
+temporary directory (cleaning, merge and streaming profile) and compares the
+partitions and reports with the store. The profile report is a streaming
+report: memory usage, rule checks and value counts equal those of the default
+full-mode report, while statistics from sketches or merged moments may differ
+(see generate_streaming_profile_report).
+"""
+
+import io
+import os
+import json
+import sys
+import math
+import time
+import pickle
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from functools import partial
+
+import clean_data
+import merge_data
+import profile_data
+from country_resolver import RESOLUTION_CACHE, reject_collisions, resolve_names
+from instrumentation import traced
+from schemas import legacy_layout, memory_usage_report
+from storage import (
+    DEFAULT_FORMAT, INTERMEDIATE_FORMATS, check_format, format_years, happiness_raw_paths,
+    iter_partition_chunks, parse_years, partition_path, read_frame, read_partitions,
+    write_partitions, years_argument
+)
+from quality_rules import merge_rule_states
+from streaming_profile import merge_profiles
+
+RAW_DATA_DIR = 'data/raw'
+PROCESSED_DIR = 'data/processed'
+GAPMINDER_FILENAME = 'gapminder_data_graphs.csv'
+STATE_FILENAME = 'append_state.pkl'
+STATE_VERSION = 2
+DEFAULT_CHUNKSIZE = 100_000
+
+# Report fields that legitimately differ between an append and a rebuild
+VOLATILE_FIELDS = {'timestamp', 'generation_timestamp'}
+
+# Profile report sections the streaming state reproduces exactly from a full
+# profile; the statistics of the other sections may differ by rounding or
+# become sketch estimates
+EXACT_PROFILE_FIELDS = [
+    ('missing_values',), ('memory_usage',), ('quality_checks', 'rules'), ('categorical_analysis',)
+]
+
+def load_state(output_dir, fmt):
+    """Load the per-year append state, or an empty one"""
+    path = os.path.join(output_dir, STATE_FILENAME)
+    if not os.path.exists(path):
+        return {'version': STATE_VERSION, 'format': fmt, 'years': {}}
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"{path} was written by an older version; delete it and append "
+                         f"the stored years again")
+    if state['format'] != fmt:
+        raise ValueError(f"The store was built in {state['format']} format, not {fmt}")
+    return state
+
+def save_state(state, output_dir):
+    """Persist the append state; the file is replaced atomically"""
+    path = os.path.join(output_dir, STATE_FILENAME)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+def key_list(df):
+    """The (country, year) keys of a frame as plain lists"""
+    return [[str(country), int(year)] for country, year in
+            zip(df['country'].to_numpy(), df['year'].to_numpy())]
+
+def stored_names(state, dataset):
+    """Union of the country names of a dataset over every stored year"""
+    return sorted(set().union(*(entry[f'{dataset}_countries'] for entry in state['years'].values())))
+
+def resolve_store(state, output_dir):
+    """Resolve the Happiness names of every stored year onto the Gapminder names
+
+    Returns the resolutions that rename each year's names.
+    """
+    resolutions = reject_collisions(
+        resolve_names(stored_names(state, 'happiness'), stored_names(state, 'gapminder'),
+                      cache_path=os.path.join(output_dir, RESOLUTION_CACHE)),
+        [entry['happiness_countries'] for entry in state['years'].values()]
+    )
+    return {
+        year: {name: resolutions[name] for name in entry['happiness_countries']
+               if resolutions[name]['country'] not in (None, name)}
+        for year, entry in state['years'].items()
+    }
+
+@traced
+def merge_year(year, changes, output_dir, fmt):
+    """Merge one year's cleaned partitions and return that year's merge state
+
+    ``changes`` are the name resolutions from resolve_store that apply to
+    this year.
+    """
+    happiness_df = read_partitions('happiness_clean', [year], output_dir, fmt)
+    gapminder_df = read_partitions('gapminder_clean', [year], output_dir, fmt)
+
+    happiness_df['country'] = happiness_df['country'].replace(
+        {name: entry['country'] for name, entry in changes.items()}
+    )
+    merged_df, join = merge_data.merge_datasets(happiness_df, gapminder_df)
+    write_partitions(merged_df, 'merged', output_dir, fmt)
+
+    return {
+        'happiness_rows': len(happiness_df),
+        'merged_rows': len(merged_df),
+        'happiness_only': key_list(happiness_df.iloc[join['left_only']]),
+        'gapminder_only': key_list(gapminder_df.iloc[join['right_only']]),
+        'resolved_countries': {name: changes[name] for name in sorted(changes)},
+        'memory_usage': memory_usage_report(merged_df)
+    }
+
+def combine_memory_usage(reports):
+    """Sum per-partition memory usage reports column by column"""
+    columns = {}
+    for report in reports:
+        for col, usage in report['columns'].items():
+            entry = columns.setdefault(col, {'dtype': usage['dtype'], 'bytes': 0, 'legacy_bytes': 0})
+            entry['bytes'] += usage['bytes']
+            entry['legacy_bytes'] += usage['legacy_bytes']
+    total = sum(report['total_bytes'] for report in reports)
+    legacy = sum(report['legacy_total_bytes'] for report in reports)
+    return {
+        'columns': columns,
+        'total_bytes': total,
+        'legacy_total_bytes': legacy,
+        'saved_pct': round(100 * (1 - total / legacy), 1) if legacy else 0.0
+    }
+
+def combine_merge_states(merges):
+    """Build merge_report statistics from per-year merge states, in year order
+
+    Matches merge_data.analyze_merge_quality on all years at once; the
+    memory usage is summed over the yearly partitions.
+    """
+    include_year = len(merges) > 1
+
+    def labels(side):
+        keys = [tuple(key) for merge in merges for key in merge[side]]
+        unique = list(dict.fromkeys(keys if include_year else [country for country, _ in keys]))
+        return [f"{country} ({year})" for country, year in unique] if include_year else unique
+
+    happiness_rows = sum(merge['happiness_rows'] for merge in merges)
+    merged_rows = sum(merge['merged_rows'] for merge in merges)
+    resolved = {}
+    for merge in merges:
+        resolved.update(merge['resolved_countries'])
+    return {
+        'happiness_only': labels('happiness_only'),
+        'gapminder_only': labels('gapminder_only'),
+        'merge_success_rate': merged_rows / happiness_rows * 100,
+        'merged_country_count': merged_rows,
+        'resolved_countries': {name: resolved[name] for name in sorted(resolved)},
+        'memory_usage': combine_memory_usage([merge['memory_usage'] for merge in merges])
+    }
+
+def write_reports(state, output_dir, raw_dir, chunksize=DEFAULT_CHUNKSIZE):
+    """Rewrite the cleaning provenance, merge report and profile report from the state
+
+    Rows sampled by the unique and reference rules are read back from the
+    stored partitions.
+    """
+    years = sorted(state['years'])
+    entries = [state['years'][year] for year in years]
+
+    clean_data.save_provenance_info(
+        happiness_raw_paths(years, raw_dir), os.path.join(raw_dir, GAPMINDER_FILENAME), output_dir
+    )
+    merge_data.save_merge_report(combine_merge_states([e['merge'] for e in entries]), output_dir)
+
+    report = profile_data.build_profile_report(
+        f"Happiness {format_years(years)}", f"Gapminder {format_years(years)}",
+        happiness_profile=merge_profiles([e['happiness_profile'] for e in entries]).to_profile(),
+        gapminder_profile=merge_profiles([e['gapminder_profile'] for e in entries]).to_profile()
+    )
+    profile_data.add_streaming_rule_checks(
+        report,
+        {f'{dataset}_clean': merge_rule_states(e[f'{dataset}_rules'] for e in entries)
+         for dataset in ('happiness', 'gapminder')},
+        {f'{dataset}_clean': partial(iter_partition_chunks, f'{dataset}_clean', years,
+                                     output_dir, state['format'], chunksize)
+         for dataset in ('happiness', 'gapminder')}
+    )
+    profile_data.save_profile_report(report, output_dir)
+
+@traced
+def append_years(years, output_dir=PROCESSED_DIR, raw_dir=RAW_DATA_DIR, fmt=DEFAULT_FORMAT,
+                 chunksize=DEFAULT_CHUNKSIZE):
+    """Clean, merge and profile the given years and fold them into the stored state
+
+    Years already in the store are ingested again and replace their state.
+    Returns the years in the store.
+    """
+    check_format(fmt)
+    state = load_state(output_dir, fmt)
+    gapminder_path = os.path.join(raw_dir, GAPMINDER_FILENAME)
+
+    for year in sorted(years):
+        print(f"\n### Appending {year} ###")
+        clean_data.run_cleaning(happiness_raw_paths([year], raw_dir), gapminder_path, output_dir, fmt)
+
+        partitions = {
+            dataset: profile_data.stream_partition(f'{dataset}_clean', year, output_dir, fmt,
+                                                   chunksize)
+            for dataset in ('happiness', 'gapminder')
+        }
+        profiles = {dataset: profile for dataset, (profile, _) in partitions.items()}
+        state['years'][year] = {
+            **{f'{dataset}_profile': profile for dataset, profile in profiles.items()},
+            **{f'{dataset}_rules': rules for dataset, (_, rules) in partitions.items()},
+            **{f'{dataset}_countries': sorted(profile.value_counts['country'].index.astype(str))
+               for dataset, profile in profiles.items()}
+        }
+
+        # New names can change how the names of earlier years resolve
+        renames = resolve_store(state, output_dir)
+        stale = [y for y in sorted(state['years'])
+                 if y == year or renames[y] != state['years'][y]['merge']['resolved_countries']]
+        if len(stale) > 1:
+            print(f"Country resolution changed; merging {format_years(stale)} again")
+        for merged_year in stale:
+            state['years'][merged_year]['merge'] = merge_year(
+                merged_year, renames[merged_year], output_dir, fmt
+            )
+        save_state(state, output_dir)
+
+    write_reports(state, output_dir, raw_dir, chunksize)
+    return sorted(state['years'])
+
+def _compare(mine, theirs, path, mismatches):
+    """Collect the paths where two JSON-like values differ"""
+    if isinstance(mine, dict) and isinstance(theirs, dict):
+        for key in set(mine) | set(theirs):
+            if key in VOLATILE_FIELDS:
+                continue
+            if key not in mine or key not in theirs:
+                mismatches.append(f"{path}.{key}: only in one report")
+            else:
+                _compare(mine[key], theirs[key], f"{path}.{key}", mismatches)
+    elif isinstance(mine, list) and isinstance(theirs, list):
+        if len(mine) != len(theirs):
+            mismatches.append(f"{path}: {len(mine)} items != {len(theirs)}")
+        else:
+            for i, (a, b) in enumerate(zip(mine, theirs)):
+                _compare(a, b, f"{path}[{i}]", mismatches)
+    elif isinstance(mine, float) and isinstance(theirs, float) and math.isnan(mine):
+        if not math.isnan(theirs):
+            mismatches.append(f"{path}: {mine!r} != {theirs!r}")
+    elif mine != theirs:
+        mismatches.append(f"{path}: {mine!r} != {theirs!r}")
+
+def _field(report, keys):
+    """The value under a path of keys in a JSON-like report, or None"""
+    for key in keys:
+        report = report.get(key) if isinstance(report, dict) else None
+    return report
+
+def _load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+@traced
+def verify_store(output_dir=PROCESSED_DIR, raw_dir=RAW_DATA_DIR, fmt=DEFAULT_FORMAT,
+                 chunksize=DEFAULT_CHUNKSIZE):
+    """Rebuild every stored year from scratch and compare it with the store
+
+    Partitions must hold the same values. Reports must be equal apart from
+    timestamps, the merged memory usage (summed per partition in the store)
+    and the order of the unmatched-country lists. The profile report must
+    equal the streaming report, and the default full-mode report in the
+    EXACT_PROFILE_FIELDS sections. Returns the list of mismatches (empty
+    when equal).
+    """
+    years = sorted(load_state(output_dir, fmt)['years'])
+    if not years:
+        return ['the store holds no appended years']
+
+    mismatches = []
+    with tempfile.TemporaryDirectory() as scratch, redirect_stdout(io.StringIO()):
+        happiness_clean, gapminder_clean = clean_data.run_cleaning(
+            happiness_raw_paths(years, raw_dir), os.path.join(raw_dir, GAPMINDER_FILENAME),
+            scratch, fmt
+        )
+        merge_data.run_integration(happiness_clean, gapminder_clean, scratch, fmt)
+        profile_data.generate_streaming_profile_report(years, scratch, fmt, chunksize,
+                                                       processed_dir=scratch)
+        full_dir = os.path.join(scratch, 'full')
+        os.makedirs(full_dir)
+        profile_data.generate_profile_report(happiness_clean, gapminder_clean, full_dir)
+
+        for dataset in ('happiness_clean', 'gapminder_clean', 'merged'):
+            for year in years:
+                mine = legacy_layout(read_frame(partition_path(dataset, year, output_dir, fmt), fmt))
+                theirs = legacy_layout(read_frame(partition_path(dataset, year, scratch, fmt), fmt))
+                if not mine.equals(theirs):
+                    mismatches.append(f"{partition_path(dataset, year, output_dir, fmt)} differs")
+
+        for filename in ('cleaning_provenance.json', 'merge_report.json', 'data_profile_report.json'):
+            mine = _load_json(os.path.join(output_dir, filename))
+            theirs = _load_json(os.path.join(scratch, filename))
+            if filename == 'merge_report.json':
+                for report in (mine, theirs):
+                    statistics = report['merge_statistics']
+                    statistics.pop('memory_usage')
+                    for side in ('happiness_only', 'gapminder_only'):
+                        statistics[side] = sorted(statistics[side])
+            _compare(mine, theirs, filename, mismatches)
+
+        mine = _load_json(os.path.join(output_dir, 'data_profile_report.json'))
+        full = _load_json(os.path.join(full_dir, 'data_profile_report.json'))
+        for section in ('happiness_dataset', 'gapminder_dataset'):
+            for field in EXACT_PROFILE_FIELDS:
+                path = '.'.join(['data_profile_report.json (full mode)', section, *field])
+                _compare(_field(mine[section], field), _field(full[section], field), path,
+                         mismatches)
+    return mismatches
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(
+        description='Append World Happiness Report years to the processed store incrementally.'
+    )
+    parser.add_argument(
+        'years', type=parse_years, nargs='?', default=[],
+        help='years to append, e.g. 2019 or 2015-2018; each needs data/raw/<year>.csv'
+    )
+    parser.add_argument('--format', choices=list(INTERMEDIATE_FORMATS), default=DEFAULT_FORMAT,
+                        help='storage format of the store (default: csv)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f'rows per chunk when profiling (default: {DEFAULT_CHUNKSIZE})')
+    parser.add_argument('--verify', action='store_true',
+                        help='rebuild every stored year from scratch and compare it with the store')
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    args = parse_args()
+    if not args.years and not args.verify:
+        print("Nothing to do: give the years to append and/or --verify")
+        sys.exit(2)
+
+    if args.years:
+        start = time.perf_counter()
+        stored = append_years(args.years, fmt=args.format, chunksize=args.chunksize)
+        print(f"\nAppended {format_years(args.years)} in {time.perf_counter() - start:.2f}s; "
+              f"the store holds {format_years(stored)}")
+        print("Correlations and figures cover all years at once; refresh them with "
+              f"python src/run_all.py --years {years_argument(stored)}")
+
+    if args.verify:
+        start = time.perf_counter()
+        mismatches = verify_store(fmt=args.format, chunksize=args.chunksize)
+        if mismatches:
+            print(f"\n✗ The store differs from a full rebuild ({len(mismatches)} differences):")
+            for mismatch in mismatches[:20]:
+                print(f"  {mismatch}")
+            sys.exit(1)
+        print(f"\n✓ The store matches a full rebuild ({time.perf_counter() - start:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Pipeline Benchmark Suite for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Generates synthetic raw data at several sizes (see synthetic_data) and runs
+the pipeline stages on it under a run trace (see instrumentation), recording
+wall time, CPU time, the tracemalloc allocation peak and the process RSS
+high-water mark of every stage and traced function. Results are written as
+JSON; passing an earlier results file with --baseline prints
+per-stage ratios and flags regressions.
+
+Each size runs in a fresh worker process inside its own scratch directory,
+so memory figures of one size do not leak into the next. Timings include
+the tracemalloc overhead unless --no-tracemalloc is given.
+
+Usage:
+    python src/benchmark.py --sizes tiny small medium
+    python src/benchmark.py --sizes large --baseline data/benchmarks/benchmark_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import RunTrace
+from synthetic_data import generate_raw_data
+
+# countries x panel years; the Gapminder file holds about 97% of the product
+SIZES = {
+    'tiny': {'countries': 175, 'years': 21},
+    'small': {'countries': 2_000, 'years': 50},
+    'medium': {'countries': 10_000, 'years': 100},
+    'large': {'countries': 50_000, 'years': 200},
+    'xlarge': {'countries': 200_000, 'years': 200}
+}
+DEFAULT_SIZES = ['tiny', 'small', 'medium']
+STAGES = ['clean', 'profile', 'merge', 'analyze', 'visualize']
+DEFAULT_OUTPUT = 'data/benchmarks/benchmark_results.json'
+REGRESSION_RATIO = 1.2
+
+# Cold-start budget of the runner for commands that should do no data work
+STARTUP_BUDGET_SECONDS = 0.25
+STARTUP_COMMANDS = {
+    'help': ['--help'],
+    'dry_run': ['--dry-run'],
+    'cached_noop': []
+}
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'seaborn', 'pyarrow']
+
+def benchmark_size(size, countries, years, happiness_years, extra_indicators, stages,
+                   options, workdir, trace_memory=True, seed=0):
+    """Generate one synthetic dataset and benchmark the pipeline stages on it"""
+    import run_all
+
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    start = time.perf_counter()
+    written = generate_raw_data(run_all.RAW_DATA_DIR, countries, years, happiness_years,
+                                extra_indicators, seed)
+    generate_seconds = time.perf_counter() - start
+
+    options = dict(options, years=written['happiness_years'])
+    context = dict(options)
+    trace = RunTrace(trace_memory=trace_memory)
+    with trace.activate():
+        for stage in run_all.build_workflow(options):
+            if stage['id'] not in stages:
+                continue
+            try:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                        trace.span(stage['id'], kind='stage') as record:
+                    stage['run'](context)
+            except Exception as exc:
+                record['error'] = f"{type(exc).__name__}: {exc}"
+                break
+    stage_results = trace.spans
+
+    return {
+        'size': size,
+        'countries': countries,
+        'years': years,
+        'happiness_years': written['happiness_years'],
+        'extra_indicators': extra_indicators,
+        'gapminder_rows': written['gapminder_rows'],
+        'happiness_rows': written['happiness_rows'],
+        'generate_seconds': round(generate_seconds, 4),
+        'stages': stage_results,
+        'rss_peak_mb': trace.summary['rss_peak_mb'],
+        'total_wall_seconds': round(sum(s['wall_seconds'] for s in stage_results), 4)
+    }
+
+def run_benchmarks(sizes, happiness_years=1, extra_indicators=0, stages=STAGES, options=None,
+                   workdir=None, trace_memory=True):
+    """Benchmark every requested size, each in a fresh worker process"""
+    import run_all
+
+    options = options or vars(run_all.parse_args([]))
+    scratch = workdir or tempfile.mkdtemp(prefix='pipeline_benchmark_')
+    results = []
+    try:
+        for size in sizes:
+            spec = SIZES[size]
+            print(f"Benchmarking {size}: {spec['countries']:,} countries x {spec['years']} years...")
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(
+                    benchmark_size, size, spec['countries'], spec['years'], happiness_years,
+                    extra_indicators, stages, options, os.path.join(scratch, size), trace_memory
+                ).result()
+            results.append(result)
+            print_size_result(result)
+    finally:
+        if workdir is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__
+        },
+        'options': {key: value for key, value in options.items() if key != 'years'},
+        'trace_memory': trace_memory,
+        'results': results
+    }
+
+def measure_startup(workdir, repeats=5, budget=STARTUP_BUDGET_SECONDS):
+    """Time cold starts of run_all.py for commands that should do no data work
+
+    ``workdir`` must hold a project tree (src/ and data/raw/). The workflow
+    is run once first so the stage cache is up to date; each command then
+    runs ``repeats`` times in a fresh interpreter. A command is
+    within budget when its median time is under ``budget`` and it imports none
+    of the heavy data packages.
+    """
+    script = os.path.join('src', 'run_all.py')
+
+    def run(args, interpreter_args=()):
+        return subprocess.run([sys.executable, *interpreter_args, script, *args],
+                              cwd=workdir, capture_output=True, text=True)
+
+    warmup = run([])
+    if warmup.returncode != 0:
+        raise RuntimeError(f"Workflow run failed:\n{warmup.stdout[-2000:]}")
+
+    results = {}
+    for name, args in STARTUP_COMMANDS.items():
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run(args)
+            times.append(time.perf_counter() - start)
+        imported = {line.rsplit('|', 1)[-1].strip()
+                    for line in run(args, ['-X', 'importtime']).stderr.splitlines()
+                    if line.startswith('import time:')}
+        heavy = [module for module in HEAVY_MODULES if module in imported]
+        median = statistics.median(times)
+        results[name] = {
+            'command': ' '.join(['run_all.py'] + args),
+            'median_seconds': round(median, 4),
+            'min_seconds': round(min(times), 4),
+            'heavy_imports': heavy,
+            'within_budget': median <= budget and not heavy
+        }
+    return {'budget_seconds': budget, 'commands': results}
+
+def run_startup_benchmark(workdir=None, repeats=5):
+    """Measure runner cold starts against the startup budget on tiny synthetic data"""
+    scratch = workdir or tempfile.mkdtemp(prefix='pipeline_startup_')
+    try:
+        # Stage fingerprints hash the code by its path under the project root
+        shutil.copytree(os.path.dirname(os.path.abspath(__file__)), os.path.join(scratch, 'src'),
+                        ignore=shutil.ignore_patterns('__pycache__'), dirs_exist_ok=True)
+        spec = SIZES['tiny']
+        generate_raw_data(os.path.join(scratch, 'data', 'raw'), spec['countries'], spec['years'])
+        startup = measure_startup(scratch, repeats)
+    finally:
+        if workdir is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"\nStartup (budget {startup['budget_seconds']:.2f}s):")
+    for result in startup['commands'].values():
+        flag = '✓' if result['within_budget'] else '✗'
+        heavy = f"  imports {', '.join(result['heavy_imports'])}" if result['heavy_imports'] else ''
+        print(f"  {flag} {result['command']:<24} {result['median_seconds']:.3f}s{heavy}")
+    return startup
+
+def print_size_result(result):
+    """Print one size's stage timings as a table"""
+    print(f"  {result['gapminder_rows']:,} Gapminder rows, {result['happiness_rows']:,} Happiness rows "
+          f"(generated in {result['generate_seconds']:.1f}s)")
+    for stage in result['stages']:
+        memory = f"{stage['tracemalloc_peak_mb']:>9.1f} MB traced" if 'tracemalloc_peak_mb' in stage else ''
+        print(f"    {stage['name']:<10} {stage['wall_seconds']:>9.3f}s wall "
+              f"{stage['cpu_seconds']:>9.3f}s cpu {memory} {stage['rss_peak_mb']:>9.1f} MB rss")
+        if 'error' in stage:
+            print(f"    ✗ {stage['error']}")
+
+def compare_results(current, baseline, ratio=REGRESSION_RATIO):
+    """Print per-stage wall-time ratios against a baseline run and return the regressions"""
+    baseline_times = {
+        (result['size'], stage['name']): stage['wall_seconds']
+        for result in baseline['results'] for stage in result['stages']
+    }
+    regressions = []
+    compared = False
+    print("\nComparison with baseline (current / baseline wall time):")
+    for result in current['results']:
+        for stage in result['stages']:
+            key = (result['size'], stage['name'])
+            if key not in baseline_times or baseline_times[key] <= 0:
+                continue
+            change = stage['wall_seconds'] / baseline_times[key]
+            flag = '  ⚠ regression' if change > ratio else ''
+            print(f"  {key[0]:<8} {key[1]:<10} {change:6.2f}x{flag}")
+            if change > ratio:
+                regressions.append({'size': key[0], 'stage': key[1], 'ratio': round(change, 3)})
+            compared = True
+    if not compared:
+        print("  No size and stage in common with the baseline")
+    return regressions
+
+def save_results(results, output_path):
+    """Write the benchmark results as JSON"""
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark results saved to: {output_path}")
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages on synthetic data.')
+    parser.add_argument('--sizes', nargs='*', choices=list(SIZES), default=DEFAULT_SIZES,
+                        help=f"dataset sizes to run (default: {' '.join(DEFAULT_SIZES)}); "
+                             "pass no size to skip the stage benchmarks")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                        help='stages to benchmark (default: all)')
+    parser.add_argument('--happiness-years', type=int, default=1,
+                        help='number of happiness years to generate and process (default: 1)')
+    parser.add_argument('--extra-indicators', type=int, default=0,
+                        help='extra Gapminder indicator columns the loader has to skip (default: 0)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                        help=f'results file (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--workdir', help='keep the generated data in this directory')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='skip allocation tracing for lower timing overhead')
+    parser.add_argument('--startup', action='store_true',
+                        help='also check runner cold starts (--help, --dry-run, cached no-op run) '
+                             f'against the {STARTUP_BUDGET_SECONDS}s budget')
+    parser.add_argument('--pipeline-args', default='',
+                        help="extra run_all.py options, e.g. \"--format feather --workers 4\"")
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    import run_all
+
+    args = parse_args()
+    options = vars(run_all.parse_args(args.pipeline_args.split()))
+    results = run_benchmarks(
+        args.sizes, args.happiness_years, args.extra_indicators, args.stages, options,
+        os.path.abspath(args.workdir) if args.workdir else None, not args.no_tracemalloc
+    )
+
+    if args.startup:
+        results['startup'] = run_startup_benchmark()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['regressions'] = compare_results(results, json.load(f))
+    save_results(results, args.output)
+
+if __name__ == "__main__":
+    main()
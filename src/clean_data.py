@@ -8,59 +8,171 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import datetime
-import hashlib
 import json
 
-def calculate_file_hash(filepath):
-    """Calculate SHA-256 hash of a file"""
-    sha256_hash = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
-
-def load_happiness_data(filepath):
-    """Load and perform initial inspection of happiness data"""
-    print("Loading World Happiness Report 2018...")
-    df = pd.read_csv(filepath)
+from country_resolver import canonical_country_names
+from features import DEFAULT_LAGS, DEFAULT_WINDOWS, derive_features
+from fingerprint import calculate_file_hashes
+from imputation import (
+    DEFAULT_WINDOW, IMPUTATION_LOG_FILENAME, IMPUTE_METHODS, impute_panel, imputation_summary,
+    print_imputation_summary
+)
+from instrumentation import note, traced
+from schemas import apply_schema
+from storage import (
+    DEFAULT_FORMAT, DEFAULT_YEARS, format_years, happiness_raw_paths, write_partitions
+)
+
+# Older World Happiness Report releases use different headers; map them onto
+# the 2018 headers so every year lines up before cleaning
+HAPPINESS_HEADER_ALIASES = {
+    'Happiness Rank': 'Overall rank',
+    'Happiness.Rank': 'Overall rank',
+    'Country': 'Country or region',
+    'Happiness Score': 'Score',
+    'Happiness.Score': 'Score',
+    'Economy (GDP per Capita)': 'GDP per capita',
+    'Economy..GDP.per.Capita.': 'GDP per capita',
+    'Family': 'Social support',
+    'Health (Life Expectancy)': 'Healthy life expectancy',
+    'Health..Life.Expectancy.': 'Healthy life expectancy',
+    'Freedom': 'Freedom to make life choices',
+    'Trust (Government Corruption)': 'Perceptions of corruption',
+    'Trust..Government.Corruption.': 'Perceptions of corruption'
+}
+
+HAPPINESS_HEADERS = [
+    'Overall rank', 'Country or region', 'Score', 'GDP per capita',
+    'Social support', 'Healthy life expectancy',
+    'Freedom to make life choices', 'Generosity', 'Perceptions of corruption'
+]
+
+@traced
+def load_happiness_data(happiness_paths):
+    """Load the World Happiness Report for every requested year into one frame
+
+    ``happiness_paths`` maps each year to its report file. Headers are aligned
+    to the 2018 release and a ``year`` column is added.
+    """
+    frames = []
+    for year, filepath in sorted(happiness_paths.items()):
+        print(f"Loading World Happiness Report {year}...")
+        df = pd.read_csv(filepath)
+        df = df.rename(columns=HAPPINESS_HEADER_ALIASES)
+        df = df[[col for col in HAPPINESS_HEADERS if col in df.columns]].assign(year=year)
+        frames.append(df)
+    
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
     print(f"Shape: {df.shape}")
     print(f"Columns: {df.columns.tolist()}")
     return df
 
-def load_gapminder_data(filepath):
-    """Load and filter Gapminder data for 2018"""
+# Numbers are parsed straight into the narrow types of schemas.GAPMINDER_SCHEMA;
+# names stay strings until the filtered chunks are joined
+GAPMINDER_DTYPES = {
+    'country': 'object',
+    'continent': 'object',
+    'year': 'int16',
+    'life_exp': 'float32',
+    'hdi_index': 'float32',
+    'co2_consump': 'float32',
+    'gdp': 'float32',
+    'services': 'float32'
+}
+
+GAPMINDER_CHUNKSIZE = 100_000
+
+@traced
+def load_gapminder_data(filepath, years=DEFAULT_YEARS, countries=None, continents=None,
+                        chunksize=GAPMINDER_CHUNKSIZE):
+    """Stream the Gapminder panel and keep only the requested years
+
+    The file is parsed in chunks with explicit dtypes and only the columns
+    used downstream, and each chunk is filtered before the next one is read,
+    so peak memory follows the filtered output rather than the whole panel.
+    ``years`` of None keeps every year. ``countries`` and ``continents``
+    optionally restrict the rows further (matched against the raw names in
+    the file).
+    """
     print("\nLoading Gapminder data...")
-    df = pd.read_csv(filepath)
-    print(f"Original shape: {df.shape}")
     
-    df_2018 = df[df['year'] == 2018].copy()
-    print(f"Filtered to 2018 - Shape: {df_2018.shape}")
-    print(f"Columns: {df_2018.columns.tolist()}")
-    return df_2018
+    filtered_chunks = []
+    rows_scanned = 0
+    reader = pd.read_csv(
+        filepath,
+        usecols=list(GAPMINDER_DTYPES),
+        dtype=GAPMINDER_DTYPES,
+        chunksize=chunksize
+    )
+    for chunk in reader:
+        rows_scanned += len(chunk)
+        mask = chunk['year'].isin(years) if years is not None else np.ones(len(chunk), dtype=bool)
+        if countries is not None:
+            mask &= chunk['country'].isin(countries)
+        if continents is not None:
+            mask &= chunk['continent'].isin(continents)
+        filtered_chunks.append(chunk[mask])
+    
+    filtered_df = pd.concat(filtered_chunks)[list(GAPMINDER_DTYPES)]
+    note(rows_scanned=rows_scanned)
+    print(f"Scanned {rows_scanned} rows")
+    print(f"Filtered to {format_years(years) if years is not None else 'all years'} - "
+          f"Shape: {filtered_df.shape}")
+    print(f"Columns: {filtered_df.columns.tolist()}")
+    return filtered_df
+
+def strip_names(names):
+    """Strip surrounding whitespace from a Series of names"""
+    return names.str.strip()
+
+# String transforms of the key columns; each takes and returns a Series of
+# distinct values and runs once per distinct value, not once per row
+CATEGORY_TRANSFORMS = {
+    'country': [canonical_country_names],
+    'continent': [strip_names]
+}
+
+def transform_categories(values, transforms):
+    """Apply string transforms to the distinct values of a column
+
+    The column is factorized once, the transforms run over its unique values
+    and the results are broadcast back through the codes, so the cost grows
+    with the number of distinct values rather than with the number of rows.
+    Returns a categorical with sorted categories, as astype('category') gives;
+    missing values stay missing.
+    """
+    codes, uniques = pd.factorize(values)
+    transformed = pd.Series(uniques, dtype=object)
+    for transform in transforms:
+        transformed = transform(transformed)
+
+    # Transforms can merge values (an alias and its canonical name), so the
+    # results are factorized again into sorted categories
+    new_codes, categories = pd.factorize(transformed, sort=True)
+    codes = np.where(codes >= 0, new_codes[np.maximum(codes, 0)], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categories),
+        index=values.index, name=values.name
+    )
 
 def standardize_country_names(df, country_col):
-    """Standardize country names to ensure consistent merging"""
-    country_mappings = {
-        'United States': 'United States',
-        'United Kingdom': 'United Kingdom',
-        'South Korea': 'South Korea',
-        'North Korea': 'North Korea',
-        'Czech Republic': 'Czech Republic',
-        'Hong Kong': 'Hong Kong',
-        'Taiwan': 'Taiwan',
-        'Palestinian Territories': 'Palestine',
-        'Congo (Brazzaville)': 'Congo, Rep.',
-        'Congo (Kinshasa)': 'Congo, Dem. Rep.',
-        'Trinidad & Tobago': 'Trinidad and Tobago',
-        'Northern Cyprus': 'Cyprus',
-        'Ivory Coast': "Cote d'Ivoire",
-    }
-    
-    df[country_col] = df[country_col].replace(country_mappings)
-    df[country_col] = df[country_col].str.strip()
+    """Standardize country names to ensure consistent merging
+
+    Known alternative spellings are mapped onto the canonical names from
+    country_resolver.COUNTRY_ALIASES.
+    """
+    df[country_col] = transform_categories(df[country_col], CATEGORY_TRANSFORMS['country'])
     
     return df
 
+def standardize_categories(df):
+    """Run CATEGORY_TRANSFORMS over every key column present in the frame"""
+    return df.assign(**{
+        col: transform_categories(df[col], transforms)
+        for col, transforms in CATEGORY_TRANSFORMS.items() if col in df.columns
+    })
+
+@traced
 def clean_happiness_data(df):
     """Clean World Happiness Report data"""
     print("\nCleaning Happiness data...")
@@ -84,6 +196,7 @@ def clean_happiness_data(df):
     print(df.isnull().sum())
     
     df = df.dropna(subset=['happiness_score'])
+    df = apply_schema(df, 'happiness_clean')
     
     print(f"\nMissing values after removing incomplete happiness scores:")
     print(df.isnull().sum())
@@ -91,8 +204,9 @@ def clean_happiness_data(df):
     
     return df
 
+@traced
 def clean_gapminder_data(df):
-    """Clean Gapminder data filtered to 2018"""
+    """Clean Gapminder data filtered to the requested years"""
     print("\nCleaning Gapminder data...")
     
     column_mapping = {
@@ -107,7 +221,8 @@ def clean_gapminder_data(df):
     }
     
     df = df.rename(columns=column_mapping)
-    df = standardize_country_names(df, 'country')
+    df = standardize_categories(df)
+    df = apply_schema(df, 'gapminder_clean')
     
     print(f"\nMissing values before cleaning:")
     print(df.isnull().sum())
@@ -119,35 +234,56 @@ def clean_gapminder_data(df):
     
     return df
 
-def save_provenance_info(happiness_path, gapminder_path, output_dir):
-    """Save provenance information"""
+def save_provenance_info(happiness_paths, gapminder_path, output_dir, imputation=None,
+                         features=None):
+    """Save provenance information
+
+    ``imputation`` and ``features`` describe the gap filling and the derived
+    columns of the Gapminder indicators, when they were requested.
+    """
+    years = sorted(happiness_paths)
+    digests = calculate_file_hashes(list(happiness_paths.values()) + [gapminder_path], output_dir)
+    datasets = {}
+    for year, happiness_path in sorted(happiness_paths.items()):
+        datasets[f'happiness_{year}'] = {
+            'source_path': happiness_path,
+            'source_url': 'https://www.kaggle.com/datasets/unsdsn/world-happiness',
+            'file_hash': digests[happiness_path],
+            'description': f'World Happiness Report {year}'
+        }
+    datasets['gapminder'] = {
+        'source_path': gapminder_path,
+        'source_url': 'https://www.kaggle.com/datasets/albertovidalrod/gapminder-dataset',
+        'file_hash': digests[gapminder_path],
+        'description': f'Gapminder Global Development Data (filtered to {format_years(years)})'
+    }
+    
     provenance = {
         'timestamp': datetime.now().isoformat(),
-        'datasets': {
-            'happiness_2018': {
-                'source_path': happiness_path,
-                'source_url': 'https://www.kaggle.com/datasets/unsdsn/world-happiness',
-                'file_hash': calculate_file_hash(happiness_path),
-                'description': 'World Happiness Report 2018'
-            },
-            'gapminder': {
-                'source_path': gapminder_path,
-                'source_url': 'https://www.kaggle.com/datasets/albertovidalrod/gapminder-dataset',
-                'file_hash': calculate_file_hash(gapminder_path),
-                'description': 'Gapminder Global Development Data (filtered to 2018)'
-            }
-        },
+        'datasets': datasets,
         'python_version': pd.__version__,
         'pandas_version': pd.__version__,
         'numpy_version': np.__version__,
         'cleaning_steps': [
             'Standardized country names for consistent merging',
             'Renamed columns for clarity and consistency',
-            'Filtered Gapminder data to year 2018',
+            f'Filtered Gapminder data to year {format_years(years)}',
             'Removed rows with missing happiness scores',
             'Documented all missing value patterns'
         ]
     }
+    if imputation is not None:
+        provenance['cleaning_steps'].append(
+            f"Imputed {imputation['imputed_cells']} Gapminder cells from the full panel "
+            f"({', '.join(imputation['methods'])}; logged in {IMPUTATION_LOG_FILENAME})"
+        )
+        provenance['imputation'] = imputation
+    if features is not None:
+        provenance['cleaning_steps'].append(
+            f"Derived {len(features['columns'])} time-series features from the full Gapminder "
+            f"panel ({', '.join(features['kinds'])})"
+        )
+        provenance['features'] = features
     
     provenance_path = os.path.join(output_dir, 'cleaning_provenance.json')
     with open(provenance_path, 'w') as f:
@@ -155,36 +291,100 @@ def save_provenance_info(happiness_path, gapminder_path, output_dir):
     
     print(f"\nProvenance information saved to: {provenance_path}")
 
-def main():
-    """Main execution function"""
-    raw_data_dir = 'data/raw'
-    processed_data_dir = 'data/processed'
+def select_years(df, years):
+    """Keep the rows of the requested years, dropping categories left unused"""
+    df = df[df['year'].isin(years).to_numpy()]
+    return df.assign(**{
+        col: df[col].cat.remove_unused_categories()
+        for col in df.select_dtypes(include='category').columns
+    })
+
+def impute_gapminder_data(gapminder_clean, years, output_dir, methods=IMPUTE_METHODS,
+                          window=DEFAULT_WINDOW):
+    """Fill Gapminder gaps from the full panel
+
+    Imputed cells of the requested years are logged to IMPUTATION_LOG_FILENAME.
+    Returns the imputed panel and its provenance record.
+    """
+    print(f"\nImputing Gapminder gaps ({', '.join(methods)}; window {window} years)...")
+    imputed, log = impute_panel(gapminder_clean, methods, window)
     
-    happiness_path = os.path.join(raw_data_dir, '2018.csv')
-    gapminder_path = os.path.join(raw_data_dir, 'gapminder_data_graphs.csv')
+    log = log[log['year'].isin(years)]
+    print_imputation_summary(select_years(imputed, years), log)
+    
+    log_path = os.path.join(output_dir, IMPUTATION_LOG_FILENAME)
+    log.to_csv(log_path, index=False)
+    print(f"Imputed cells logged to: {log_path}")
     
-    os.makedirs(processed_data_dir, exist_ok=True)
+    return imputed, {
+        'methods': list(methods),
+        'window_years': window,
+        'panel_rows': len(gapminder_clean),
+        'imputed_cells': len(log),
+        'cells': imputation_summary(log)
+    }
+
+def run_cleaning(happiness_paths, gapminder_path, output_dir, fmt=DEFAULT_FORMAT,
+                 export_csv=False, impute=False, impute_methods=IMPUTE_METHODS,
+                 impute_window=DEFAULT_WINDOW, features=(), feature_lags=DEFAULT_LAGS,
+                 feature_windows=DEFAULT_WINDOWS):
+    """Clean both raw datasets, save the published outputs and return the frames
+
+    All requested years are cleaned together in one pass over the Gapminder
+    panel; the outputs are written as one file per year in ``fmt``, plus a
+    CSV copy when ``export_csv`` is set. With ``impute`` or ``features``,
+    every year of the panel is cleaned and used to fill the gaps of the
+    requested years and to derive their time-series features (see
+    features.FEATURE_KINDS), which the merge then carries over.
+    """
+    years = sorted(happiness_paths)
+    full_panel = impute or bool(features)
     
-    happiness_df = load_happiness_data(happiness_path)
-    gapminder_df = load_gapminder_data(gapminder_path)
+    happiness_df = load_happiness_data(happiness_paths)
+    gapminder_df = load_gapminder_data(gapminder_path, years=None if full_panel else years)
     
     happiness_clean = clean_happiness_data(happiness_df)
     gapminder_clean = clean_gapminder_data(gapminder_df)
+    imputation = derived = None
+    if impute:
+        gapminder_clean, imputation = impute_gapminder_data(
+            gapminder_clean, years, output_dir, impute_methods, impute_window
+        )
+    if features:
+        print(f"\nDeriving Gapminder features ({', '.join(features)})...")
+        columns = list(gapminder_clean.columns)
+        gapminder_clean = derive_features(
+            gapminder_clean, features, lags=feature_lags, windows=feature_windows
+        )
+        derived = {
+            'kinds': list(features),
+            'lags': list(feature_lags),
+            'windows': list(feature_windows),
+            'columns': [col for col in gapminder_clean.columns if col not in columns]
+        }
+    if full_panel:
+        gapminder_clean = select_years(gapminder_clean, years)
     
-    happiness_output = os.path.join(processed_data_dir, 'happiness_2018_cleaned.csv')
-    gapminder_output = os.path.join(processed_data_dir, 'gapminder_2018_cleaned.csv')
+    happiness_outputs = write_partitions(
+        happiness_clean, 'happiness_clean', output_dir, fmt, export_csv
+    )
+    gapminder_outputs = write_partitions(
+        gapminder_clean, 'gapminder_clean', output_dir, fmt, export_csv
+    )
     
-    happiness_clean.to_csv(happiness_output, index=False)
-    gapminder_clean.to_csv(gapminder_output, index=False)
+    print(f"\nCleaned happiness data saved to: {', '.join(happiness_outputs)}")
+    print(f"Cleaned gapminder data saved to: {', '.join(gapminder_outputs)}")
     
-    print(f"\nCleaned happiness data saved to: {happiness_output}")
-    print(f"Cleaned gapminder data saved to: {gapminder_output}")
-    
-    save_provenance_info(happiness_path, gapminder_path, processed_data_dir)
+    save_provenance_info(happiness_paths, gapminder_path, output_dir, imputation, derived)
     
+    return happiness_clean, gapminder_clean
+
+def print_cleaning_summary(happiness_clean, gapminder_clean):
+    """Print a summary of the cleaned datasets"""
     print("\n" + "="*60)
     print("CLEANING SUMMARY")
     print("="*60)
+    print(f"\nYears: {format_years(happiness_clean['year'].unique())}")
     print(f"\nHappiness Dataset:")
     print(f"  - Countries: {len(happiness_clean)}")
     print(f"  - Variables: {len(happiness_clean.columns)}")
@@ -197,5 +397,18 @@ def main():
     
     print("\nData cleaning complete!")
 
+def main():
+    """Main execution function"""
+    raw_data_dir = 'data/raw'
+    processed_data_dir = 'data/processed'
+    
+    happiness_paths = happiness_raw_paths(DEFAULT_YEARS, raw_data_dir)
+    gapminder_path = os.path.join(raw_data_dir, 'gapminder_data_graphs.csv')
+    
+    happiness_clean, gapminder_clean = run_cleaning(
+        happiness_paths, gapminder_path, processed_data_dir
+    )
+    print_cleaning_summary(happiness_clean, gapminder_clean)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
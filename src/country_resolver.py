@@ -0,0 +1,265 @@
+"""
+Country Name Resolver for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Maps country names from any source onto the canonical (Gapminder) spelling
+used as the merge key. Names are resolved in order of confidence:
+
+  1. exact match against the reference names
+  2. match after normalization (case, accents, punctuation, '&')
+  3. the canonical alias table
+  4. fuzzy match through a character-trigram blocking index, accepted only
+     when it is both similar enough and clearly better than the runner-up
+
+Resolutions are cached in a JSON map keyed by raw name, so repeated runs
+against the same reference names skip the fuzzy search entirely. Cached
+fuzzy matches are only reused while the reference names claimed by exact
+matches are unchanged, so the result never depends on earlier runs.
+"""
+
+import os
+import json
+import hashlib
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+RESOLUTION_CACHE = 'country_resolution.json'
+
+# Minimum Dice similarity of trigram sets for a fuzzy match, and the lead it
+# must have over the second-best candidate
+FUZZY_THRESHOLD = 0.65
+FUZZY_MARGIN = 0.15
+
+# Alternative spellings -> canonical name (Gapminder spelling); every target
+# must be a Gapminder country name, or the alias can never match.
+# 'Northern Cyprus' is deliberately not mapped to 'Cyprus': both appear in the
+# Happiness data, and the mapping gave two Cyprus rows per year
+COUNTRY_ALIASES = {
+    'Palestinian Territories': 'Palestine',
+    'Congo (Brazzaville)': 'Congo, Rep.',
+    'Congo (Kinshasa)': 'Congo, Dem. Rep.',
+    'Trinidad & Tobago': 'Trinidad and Tobago',
+    'Ivory Coast': "Cote d'Ivoire",
+    'Slovakia': 'Slovak Republic',
+    'Macedonia': 'North Macedonia',
+    'Kyrgyzstan': 'Kyrgyz Republic',
+    'Hong Kong': 'Hong Kong, China',
+    'Hong Kong S.A.R., China': 'Hong Kong, China',
+    'Laos': 'Lao',
+    'Swaziland': 'Eswatini',
+    'Cabo Verde': 'Cape Verde',
+    'Czechia': 'Czech Republic',
+    'Korea, Rep.': 'South Korea',
+    'Republic of Korea': 'South Korea',
+    'United States of America': 'United States',
+    'USA': 'United States',
+    'UK': 'United Kingdom',
+    'Russian Federation': 'Russia',
+    'Egypt, Arab Rep.': 'Egypt',
+    'Iran, Islamic Rep.': 'Iran',
+    'Yemen, Rep.': 'Yemen',
+    'Gambia, The': 'Gambia',
+    'Bahamas, The': 'Bahamas',
+    'Brunei Darussalam': 'Brunei',
+    'Viet Nam': 'Vietnam',
+    'Saint Lucia': 'St. Lucia',
+    'Saint Vincent and the Grenadines': 'St. Vincent and the Grenadines',
+    'Turkiye': 'Turkey',
+}
+
+def normalize_name(name):
+    """Reduce a name to lowercase ASCII words for comparison"""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode()
+    name = name.lower().replace('&', ' and ')
+    return ' '.join(re.findall(r'[a-z0-9]+', name))
+
+_NORMALIZED_ALIASES = {normalize_name(alias): name for alias, name in COUNTRY_ALIASES.items()}
+
+def canonical_country_names(names):
+    """Strip a Series of country names and replace known aliases"""
+    names = names.str.strip()
+    return names.replace(COUNTRY_ALIASES)
+
+def trigrams(name):
+    """Character trigrams of a normalized name, padded at word boundaries"""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """Blocking index from trigrams to the reference names containing them"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.grams = [trigrams(normalize_name(name)) for name in self.names]
+        self.postings = defaultdict(list)
+        for idx, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings[gram].append(idx)
+
+    def candidates(self, name, exclude=()):
+        """Return (similarity, name) for every reference sharing a trigram, best first"""
+        grams = trigrams(normalize_name(name))
+        shared = Counter(idx for gram in grams for idx in self.postings.get(gram, ()))
+        scored = [
+            (2 * count / (len(grams) + len(self.grams[idx])), self.names[idx])
+            for idx, count in shared.items()
+            if self.names[idx] not in exclude
+        ]
+        return sorted(scored, key=lambda item: (-item[0], item[1]))
+
+    def best_match(self, name, exclude=(), threshold=FUZZY_THRESHOLD, margin=FUZZY_MARGIN):
+        """Return (name, similarity) of an unambiguous close match, or (None, best similarity)"""
+        scored = self.candidates(name, exclude)
+        if not scored:
+            return None, 0.0
+        best_score, best_name = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if best_score >= threshold and round(best_score - runner_up, 9) > margin:
+            return best_name, best_score
+        return None, best_score
+
+def reference_digest(reference):
+    """Fingerprint of a reference name set, used to invalidate cached resolutions"""
+    return hashlib.sha256('\n'.join(sorted(reference)).encode()).hexdigest()
+
+def load_resolution_cache(cache_path, reference, claimed):
+    """Load cached resolutions made against the same reference names
+
+    Fuzzy matches depend on the reference names other names claimed exactly,
+    so cached fuzzy and unmatched entries are dropped when the claimed set
+    has changed.
+    """
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('reference') != reference_digest(reference):
+        return {}
+    resolutions = cache.get('resolutions', {})
+    if cache.get('claimed') != reference_digest(claimed):
+        resolutions = {name: entry for name, entry in resolutions.items()
+                       if entry['method'] not in ('fuzzy', 'unmatched')}
+    return resolutions
+
+def save_resolution_cache(cache_path, reference, claimed, resolutions):
+    """Persist the resolution map for the next run"""
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump({'reference': reference_digest(reference), 'claimed': reference_digest(claimed),
+                   'resolutions': resolutions},
+                  f, indent=2, sort_keys=True)
+
+def confident_match(name, reference_set, by_normalized):
+    """Resolve a name by exact, normalized or alias match, or return None"""
+    if name in reference_set:
+        return {'country': name, 'method': 'exact', 'score': 1.0}
+    normalized = normalize_name(name)
+    if normalized in by_normalized:
+        return {'country': by_normalized[normalized], 'method': 'normalized', 'score': 1.0}
+    alias = _NORMALIZED_ALIASES.get(normalized)
+    if alias in reference_set:
+        return {'country': alias, 'method': 'alias', 'score': 1.0}
+    return None
+
+def resolve_names(names, reference, cache_path=None):
+    """Resolve raw names onto reference names
+
+    Returns a dict mapping each raw name to {'country', 'method', 'score'},
+    where 'country' is None for names that could not be resolved. Fuzzy
+    matches never claim a reference name that another raw name matched
+    exactly; reject_collisions removes the other renames that would give two
+    rows the same key.
+    """
+    reference = sorted(set(reference))
+    names = sorted(set(names))
+    reference_set = set(reference)
+    by_normalized = {normalize_name(name): name for name in reference}
+
+    resolutions = {}
+    unresolved = []
+    for name in names:
+        match = confident_match(name, reference_set, by_normalized)
+        if match is None:
+            unresolved.append(name)
+        else:
+            resolutions[name] = match
+    claimed = sorted({entry['country'] for entry in resolutions.values()})
+
+    cached = load_resolution_cache(cache_path, reference, claimed)
+    pending = [name for name in unresolved if name not in cached]
+    resolutions.update({name: cached[name] for name in unresolved if name in cached})
+
+    if pending:
+        index = TrigramIndex(reference)
+        exclude = set(claimed)
+        for name in pending:
+            match, score = index.best_match(name, exclude=exclude)
+            resolutions[name] = {
+                'country': match,
+                'method': 'fuzzy' if match else 'unmatched',
+                'score': round(score, 4)
+            }
+
+    if cache_path is not None and pending:
+        save_resolution_cache(cache_path, reference, claimed, {**cached, **resolutions})
+
+    return {name: resolutions[name] for name in names}
+
+def reject_collisions(resolutions, name_groups):
+    """Leave unmatched the renames that would give two names of a group one country
+
+    ``name_groups`` are the sets of names that share the rest of the key,
+    such as the countries of each year. Names that keep their spelling hold it
+    first; renames then claim their country in order of confidence and name,
+    and a rename whose country is already held in any of its groups becomes
+    {'country': None, 'method': 'duplicate'}. Returns the updated resolutions.
+    """
+    rank = {method: i for i, method in enumerate(['exact', 'normalized', 'alias', 'fuzzy'])}
+    renames = sorted(
+        (rank[entry['method']], name) for name, entry in resolutions.items()
+        if entry['country'] is not None and entry['country'] != name
+    )
+    renamed = {name for _, name in renames}
+    groups = [set(group) for group in name_groups]
+    held = [group - renamed for group in groups]
+
+    resolutions = dict(resolutions)
+    for _, name in renames:
+        target = resolutions[name]['country']
+        member = [i for i, group in enumerate(groups) if name in group]
+        if any(target in held[i] for i in member):
+            resolutions[name] = {'country': None, 'method': 'duplicate',
+                                 'score': resolutions[name]['score']}
+            target = name
+        for i in member:
+            held[i].add(target)
+    return resolutions
+
+def resolve_country_column(df, reference, country_col='country', cache_path=None,
+                           group_col='year'):
+    """Rewrite a frame's country names onto the reference spelling
+
+    Unresolved names are kept as they are, as are names whose rename would
+    collide with another country of the same ``group_col`` value (see
+    reject_collisions). Returns the new frame and the resolutions that
+    changed a name.
+    """
+    names = df[country_col].dropna()
+    resolutions = resolve_names(names.unique(), reference, cache_path)
+    if group_col in df.columns:
+        name_groups = names.astype(object).groupby(df[group_col], observed=True).unique()
+    else:
+        name_groups = [names.unique()]
+    resolutions = reject_collisions(resolutions, name_groups)
+    renamed = {name: entry['country'] for name, entry in resolutions.items()
+               if entry['country'] is not None and entry['country'] != name}
+
+    df = df.copy()
+    df[country_col] = df[country_col].replace(renamed)
+    changes = {name: resolutions[name] for name in sorted(renamed)}
+    return df, changes
@@ -0,0 +1,151 @@
+"""
+Derived Features for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Derives time-series indicators per country from the multi-year Gapminder
+panel:
+
+  - lag:    the value k years earlier (<column>_lag<k>)
+  - change: the change since the previous year (<column>_change)
+  - growth: the relative change since the previous year (<column>_growth)
+  - mean:   the mean over the last w years (<column>_mean<w>)
+  - std:    the sample standard deviation over the last w years (<column>_std<w>)
+
+Lags and windows follow calendar years, so a country missing a year gets a
+missing lag rather than an older value. Rolling statistics need an observed
+value in ``min_periods`` of the w years (all of them by default, as in
+pandas).
+
+The panel is sorted once by country and year, and every indicator is
+processed at the same time as one contiguous (rows x indicators) block. Each
+row gets a stamp (country code x stride + year) that increases through the
+sorted panel; the row k years earlier is found by a binary search for the
+stamp minus k, and the first row of a window by a search for the stamp minus
+w - 1. Rolling sums are differences of cumulative sums between those rows.
+The stride leaves a gap between countries wider than any lag or window, so no
+search crosses into another country and no per-country loop is needed.
+"""
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+from schemas import GAPMINDER_SCHEMA
+
+FEATURE_KINDS = ['lag', 'change', 'growth', 'mean', 'std']
+DEFAULT_LAGS = [1]
+DEFAULT_WINDOWS = [5]
+
+# Indicators features are derived from by default: the measurements of the Gapminder schema
+FEATURE_COLUMNS = [col for col, dtype in GAPMINDER_SCHEMA.items() if dtype.startswith('float')]
+
+def feature_names(columns, kinds, lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS):
+    """Names of the derived columns, grouped by kind in FEATURE_KINDS order"""
+    suffixes = []
+    for kind in FEATURE_KINDS:
+        if kind not in kinds:
+            continue
+        if kind == 'lag':
+            suffixes.extend(f'lag{k}' for k in lags)
+        elif kind in ('mean', 'std'):
+            suffixes.extend(f'{kind}{w}' for w in windows)
+        else:
+            suffixes.append(kind)
+    return [f'{col}_{suffix}' for suffix in suffixes for col in columns]
+
+def panel_stamps(df, key, time, reach):
+    """Sort order of a panel and the increasing row stamps of the sorted rows
+
+    ``reach`` is the largest distance in years that will be searched.
+    """
+    codes = pd.factorize(df[key])[0].astype(np.int64)
+    times = df[time].to_numpy().astype(np.int64)
+    order = np.lexsort((times, codes))
+    if not len(order):
+        return order, np.empty(0, dtype=np.int64)
+
+    stride = int(times.max() - times.min()) + reach + 1
+    stamps = codes[order] * stride + (times[order] - times.min())
+    if np.any(np.diff(stamps) == 0):
+        raise ValueError(f"Panel has more than one row for some {key} and {time}")
+    return order, stamps
+
+def _rows_back(stamps, years):
+    """Position of the row ``years`` earlier in the same group, or -1"""
+    target = stamps - years
+    found = np.minimum(np.searchsorted(stamps, target), len(stamps) - 1)
+    return np.where(stamps[found] == target, found, -1)
+
+def _take(block, rows):
+    """Rows of a block by position, NaN where the position is -1"""
+    taken = block[np.maximum(rows, 0)]
+    taken[rows < 0] = np.nan
+    return taken
+
+def _rolling(block, stamps, window, min_periods):
+    """Mean and sample standard deviation over the last ``window`` years of each row"""
+    observed = ~np.isnan(block)
+    # Centring keeps the cumulative sums of squares accurate
+    centred = np.where(observed, block - np.nanmean(block, axis=0), 0.0)
+    zeros = np.zeros((1, block.shape[1]))
+    counts = np.concatenate([zeros, np.cumsum(observed, axis=0)])
+    sums = np.concatenate([zeros, np.cumsum(centred, axis=0)])
+    squares = np.concatenate([zeros, np.cumsum(centred * centred, axis=0)])
+
+    start = np.searchsorted(stamps, stamps - (window - 1))
+    end = np.arange(1, len(stamps) + 1)
+    count = counts[end] - counts[start]
+    total = sums[end] - sums[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.maximum((squares[end] - squares[start]) - total * mean, 0) / (count - 1)
+    enough = count >= min_periods
+    mean = np.where(enough, mean + np.nanmean(block, axis=0), np.nan)
+    std = np.where(enough & (count >= 2), np.sqrt(variance), np.nan)
+    return mean, std
+
+@traced
+def derive_features(df, kinds=FEATURE_KINDS, columns=None, lags=DEFAULT_LAGS,
+                    windows=DEFAULT_WINDOWS, min_periods=None, key='country', time='year'):
+    """Add derived time-series columns to a panel with one row per ``key`` and ``time``
+
+    Returns the frame with the columns of feature_names appended as float32,
+    in the original row order. ``min_periods`` defaults to the window length.
+    """
+    unknown = [kind for kind in kinds if kind not in FEATURE_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown feature kinds: {', '.join(unknown)}")
+    if any(k < 1 for k in lags) or any(w < 1 for w in windows):
+        raise ValueError("Feature lags and windows must be at least one year")
+    columns = [col for col in (columns or FEATURE_COLUMNS) if col in df.columns]
+
+    order, stamps = panel_stamps(df, key, time, max([1, *lags, *windows]))
+    block = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+
+    parts = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if 'lag' in kinds:
+            parts.extend(_take(block, _rows_back(stamps, k)) for k in lags)
+        if 'change' in kinds or 'growth' in kinds:
+            previous = _take(block, _rows_back(stamps, 1))
+            if 'change' in kinds:
+                parts.append(block - previous)
+            if 'growth' in kinds:
+                parts.append(np.where(previous != 0, block / previous - 1, np.nan))
+    rolling = {
+        window: _rolling(block, stamps, window, min_periods or window)
+        for window in windows if 'mean' in kinds or 'std' in kinds
+    }
+    for statistic, kind in enumerate(['mean', 'std']):
+        if kind in kinds:
+            parts.extend(rolling[window][statistic] for window in windows)
+
+    names = feature_names(columns, kinds, lags, windows)
+    derived = np.empty((len(df), len(names)), dtype=np.float32)
+    if parts:
+        derived[order] = np.hstack(parts)
+    derived = pd.DataFrame(derived, index=df.index, columns=names)
+    print(f"Derived {len(names)} feature columns from {len(columns)} indicators "
+          f"over {len(df)} panel rows")
+    return pd.concat([df.drop(columns=names, errors='ignore'), derived], axis=1)
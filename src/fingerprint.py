@@ -0,0 +1,122 @@
+"""
+File Fingerprints for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Content hashes used for provenance records and stage caching. This module
+only depends on the standard library, so the workflow runner can fingerprint
+stages without importing the data stack.
+
+Files are read through one large reusable buffer, or memory mapped when they
+are big, and several files are hashed at once in threads (hashlib releases
+the GIL while it hashes). Digests are remembered in a JSON cache keyed on
+each file's path, size, modification time and inode, so an unchanged file is
+only stat'ed on later runs instead of being read again.
+"""
+
+import os
+import json
+import mmap
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_CACHE_FILENAME = 'file_hashes.json'
+BUFFER_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 64 * 1024 * 1024
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+# A file modified this recently may change again within the same mtime tick
+# without its size changing, so its digest is not cached yet
+RACY_WINDOW_NS = 2_000_000_000
+
+_cache_lock = threading.Lock()
+
+def hash_file(filepath):
+    """Calculate the SHA-256 hash of a file's contents, bypassing the cache"""
+    sha256_hash = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                for start in range(0, size, BUFFER_SIZE):
+                    sha256_hash.update(view[start:start + BUFFER_SIZE])
+                view.release()
+        else:
+            buffer = bytearray(BUFFER_SIZE)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                sha256_hash.update(view[:read])
+    return sha256_hash.hexdigest()
+
+def stat_key(filepath):
+    """Return the (size, mtime_ns, inode) triple that invalidates a cached digest"""
+    stat = os.stat(filepath)
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+def load_hash_cache(cache_path):
+    """Load cached digests, keyed by absolute path"""
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt cache only costs rehashing the files
+        return {}
+
+def save_hash_cache(cache, cache_path):
+    """Persist cached digests; the file is replaced atomically"""
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(temp_path, cache_path)
+
+def calculate_file_hashes(filepaths, cache_dir=None, workers=HASH_WORKERS):
+    """Calculate SHA-256 hashes of several files, keyed by the given paths
+
+    With a cache_dir, files whose size, mtime and inode match the cached
+    entry are not read; the others are hashed in up to ``workers`` threads
+    and their digests are cached.
+    """
+    cache_path = os.path.join(cache_dir, HASH_CACHE_FILENAME) if cache_dir else None
+    cache = load_hash_cache(cache_path)
+
+    digests, keys, pending = {}, {}, []
+    for path in dict.fromkeys(filepaths):
+        keys[path] = stat_key(path)
+        entry = cache.get(os.path.abspath(path))
+        if entry is not None and entry['stat'] == keys[path]:
+            digests[path] = entry['sha256']
+        else:
+            pending.append(path)
+
+    if pending:
+        if workers > 1 and len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                digests.update(zip(pending, pool.map(hash_file, pending)))
+        else:
+            digests.update((path, hash_file(path)) for path in pending)
+
+        if cache_path is not None:
+            settled = time.time_ns() - RACY_WINDOW_NS
+            fresh = {
+                os.path.abspath(path): {'stat': keys[path], 'sha256': digests[path]}
+                for path in pending
+                if keys[path][1] < settled and stat_key(path) == keys[path]
+            }
+            if fresh:
+                with _cache_lock:
+                    save_hash_cache({**load_hash_cache(cache_path), **fresh}, cache_path)
+
+    return {path: digests[path] for path in filepaths}
+
+def calculate_file_hash(filepath, cache_dir=None):
+    """Calculate SHA-256 hash of a file"""
+    return calculate_file_hashes([filepath], cache_dir)[filepath]
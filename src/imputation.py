@@ -0,0 +1,141 @@
+"""
+Panel Imputation for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Fills gaps in the Gapminder indicators using the whole multi-year panel
+rather than the processed years alone. Each gap is tried with the methods in
+order until one applies:
+
+  - interpolate: linear in time between the country's nearest observed years
+    before and after the gap
+  - ffill / bfill: the country's nearest observed value before / after it
+  - median: the median of the observed values of the same continent and year
+
+Interpolation and filling only use observations at most ``window`` years
+away, so long gaps are left to the continent-year median.
+
+Everything runs as grouped transforms over the sorted panel: the nearest
+observed value and year on each side come from one grouped forward fill and
+one grouped backward fill per column, with no loop over countries. Every
+imputed cell is recorded with the method that filled it.
+"""
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+from schemas import GAPMINDER_SCHEMA, to_float64
+
+IMPUTE_METHODS = ['interpolate', 'ffill', 'bfill', 'median']
+DEFAULT_WINDOW = 3
+
+# Indicators that are imputed by default: the measurements of the Gapminder schema
+IMPUTED_COLUMNS = [col for col, dtype in GAPMINDER_SCHEMA.items() if dtype.startswith('float')]
+
+IMPUTATION_LOG_FILENAME = 'imputed_cells.csv'
+
+def _nearest_observed(values, times, groups, direction):
+    """Value and time of the nearest observed row on one side, within each group"""
+    observed = ~np.isnan(values)
+    frame = pd.DataFrame({'value': values, 'time': np.where(observed, times, np.nan)})
+    grouped = frame.groupby(groups, sort=False)
+    nearest = grouped.ffill() if direction == 'before' else grouped.bfill()
+    return nearest['value'].to_numpy(), nearest['time'].to_numpy()
+
+def _impute_column(values, times, groups, strata, methods, window):
+    """Fill one sorted column; returns the filled values and the 1-based method of each filled cell"""
+    filled = values.copy()
+    method_of = np.zeros(len(values), dtype=np.int8)
+    before_value, before_time = _nearest_observed(values, times, groups, 'before')
+    after_value, after_time = _nearest_observed(values, times, groups, 'after')
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        near_before = times - before_time <= window
+        near_after = after_time - times <= window
+        for number, method in enumerate(methods, start=1):
+            if method == 'interpolate':
+                span = after_time - before_time
+                candidate = np.where(
+                    span > 0,
+                    before_value + (after_value - before_value) * (times - before_time) / span,
+                    before_value
+                )
+                usable = near_before & near_after
+            elif method == 'ffill':
+                candidate, usable = before_value, near_before
+            elif method == 'bfill':
+                candidate, usable = after_value, near_after
+            else:
+                candidate = pd.Series(values).groupby(strata, sort=False).transform('median').to_numpy()
+                usable = ~np.isnan(candidate)
+            fill = np.isnan(filled) & usable
+            filled[fill] = candidate[fill]
+            method_of[fill] = number
+    return filled, method_of
+
+@traced
+def impute_panel(df, methods=IMPUTE_METHODS, window=DEFAULT_WINDOW, columns=None,
+                 key='country', time='year', stratum='continent'):
+    """Fill gaps in a panel's indicator columns
+
+    ``df`` holds one row per ``key`` and ``time``; ``stratum`` groups keys
+    for the median fallback. Returns the imputed frame, in the original row
+    order and column types, and a log with one row per imputed cell: key,
+    time, column, method and value.
+    """
+    unknown = [method for method in methods if method not in IMPUTE_METHODS]
+    if unknown:
+        raise ValueError(f"Unknown imputation methods: {', '.join(unknown)}")
+    columns = [col for col in (columns or IMPUTED_COLUMNS) if col in df.columns]
+
+    keys = pd.factorize(df[key])[0]
+    times = df[time].to_numpy()
+    order = np.lexsort((times, keys))
+    groups = keys[order]
+    sorted_times = times[order].astype(np.float64)
+    strata = [pd.factorize(df[stratum])[0][order], sorted_times]
+
+    imputed, logs = {}, []
+    for col in columns:
+        # Filled values are cast back to the column type, so a plain widening is enough
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        filled, method_of = _impute_column(
+            values[order], sorted_times, groups, strata, methods, window
+        )
+        result = np.empty_like(values)
+        result[order] = filled
+        imputed[col] = pd.Series(result, index=df.index).astype(df[col].dtype)
+        stored = imputed[col].to_numpy()
+
+        # Logged in key and time order
+        rows = order[method_of > 0]
+        if len(rows):
+            logs.append(pd.DataFrame({
+                key: df[key].to_numpy()[rows],
+                time: times[rows],
+                'column': col,
+                'method': np.array(methods)[method_of[method_of > 0] - 1],
+                'value': to_float64(stored[rows])
+            }))
+
+    log_columns = [key, time, 'column', 'method', 'value']
+    log = pd.concat(logs, ignore_index=True) if logs else pd.DataFrame(columns=log_columns)
+    return df.assign(**imputed), log[log_columns]
+
+def imputation_summary(log):
+    """Count imputed cells per column and method"""
+    counts = log.groupby(['column', 'method'], observed=True).size()
+    summary = {}
+    for (col, method), count in counts.items():
+        summary.setdefault(col, {})[method] = int(count)
+    return summary
+
+def print_imputation_summary(df, log, columns=None):
+    """Print the remaining gaps and the imputed cells of every column"""
+    summary = imputation_summary(log)
+    columns = [col for col in (columns or IMPUTED_COLUMNS) if col in df.columns]
+    print(f"\nImputed {len(log)} cells:")
+    for col in columns:
+        methods = ', '.join(f"{method} {count}" for method, count in summary.get(col, {}).items())
+        print(f"  {col:<22} {methods or 'none'}; {int(df[col].isnull().sum())} still missing")
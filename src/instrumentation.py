@@ -0,0 +1,284 @@
+"""
+Run Instrumentation for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Collects a structured trace of a pipeline run. Stages and the functions
+decorated with @traced open nested spans that record:
+
+  - wall and CPU time
+  - the tracemalloc allocation peak above the span's starting point, when
+    memory tracing is requested (it slows allocation-heavy code down severalfold)
+  - the process RSS high-water mark when the span ends
+  - rows and columns of the DataFrames going in and out
+
+tracemalloc keeps one process-wide peak. When spans of different threads
+overlap, as stages do when they run concurrently, no span can tell its own
+allocations apart, so such spans are marked ``memory_overlapped`` and carry
+no peak of their own; the run's peak is reported in the summary instead.
+
+Spans are only recorded while a RunTrace is active, so traced functions cost
+one global lookup when they are called outside a traced run. The trace is
+saved as JSON next to the other processed reports, optionally with a cProfile
+dump and its hottest functions. cProfile and pstats are only imported when
+profiling is requested, to keep the runner's startup fast.
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+TRACE_FILENAME = 'run_trace.json'
+PROFILE_FILENAME = 'run_trace.prof'
+HOT_FUNCTION_COUNT = 20
+
+_active_trace = None
+
+def rss_peak_mb():
+    """Peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _frames(values):
+    """Find the DataFrames among values, looking one level into containers"""
+    frames = []
+    for value in values:
+        if hasattr(value, 'columns') and hasattr(value, 'shape'):
+            frames.append(value)
+        elif isinstance(value, (list, tuple)):
+            frames.extend(item for item in value
+                          if hasattr(item, 'columns') and hasattr(item, 'shape'))
+    return frames
+
+def frame_fields(direction, values):
+    """Row and column counts of the DataFrames among values, keyed by direction"""
+    frames = _frames(values)
+    if not frames:
+        return {}
+    shapes = [[int(frame.shape[0]), int(frame.shape[1])] for frame in frames]
+    return {
+        f'rows_{direction}': sum(rows for rows, _ in shapes),
+        f'frames_{direction}': shapes
+    }
+
+class RunTrace:
+    """Nested timing and memory spans of one pipeline run"""
+
+    def __init__(self, trace_memory=False, cprofile=False, metadata=None):
+        self.trace_memory = trace_memory
+        self.cprofile = cprofile
+        self.metadata = metadata or {}
+        self.spans = []
+        self.summary = {}
+        self.hot_functions = []
+        self.profiler = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Spans open in any thread, and the run itself, for handing up peaks
+        self._open = []
+        self._run = {}
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_span(self):
+        """Innermost open span of the calling thread, or None"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def activate(self):
+        """Make this the trace that stages and traced functions report into"""
+        global _active_trace
+        previous = _active_trace
+        _active_trace = self
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._run = {'_base': tracemalloc.get_traced_memory()[0], '_peak': 0}
+        if self.cprofile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+        started_at = datetime.now()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield self
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            self.summary = {
+                'started_at': started_at.isoformat(),
+                'finished_at': datetime.now().isoformat(),
+                'wall_seconds': round(time.perf_counter() - wall_start, 4),
+                'cpu_seconds': round(time.process_time() - cpu_start, 4),
+                'rss_peak_mb': round(rss_peak_mb(), 2)
+            }
+            if '_base' in self._run and tracemalloc.is_tracing():
+                peak = max(self._run['_peak'], tracemalloc.get_traced_memory()[1])
+                self.summary['tracemalloc_peak_mb'] = round((peak - self._run['_base']) / 2**20, 2)
+            if started_tracing:
+                tracemalloc.stop()
+            _active_trace = previous
+
+    @contextmanager
+    def span(self, name, kind='function', inputs=()):
+        """Time a block and attach its record to the enclosing span"""
+        record = {'name': name, 'kind': kind, 'status': 'ok', **frame_fields('in', inputs)}
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            record['_thread'] = threading.get_ident()
+            with self._lock:
+                current, peak_so_far = tracemalloc.get_traced_memory()
+                # Resetting the peak hides the peak so far from every open span, so hand it up first
+                self._hand_up(peak_so_far)
+                tracemalloc.reset_peak()
+                record['_base'] = record['_peak'] = current
+                for other in self._open:
+                    if other['_thread'] != record['_thread']:
+                        other['_overlap'] = record['_overlap'] = True
+                self._open.append(record)
+
+        stack.append(record)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except BaseException:
+            record['status'] = 'failed'
+            raise
+        finally:
+            stack.pop()
+            record['wall_seconds'] = round(time.perf_counter() - wall_start, 4)
+            record['cpu_seconds'] = round(time.process_time() - cpu_start, 4)
+            if tracing:
+                with self._lock:
+                    self._open.remove(record)
+                    peak = max(record.pop('_peak'), tracemalloc.get_traced_memory()[1])
+                    self._hand_up(peak)
+                base = record.pop('_base')
+                del record['_thread']
+                if record.pop('_overlap', False):
+                    record['memory_overlapped'] = True
+                else:
+                    record['tracemalloc_peak_mb'] = round((peak - base) / 2**20, 2)
+            record['rss_peak_mb'] = round(rss_peak_mb(), 2)
+            if 'calls' in record:
+                record['calls'] = record.pop('calls')
+
+            if parent is not None:
+                parent.setdefault('calls', []).append(record)
+            else:
+                with self._lock:
+                    self.spans.append(record)
+
+    def _hand_up(self, peak):
+        """Fold a tracemalloc peak into every open span and the run"""
+        for record in self._open + ([self._run] if self._run else []):
+            record['_peak'] = max(record['_peak'], peak)
+
+    def collect_hot_functions(self, count=HOT_FUNCTION_COUNT):
+        """Rank profiled functions by their own time"""
+        if self.profiler is None:
+            return []
+        import pstats
+        stats = pstats.Stats(self.profiler).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:count]
+        self.hot_functions = [
+            {
+                'function': f"{os.path.basename(filename)}:{line}({function})",
+                'calls': calls,
+                'own_seconds': round(own, 4),
+                'cumulative_seconds': round(cumulative, 4)
+            }
+            for (filename, line, function), (_, calls, own, cumulative, _) in ranked
+        ]
+        return self.hot_functions
+
+    def to_dict(self):
+        """Return the trace as a JSON-serializable dict"""
+        return {
+            **self.summary,
+            'trace_memory': self.trace_memory,
+            'metadata': self.metadata,
+            'stages': self.spans,
+            'hot_functions': self.hot_functions
+        }
+
+    def save(self, output_dir):
+        """Write the trace, and the cProfile dump if profiling, into output_dir"""
+        os.makedirs(output_dir, exist_ok=True)
+        if self.profiler is not None:
+            self.profiler.dump_stats(os.path.join(output_dir, PROFILE_FILENAME))
+            self.collect_hot_functions()
+
+        trace_path = os.path.join(output_dir, TRACE_FILENAME)
+        with open(trace_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return trace_path
+
+def active_trace():
+    """Return the RunTrace currently collecting spans, or None"""
+    return _active_trace
+
+@contextmanager
+def span(name, kind='function', inputs=()):
+    """Open a span in the active trace; records nothing when no trace is active"""
+    trace = _active_trace
+    if trace is None:
+        yield {}
+        return
+    with trace.span(name, kind, inputs) as record:
+        yield record
+
+def note(**values):
+    """Attach values to the innermost open span of the active trace"""
+    trace = _active_trace
+    record = trace.current_span() if trace is not None else None
+    if record is not None:
+        record.update(values)
+
+def note_frames(direction, *frames):
+    """Record the DataFrames flowing into ('in') or out of ('out') the current span"""
+    note(**frame_fields(direction, frames))
+
+def traced(func):
+    """Record every call of func as a span of the active trace"""
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = _active_trace
+        if trace is None:
+            return func(*args, **kwargs)
+        with trace.span(name, inputs=list(args) + list(kwargs.values())) as record:
+            result = func(*args, **kwargs)
+            record.update(frame_fields('out', [result]))
+            return result
+    return wrapper
+
+def print_trace_summary(trace):
+    """Print one line per stage of a finished trace"""
+    print(f"{'Stage':<28}{'Status':<10}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak (MB)':>11}")
+    for record in trace.spans:
+        peak = record.get('tracemalloc_peak_mb')
+        print(f"{record['name']:<28}{record['status']:<10}{record['wall_seconds']:>10.3f}"
+              f"{record['cpu_seconds']:>10.3f}{peak if peak is not None else '-':>11}")
+    if any(record.get('memory_overlapped') for record in trace.spans):
+        print(f"Stages overlapped, so only the run's allocation peak is known: "
+              f"{trace.summary.get('tracemalloc_peak_mb', '-')} MB")
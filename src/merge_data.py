@@ -4,57 +4,93 @@ Author: Gregorius Aviantoro
 Date: November 2025
 """
 
-import pandas as pd
 import os
 from datetime import datetime
 import json
 
-def load_cleaned_datasets():
-    """Load the cleaned datasets"""
+from instrumentation import traced
+from merge_engine import join_on_keys, take_joined
+from schemas import apply_schema, memory_usage_report
+from country_resolver import RESOLUTION_CACHE, resolve_country_column
+from storage import DEFAULT_FORMAT, DEFAULT_YEARS, write_partitions, read_partitions
+
+MERGE_KEYS = ['country', 'year']
+
+def load_cleaned_datasets(years=DEFAULT_YEARS, fmt=DEFAULT_FORMAT):
+    """Load the cleaned datasets for the requested years"""
     print("Loading cleaned datasets...")
     processed_dir = 'data/processed'
     
-    happiness_path = os.path.join(processed_dir, 'happiness_2018_cleaned.csv')
-    gapminder_path = os.path.join(processed_dir, 'gapminder_2018_cleaned.csv')
-    
-    happiness_df = pd.read_csv(happiness_path)
-    gapminder_df = pd.read_csv(gapminder_path)
+    happiness_df = read_partitions('happiness_clean', years, processed_dir, fmt)
+    gapminder_df = read_partitions('gapminder_clean', years, processed_dir, fmt)
     
     print(f"Happiness dataset: {len(happiness_df)} countries")
     print(f"Gapminder dataset: {len(gapminder_df)} countries")
     
     return happiness_df, gapminder_df
 
-def merge_datasets(happiness_df, gapminder_df):
-    """Merge the two datasets on country name"""
-    print("\nMerging datasets on 'country' column...")
-    
-    merged_df = pd.merge(
-        happiness_df,
-        gapminder_df,
-        on='country',
-        how='inner'
+@traced
+def resolve_countries(happiness_df, gapminder_df, output_dir):
+    """Resolve Happiness country names onto the Gapminder spelling before merging
+
+    The resolution map is cached in ``output_dir`` and reused by later runs.
+    Returns the renamed Happiness frame and the names that were changed.
+    """
+    print("\nResolving country names against the Gapminder dataset...")
+    happiness_df, changes = resolve_country_column(
+        happiness_df, gapminder_df['country'].unique(),
+        cache_path=os.path.join(output_dir, RESOLUTION_CACHE)
     )
+    for name, entry in changes.items():
+        print(f"  {name} -> {entry['country']} ({entry['method']}, score {entry['score']:.2f})")
+    if not changes:
+        print("  All country names already match")
+    
+    return happiness_df, changes
+
+@traced
+def merge_datasets(happiness_df, gapminder_df):
+    """Merge the two datasets on country name within each year
+
+    Columns outside the merged schema, such as the features derived during
+    cleaning, are carried over as they are. Returns the merged frame and the
+    key join (see merge_engine.join_on_keys), which also records the
+    unmatched rows of each dataset.
+    """
+    print("\nMerging datasets on 'country' and 'year' columns...")
+    
+    join = join_on_keys(happiness_df, gapminder_df, MERGE_KEYS)
+    merged_df = apply_schema(take_joined(happiness_df, gapminder_df, join, MERGE_KEYS), 'merged')
     
     print(f"Merged dataset: {len(merged_df)} countries successfully matched")
     
-    return merged_df
+    return merged_df, join
 
-def analyze_merge_quality(happiness_df, gapminder_df, merged_df):
-    """Analyze the quality of the merge"""
+def merge_key_labels(df, include_year):
+    """Return the distinct merge keys of a frame, formatted for reports"""
+    if not include_year:
+        return list(df['country'].drop_duplicates())
+    keys = df[MERGE_KEYS].drop_duplicates()
+    return [f"{country} ({year})" for country, year in keys.itertuples(index=False)]
+
+@traced
+def analyze_merge_quality(happiness_df, gapminder_df, merged_df, join):
+    """Analyze the quality of the merge from the rows the join left unmatched"""
     print("\n" + "="*60)
     print("MERGE QUALITY ANALYSIS")
     print("="*60)
     
-    happiness_only = set(happiness_df['country']) - set(gapminder_df['country'])
+    include_year = happiness_df['year'].nunique() > 1
+    happiness_only = merge_key_labels(happiness_df.iloc[join['left_only']], include_year)
+    gapminder_only = merge_key_labels(gapminder_df.iloc[join['right_only']], include_year)
+    
     print(f"\nCountries in Happiness dataset only: {len(happiness_only)}")
     if len(happiness_only) > 0 and len(happiness_only) <= 10:
-        print("  " + ", ".join(sorted(list(happiness_only))))
+        print("  " + ", ".join(sorted(happiness_only)))
     
-    gapminder_only = set(gapminder_df['country']) - set(happiness_df['country'])
     print(f"\nCountries in Gapminder dataset only: {len(gapminder_only)}")
     if len(gapminder_only) > 0 and len(gapminder_only) <= 10:
-        print("  " + ", ".join(sorted(list(gapminder_only))))
+        print("  " + ", ".join(sorted(gapminder_only)))
     
     success_rate = (len(merged_df) / len(happiness_df)) * 100
     print(f"\nMerge success rate: {success_rate:.1f}%")
@@ -68,18 +104,17 @@ def analyze_merge_quality(happiness_df, gapminder_df, merged_df):
         print("  No missing values!")
     
     return {
-        'happiness_only': list(happiness_only),
-        'gapminder_only': list(gapminder_only),
+        'happiness_only': happiness_only,
+        'gapminder_only': gapminder_only,
         'merge_success_rate': success_rate,
         'merged_country_count': len(merged_df)
     }
 
-def save_merged_dataset(merged_df, output_dir):
-    """Save the merged dataset"""
-    output_path = os.path.join(output_dir, 'happiness_economy_2018.csv')
-    merged_df.to_csv(output_path, index=False)
-    print(f"\nMerged dataset saved to: {output_path}")
-    return output_path
+def save_merged_dataset(merged_df, output_dir, fmt=DEFAULT_FORMAT, export_csv=False):
+    """Save the merged dataset as one file per year"""
+    output_paths = write_partitions(merged_df, 'merged', output_dir, fmt, export_csv)
+    print(f"\nMerged dataset saved to: {', '.join(output_paths)}")
+    return output_paths
 
 def save_merge_report(merge_quality, output_dir):
     """Save a report about the merge"""
@@ -103,6 +138,10 @@ def generate_summary_statistics(merged_df):
     print(f"\nTotal countries: {len(merged_df)}")
     print(f"Total variables: {len(merged_df.columns)}")
     
+    if merged_df['year'].nunique() > 1:
+        print(f"\nCountries per year:")
+        print(merged_df['year'].value_counts().sort_index())
+    
     print(f"\nContinents represented:")
     print(merged_df['continent'].value_counts())
     
@@ -113,22 +152,31 @@ def generate_summary_statistics(merged_df):
     if 'hdi' in merged_df.columns:
         print(f"  Average HDI: {merged_df['hdi'].mean():.3f}")
 
-def main():
-    """Main execution function"""
-    processed_dir = 'data/processed'
-    
-    happiness_df, gapminder_df = load_cleaned_datasets()
-    merged_df = merge_datasets(happiness_df, gapminder_df)
-    merge_quality = analyze_merge_quality(happiness_df, gapminder_df, merged_df)
-    save_merged_dataset(merged_df, processed_dir)
-    save_merge_report(merge_quality, processed_dir)
+def run_integration(happiness_df, gapminder_df, output_dir, fmt=DEFAULT_FORMAT,
+                    export_csv=False):
+    """Merge the cleaned datasets, save the published outputs and return the merged frame"""
+    happiness_df, resolved_countries = resolve_countries(happiness_df, gapminder_df, output_dir)
+    merged_df, join = merge_datasets(happiness_df, gapminder_df)
+    merge_quality = analyze_merge_quality(happiness_df, gapminder_df, merged_df, join)
+    merge_quality['resolved_countries'] = resolved_countries
+    merge_quality['memory_usage'] = memory_usage_report(merged_df)
+    save_merged_dataset(merged_df, output_dir, fmt, export_csv)
+    save_merge_report(merge_quality, output_dir)
     generate_summary_statistics(merged_df)
     
     print("\n" + "="*60)
     print("INTEGRATION COMPLETE")
     print("="*60)
     print("\nAll files have been successfully merged!")
+    
+    return merged_df
+
+def main():
+    """Main execution function"""
+    processed_dir = 'data/processed'
+    
+    happiness_df, gapminder_df = load_cleaned_datasets()
+    run_integration(happiness_df, gapminder_df, processed_dir)
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
@@ -5,43 +5,55 @@ Date: November 2025
 """
 
 import pandas as pd
-import numpy as np
 import os
 from datetime import datetime
 import json
+from functools import partial
 
-def load_cleaned_data():
-    """Load the cleaned datasets"""
+from instrumentation import traced
+from profile_engine import compute_profile, compute_profiles
+from quality_rules import (
+    RuleState, check_rule_states, check_rules, merge_rule_states, print_rule_report
+)
+from schemas import memory_usage_from_counts, memory_usage_report
+from storage import (
+    DEFAULT_FORMAT, DEFAULT_YEARS, format_years, iter_partition_chunks, read_partitions
+)
+
+DEFAULT_CHUNKSIZE = 100_000
+
+DESCRIBE_ROWS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+def load_cleaned_data(years=DEFAULT_YEARS, fmt=DEFAULT_FORMAT):
+    """Load the cleaned datasets for the requested years"""
     processed_dir = 'data/processed'
     
-    happiness_path = os.path.join(processed_dir, 'happiness_2018_cleaned.csv')
-    gapminder_path = os.path.join(processed_dir, 'gapminder_2018_cleaned.csv')
-    
-    happiness_df = pd.read_csv(happiness_path)
-    gapminder_df = pd.read_csv(gapminder_path)
+    happiness_df = read_partitions('happiness_clean', years, processed_dir, fmt)
+    gapminder_df = read_partitions('gapminder_clean', years, processed_dir, fmt)
     
     return happiness_df, gapminder_df
 
-def generate_descriptive_stats(df, dataset_name):
+def generate_descriptive_stats(df, dataset_name, profile=None):
     """Generate descriptive statistics for numeric columns"""
     print(f"\n{'='*60}")
     print(f"DESCRIPTIVE STATISTICS: {dataset_name}")
     print('='*60)
     
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    stats = df[numeric_cols].describe()
+    profile = profile or compute_profile(df)
+    stats = profile['numeric'][DESCRIBE_ROWS].T
     print(stats)
     
     return stats
 
-def analyze_missing_values(df, dataset_name):
+def analyze_missing_values(df, dataset_name, profile=None):
     """Analyze patterns in missing values"""
     print(f"\n{'='*60}")
     print(f"MISSING VALUE ANALYSIS: {dataset_name}")
     print('='*60)
     
-    missing_count = df.isnull().sum()
-    missing_pct = (missing_count / len(df) * 100).round(2)
+    profile = profile or compute_profile(df)
+    missing_count = profile['null_count']
+    missing_pct = (missing_count / profile['row_count'] * 100).round(2)
     
     missing_df = pd.DataFrame({
         'Missing_Count': missing_count,
@@ -59,42 +71,65 @@ def analyze_missing_values(df, dataset_name):
     
     return missing_df
 
-def analyze_data_types(df, dataset_name):
+def analyze_data_types(df, dataset_name, profile=None):
     """Analyze data types and structure"""
     print(f"\n{'='*60}")
     print(f"DATA TYPE ANALYSIS: {dataset_name}")
     print('='*60)
     
+    profile = profile or compute_profile(df)
     dtype_summary = pd.DataFrame({
-        'Column': df.columns,
-        'Data_Type': df.dtypes.values,
-        'Non_Null_Count': df.count().values,
-        'Unique_Values': [df[col].nunique() for col in df.columns]
+        'Column': profile['dtypes'].index,
+        'Data_Type': profile['dtypes'].values,
+        'Non_Null_Count': profile['non_null_count'].values,
+        'Unique_Values': profile['unique'].values
     })
     
     print(dtype_summary)
     return dtype_summary
 
-def analyze_distributions(df, dataset_name):
+def analyze_memory_usage(df, dataset_name, profile=None):
+    """Compare the typed frame's memory with the object/float64/int64 layout
+
+    Without a frame the report is computed from the profile's column types and
+    counts (see schemas.memory_usage_from_counts).
+    """
+    print(f"\n{'='*60}")
+    print(f"MEMORY USAGE: {dataset_name}")
+    print('='*60)
+    
+    if df is not None:
+        report = memory_usage_report(df)
+    else:
+        report = memory_usage_from_counts(profile['dtypes'], profile['row_count'],
+                                          profile['value_counts'], profile['null_count'])
+    memory_summary = pd.DataFrame.from_dict(report['columns'], orient='index')
+    memory_summary.columns = ['Data_Type', 'Bytes', 'Legacy_Bytes']
+    print(memory_summary)
+    print(f"Total: {report['total_bytes']:,} bytes "
+          f"(legacy layout {report['legacy_total_bytes']:,} bytes, {report['saved_pct']}% saved)")
+    
+    return report
+
+def analyze_distributions(df, dataset_name, profile=None):
     """Analyze distributions of key numeric variables"""
     print(f"\n{'='*60}")
     print(f"DISTRIBUTION ANALYSIS: {dataset_name}")
     print('='*60)
     
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    profile = profile or compute_profile(df)
     distribution_info = {}
     
-    for col in numeric_cols:
-        data = df[col].dropna()
-        if len(data) > 0:
+    for col, stats in profile['numeric'].iterrows():
+        if stats['count'] > 0:
             distribution_info[col] = {
-                'mean': float(data.mean()),
-                'median': float(data.median()),
-                'std': float(data.std()),
-                'min': float(data.min()),
-                'max': float(data.max()),
-                'skewness': float(data.skew()),
-                'kurtosis': float(data.kurtosis())
+                'mean': float(stats['mean']),
+                'median': float(stats['median']),
+                'std': float(stats['std']),
+                'min': float(stats['min']),
+                'max': float(stats['max']),
+                'skewness': float(stats['skewness']),
+                'kurtosis': float(stats['kurtosis'])
             }
             
             print(f"\n{col}:")
@@ -106,37 +141,40 @@ def analyze_distributions(df, dataset_name):
     
     return distribution_info
 
-def check_data_quality(df, dataset_name):
+def check_data_quality(df, dataset_name, profile=None):
     """Perform data quality checks"""
     print(f"\n{'='*60}")
     print(f"DATA QUALITY CHECKS: {dataset_name}")
     print('='*60)
     
+    profile = profile or compute_profile(df)
     quality_report = {}
     
-    duplicates = df.duplicated().sum()
-    quality_report['duplicate_rows'] = int(duplicates)
-    print(f"Duplicate rows: {duplicates}")
+    duplicates = profile['duplicate_rows']
+    if duplicates is None:
+        # Streamed datasets with many distinct rows only keep a sketch of the row hashes
+        quality_report['duplicate_rows'] = None
+        print("Duplicate rows: unknown (too many distinct rows to count exactly)")
+    else:
+        quality_report['duplicate_rows'] = int(duplicates)
+        print(f"Duplicate rows: {duplicates}")
     
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    numeric = profile['numeric']
     negative_checks = {}
     
-    for col in numeric_cols:
-        negative_count = (df[col] < 0).sum()
+    for col, negative_count in numeric['negative_count'].items():
         if negative_count > 0:
             negative_checks[col] = int(negative_count)
             print(f"Negative values in {col}: {negative_count}")
     
     quality_report['negative_values'] = negative_checks
     
-    outlier_info = {}
-    for col in numeric_cols:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        outliers = ((df[col] < (Q1 - 1.5 * IQR)) | (df[col] > (Q3 + 1.5 * IQR))).sum()
-        if outliers > 0:
-            outlier_info[col] = int(outliers)
+    # IQR bounds come from the quartiles already computed by the profile
+    outlier_info = {
+        col: int(outliers)
+        for col, outliers in numeric['outlier_count'].items()
+        if outliers > 0
+    }
     
     quality_report['potential_outliers'] = outlier_info
     
@@ -147,20 +185,20 @@ def check_data_quality(df, dataset_name):
     
     return quality_report
 
-def analyze_categorical_variables(df, dataset_name):
+def analyze_categorical_variables(df, dataset_name, profile=None):
     """Analyze categorical variables"""
     print(f"\n{'='*60}")
     print(f"CATEGORICAL VARIABLE ANALYSIS: {dataset_name}")
     print('='*60)
     
-    categorical_cols = df.select_dtypes(include=['object']).columns
+    profile = profile or compute_profile(df)
     cat_summary = {}
     
-    for col in categorical_cols:
-        unique_count = df[col].nunique()
+    for col, value_counts in profile['value_counts'].items():
+        unique_count = len(value_counts)
         cat_summary[col] = {
             'unique_values': int(unique_count),
-            'top_values': df[col].value_counts().head(5).to_dict()
+            'top_values': value_counts.head(5).to_dict()
         }
         
         print(f"\n{col}:")
@@ -171,9 +209,36 @@ def analyze_categorical_variables(df, dataset_name):
     
     return cat_summary
 
-def generate_profile_report(happiness_df, gapminder_df, output_dir):
-    """Generate comprehensive profile report"""
+def profile_dataset(df, dataset_name, profile=None):
+    """Build every report section for one dataset from a single statistics pass"""
+    profile = profile or compute_profile(df)
     
+    section = {}
+    section['descriptive_stats'] = generate_descriptive_stats(
+        df, dataset_name, profile
+    ).to_dict()
+    missing_result = analyze_missing_values(df, dataset_name, profile)
+    section['missing_values'] = missing_result.to_dict() if not missing_result.empty else {}
+    section['data_types'] = analyze_data_types(df, dataset_name, profile).to_dict()
+    section['memory_usage'] = analyze_memory_usage(df, dataset_name, profile)
+    section['distributions'] = analyze_distributions(df, dataset_name, profile)
+    section['quality_checks'] = check_data_quality(df, dataset_name, profile)
+    section['categorical_analysis'] = analyze_categorical_variables(df, dataset_name, profile)
+    return section
+
+def save_profile_report(report, output_dir):
+    """Write the profile report to JSON"""
+    report_path = os.path.join(output_dir, 'data_profile_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    
+    print(f"\nComplete profile report saved to: {report_path}")
+    return report_path
+
+@traced
+def build_profile_report(happiness_name, gapminder_name, happiness_df=None, gapminder_df=None,
+                         happiness_profile=None, gapminder_profile=None):
+    """Assemble the report from frames and/or precomputed profiles"""
     report = {
         'generation_timestamp': datetime.now().isoformat(),
         'happiness_dataset': {},
@@ -185,58 +250,112 @@ def generate_profile_report(happiness_df, gapminder_df, output_dir):
     print("="*60)
     
     print("\n\n### HAPPINESS DATASET ###\n")
-    report['happiness_dataset']['descriptive_stats'] = generate_descriptive_stats(
-        happiness_df, "Happiness 2018"
-    ).to_dict()
-    missing_result = analyze_missing_values(happiness_df, "Happiness 2018")
-    report['happiness_dataset']['missing_values'] = missing_result.to_dict() if not missing_result.empty else {}
-    report['happiness_dataset']['data_types'] = analyze_data_types(
-        happiness_df, "Happiness 2018"
-    ).to_dict()
-    report['happiness_dataset']['distributions'] = analyze_distributions(
-        happiness_df, "Happiness 2018"
-    )
-    report['happiness_dataset']['quality_checks'] = check_data_quality(
-        happiness_df, "Happiness 2018"
-    )
-    report['happiness_dataset']['categorical_analysis'] = analyze_categorical_variables(
-        happiness_df, "Happiness 2018"
-    )
+    report['happiness_dataset'] = profile_dataset(happiness_df, happiness_name, happiness_profile)
     
     print("\n\n### GAPMINDER DATASET ###\n")
-    report['gapminder_dataset']['descriptive_stats'] = generate_descriptive_stats(
-        gapminder_df, "Gapminder 2018"
-    ).to_dict()
-    missing_result = analyze_missing_values(gapminder_df, "Gapminder 2018")
-    report['gapminder_dataset']['missing_values'] = missing_result.to_dict() if not missing_result.empty else {}
-    report['gapminder_dataset']['data_types'] = analyze_data_types(
-        gapminder_df, "Gapminder 2018"
-    ).to_dict()
-    report['gapminder_dataset']['distributions'] = analyze_distributions(
-        gapminder_df, "Gapminder 2018"
-    )
-    report['gapminder_dataset']['quality_checks'] = check_data_quality(
-        gapminder_df, "Gapminder 2018"
+    report['gapminder_dataset'] = profile_dataset(gapminder_df, gapminder_name, gapminder_profile)
+    
+    return report
+
+def generate_profile_report(happiness_df, gapminder_df, output_dir, workers=1,
+                            executor='thread'):
+    """Generate comprehensive profile report
+
+    With ``workers`` above 1 both datasets, and groups of their columns, are
+    profiled concurrently on a 'thread' or 'process' pool. The sections are
+    still rendered in order, so the report is identical to a serial run.
+    """
+    happiness_name = f"Happiness {format_years(happiness_df['year'].unique())}"
+    gapminder_name = f"Gapminder {format_years(gapminder_df['year'].unique())}"
+    
+    if workers > 1:
+        print(f"Profiling datasets with {workers} {executor} workers...")
+    happiness_profile, gapminder_profile = compute_profiles(
+        [happiness_df, gapminder_df], workers, executor
     )
-    report['gapminder_dataset']['categorical_analysis'] = analyze_categorical_variables(
-        gapminder_df, "Gapminder 2018"
+    report = build_profile_report(
+        happiness_name, gapminder_name, happiness_df=happiness_df, gapminder_df=gapminder_df,
+        happiness_profile=happiness_profile, gapminder_profile=gapminder_profile
     )
-    
-    report_path = os.path.join(output_dir, 'data_profile_report.json')
-    with open(report_path, 'w') as f:
-        json.dump(report, f, indent=2, default=str)
-    
-    print(f"\nComplete profile report saved to: {report_path}")
+    add_rule_checks(report, happiness_df, gapminder_df)
+    save_profile_report(report, output_dir)
     return report
 
-def main():
-    """Main execution function"""
-    print("Loading cleaned datasets...")
-    happiness_df, gapminder_df = load_cleaned_data()
+def add_rule_checks(report, happiness_df, gapminder_df):
+    """Check the declared quality rules and add the results to each dataset's quality checks"""
+    rule_report = check_rules({'happiness_clean': happiness_df, 'gapminder_clean': gapminder_df})
+    print_rule_report(rule_report)
+    for section, dataset in [('happiness_dataset', 'happiness_clean'),
+                             ('gapminder_dataset', 'gapminder_clean')]:
+        report[section]['quality_checks']['rules'] = rule_report[dataset]
+
+def stream_partition(dataset, year, processed_dir, fmt=DEFAULT_FORMAT,
+                     chunksize=DEFAULT_CHUNKSIZE):
+    """Stream one year partition of a cleaned dataset once into its profile and rule states"""
+    from streaming_profile import StreamingProfile
+    
+    profile, rules = StreamingProfile(), RuleState(dataset)
+    for chunk in iter_partition_chunks(dataset, [year], processed_dir, fmt, chunksize):
+        profile.update(chunk)
+        rules.update(chunk)
+    return profile, rules
+
+def add_streaming_rule_checks(report, rule_states, read_chunks):
+    """Finish streamed rule checks and add the results to each dataset's quality checks"""
+    rule_report = check_rule_states(rule_states, read_chunks)
+    print_rule_report(rule_report)
+    for section, dataset in [('happiness_dataset', 'happiness_clean'),
+                             ('gapminder_dataset', 'gapminder_clean')]:
+        report[section]['quality_checks']['rules'] = rule_report[dataset]
+
+@traced
+def generate_streaming_profile_report(years, output_dir, fmt=DEFAULT_FORMAT,
+                                      chunksize=DEFAULT_CHUNKSIZE, processed_dir='data/processed'):
+    """Generate the profile report by streaming the cleaned partitions in chunks
+
+    Only mergeable running state is kept in memory (see streaming_profile and
+    quality_rules.RuleState), so datasets larger than memory can be profiled.
+    The report has the same schema as generate_profile_report; quartiles, the
+    median, outlier counts and numeric Unique_Values become estimates once a
+    column holds more values than the sketches keep exactly, and the duplicate
+    row count is null once a dataset has more distinct rows than the row sketch
+    counts exactly. The quality rules are checked exactly; unique and
+    reference rules keep the key columns of every row. Each year partition is
+    profiled on its own and the states are merged in year order, so
+    append_year can rebuild the same report from stored per-year states.
+    """
+    from streaming_profile import merge_profiles
+    
+    print(f"Streaming cleaned datasets in chunks of {chunksize:,} rows...")
+    datasets = ('happiness_clean', 'gapminder_clean')
+    partitions = {
+        dataset: [stream_partition(dataset, year, processed_dir, fmt, chunksize)
+                  for year in sorted(years)]
+        for dataset in datasets
+    }
+    profiles = {dataset: merge_profiles(profile for profile, _ in states)
+                for dataset, states in partitions.items()}
     
-    processed_dir = 'data/processed'
-    report = generate_profile_report(happiness_df, gapminder_df, processed_dir)
+    report = build_profile_report(
+        f"Happiness {format_years(years)}", f"Gapminder {format_years(years)}",
+        happiness_profile=profiles['happiness_clean'].to_profile(),
+        gapminder_profile=profiles['gapminder_clean'].to_profile()
+    )
+    add_streaming_rule_checks(
+        report,
+        {dataset: merge_rule_states(rules for _, rules in states)
+         for dataset, states in partitions.items()},
+        {dataset: partial(iter_partition_chunks, dataset, years, processed_dir, fmt, chunksize)
+         for dataset in datasets}
+    )
+    save_profile_report(report, output_dir)
     
+    print(f"\nHappiness Dataset: {profiles['happiness_clean'].row_count} rows streamed")
+    print(f"Gapminder Dataset: {profiles['gapminder_clean'].row_count} rows streamed")
+    return report
+
+def print_profile_summary(happiness_df, gapminder_df):
+    """Print a summary of the profiled datasets"""
     print("\n" + "="*60)
     print("PROFILING COMPLETE")
     print("="*60)
@@ -244,5 +363,14 @@ def main():
     print(f"Gapminder Dataset: {len(gapminder_df)} countries, {len(gapminder_df.columns)} variables")
     print("\nAll profiling tasks completed successfully!")
 
+def main():
+    """Main execution function"""
+    print("Loading cleaned datasets...")
+    happiness_df, gapminder_df = load_cleaned_data()
+    
+    processed_dir = 'data/processed'
+    generate_profile_report(happiness_df, gapminder_df, processed_dir)
+    print_profile_summary(happiness_df, gapminder_df)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
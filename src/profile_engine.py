@@ -0,0 +1,267 @@
+"""
+Single-Pass Profiling Engine for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Computes every per-column statistic used by the profile report (moments,
+quantiles, null counts, cardinality, negative values and IQR outliers) from
+one float64 block of the numeric columns. Each column is sorted once and all
+statistics are derived from the sorted block with vectorized NumPy operations,
+so the report sections share one set of results instead of rescanning the data.
+
+The formulas mirror pandas (sample std, bias-corrected skewness and excess
+kurtosis, linear-interpolated quantiles), so report values are unchanged up to
+floating-point rounding in the last digit.
+
+Several frames can be profiled at once across a thread or process pool: the
+numeric columns are split into groups and every group, duplicate check and
+value count becomes a task. Every statistic is computed per column, so the
+results are assembled in frame order and are identical to a serial run.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+from scheduler import process_pool_context
+from schemas import to_float64
+
+QUANTILES = [0.25, 0.5, 0.75]
+
+def _lerp(low, high, weight):
+    """Linear interpolation in the same form as numpy.percentile"""
+    diff = high - low
+    return np.where(weight >= 0.5, high - diff * (1 - weight), low + diff * weight)
+
+def _sorted_quantiles(sorted_block, counts, q):
+    """Linear-interpolated quantile of every column of a NaN-last sorted block"""
+    position = q * (counts - 1)
+    low_idx = np.floor(position).astype(np.int64)
+    high_idx = np.minimum(low_idx + 1, counts - 1)
+    columns = np.arange(sorted_block.shape[1])
+    low = sorted_block[np.maximum(low_idx, 0), columns]
+    high = sorted_block[np.maximum(high_idx, 0), columns]
+    return _lerp(low, high, position - low_idx)
+
+def _sorted_medians(sorted_block, counts):
+    """Median of every column of a NaN-last sorted block, as numpy.median computes it"""
+    columns = np.arange(sorted_block.shape[1])
+    upper = sorted_block[np.maximum(counts // 2, 0), columns]
+    lower = sorted_block[np.maximum((counts - 1) // 2, 0), columns]
+    return np.where(counts % 2 == 1, upper, (lower + upper) / 2)
+
+def _zero_out_fperr(values):
+    """Treat floating point noise around zero as zero, like pandas does"""
+    return np.where(np.abs(values) < 1e-14, 0, values)
+
+def compute_numeric_profile(block, columns):
+    """Compute all statistics of a 2-D float64 block (rows x columns) in one pass
+
+    Returns a DataFrame indexed by column name.
+    """
+    block = np.asfortranarray(block, dtype=np.float64)
+    valid = ~np.isnan(block)
+    counts = valid.sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        filled = np.where(valid, block, 0.0)
+        means = filled.sum(axis=0) / counts
+
+        centered = np.where(valid, means - block, 0.0)
+        squared = centered ** 2
+        m2 = squared.sum(axis=0)
+        m3 = -(squared * centered).sum(axis=0)
+        m4 = (squared ** 2).sum(axis=0)
+
+        std = np.sqrt(m2 / (counts - 1))
+        std = np.where(counts > 1, std, np.nan)
+
+        m2z = _zero_out_fperr(m2)
+        m3z = _zero_out_fperr(m3)
+        skewness = (counts * (counts - 1) ** 0.5 / (counts - 2)) * (m3z / m2z ** 1.5)
+        skewness = np.where(m2z == 0, 0.0, skewness)
+        skewness = np.where(counts < 3, np.nan, skewness)
+
+        numerator = _zero_out_fperr(counts * (counts + 1) * (counts - 1) * m4)
+        denominator = _zero_out_fperr((counts - 2) * (counts - 3) * m2 ** 2)
+        adjustment = 3 * (counts - 1) ** 2 / ((counts - 2) * (counts - 3))
+        kurtosis = numerator / denominator - adjustment
+        kurtosis = np.where(denominator == 0, 0.0, kurtosis)
+        kurtosis = np.where(counts < 4, np.nan, kurtosis)
+
+    # One sort per column gives min, max, quantiles, median and cardinality;
+    # NaNs sort last, so each column's valid values are its first `count` rows
+    sorted_block = np.sort(block, axis=0)
+    if len(sorted_block) == 0:
+        sorted_block = np.full((1, block.shape[1]), np.nan)
+    column_idx = np.arange(block.shape[1])
+    minimum = sorted_block[0, column_idx]
+    maximum = sorted_block[np.maximum(counts - 1, 0), column_idx]
+    quantiles = {q: _sorted_quantiles(sorted_block, counts, q) for q in QUANTILES}
+    medians = _sorted_medians(sorted_block, counts)
+
+    row_idx = np.arange(1, len(sorted_block))[:, None]
+    changes = (sorted_block[1:] != sorted_block[:-1]) & (row_idx < counts)
+    unique = np.where(counts > 0, changes.sum(axis=0) + 1, 0)
+
+    q1, q3 = quantiles[0.25], quantiles[0.75]
+    iqr = q3 - q1
+    with np.errstate(invalid='ignore'):
+        outliers = ((block < (q1 - 1.5 * iqr)) | (block > (q3 + 1.5 * iqr))).sum(axis=0)
+        negatives = (block < 0).sum(axis=0)
+
+    return pd.DataFrame({
+        'count': counts.astype(np.float64),
+        'mean': means,
+        'std': std,
+        'min': minimum,
+        '25%': quantiles[0.25],
+        '50%': quantiles[0.5],
+        '75%': quantiles[0.75],
+        'max': maximum,
+        'median': medians,
+        'skewness': skewness,
+        'kurtosis': kurtosis,
+        'null_count': len(block) - counts,
+        'unique': unique,
+        'negative_count': negatives,
+        'outlier_count': outliers
+    }, index=pd.Index(columns))
+
+def compute_profile(df):
+    """Profile a DataFrame once and return the statistics every report section needs
+
+    The returned dict holds:
+      - ``numeric``: per numeric column statistics (see compute_numeric_profile)
+      - ``null_count``, ``non_null_count``, ``unique``: per column Series
+        covering every column, in frame order
+      - ``dtypes``: column data types
+      - ``value_counts``: value counts of every object column, most frequent
+        first (see sort_value_counts)
+      - ``duplicate_rows``: number of rows repeating an earlier row
+      - ``row_count``: number of rows
+    """
+    return _collect_profile(_submit_profile(df, _run_now, column_groups=1))
+
+@traced
+def compute_profiles(frames, workers=1, executor='thread'):
+    """Profile several DataFrames, fanning the work out over ``workers`` workers
+
+    ``executor`` picks a 'thread' or 'process' pool. The profiles are
+    identical to compute_profile(df) for each frame, whatever the worker count.
+    """
+    if workers <= 1:
+        return [compute_profile(df) for df in frames]
+
+    if executor == 'process':
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_pool_context())
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    with pool:
+        plans = [_submit_profile(df, pool.submit, column_groups=workers) for df in frames]
+        return [_collect_profile(plan) for plan in plans]
+
+def _run_now(func, *args):
+    """Run a task immediately and wrap its result like an executor would"""
+    future = Future()
+    future.set_result(func(*args))
+    return future
+
+def sort_value_counts(counts):
+    """Order value counts most frequent first, as pandas value_counts does
+
+    ``counts`` must list values in order of first occurrence; ties then come
+    out in the order of pandas' own sort, so both profile modes report the
+    same top values.
+    """
+    return counts.astype(np.int64).sort_values(ascending=False)
+
+def _value_counts(series):
+    # Categorical counts list unused categories too and order ties by category
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    return sort_value_counts(series.value_counts(sort=False))
+
+def _nunique(series):
+    return series.nunique()
+
+def _duplicate_count(df):
+    return int(df.duplicated().sum())
+
+def numeric_block(df, columns):
+    """Return the given columns as one float64 block (rows x columns)
+
+    float32 columns are widened at their shortest decimal form (see
+    schemas.to_float64), so statistics match the values written to disk.
+    """
+    block = np.empty((len(df), len(columns)), dtype=np.float64, order='F')
+    for i, col in enumerate(columns):
+        block[:, i] = to_float64(df[col].to_numpy())
+    return block
+
+def _submit_profile(df, submit, column_groups):
+    """Submit every profiling task of a frame and return the pending results"""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    groups = [group for group in np.array_split(np.arange(len(numeric_cols)), column_groups)
+              if len(group) or len(numeric_cols) == 0]
+    numeric_futures = [
+        submit(compute_numeric_profile,
+               numeric_block(df, numeric_cols[group]),
+               numeric_cols[group])
+        for group in groups
+    ]
+
+    other_cols = df.columns.difference(numeric_cols, sort=False)
+    object_cols = set(df.select_dtypes(include=['object', 'category']).columns)
+    column_futures = {
+        col: submit(_value_counts if col in object_cols else _nunique, df[col])
+        for col in other_cols
+    }
+
+    return {
+        'numeric': numeric_futures,
+        'columns': column_futures,
+        'object_cols': object_cols,
+        'other_nulls': df[other_cols].isnull().sum(),
+        'duplicates': submit(_duplicate_count, df),
+        'dtypes': df.dtypes,
+        'row_count': len(df)
+    }
+
+def _collect_profile(plan):
+    """Wait for a frame's tasks and assemble its profile in frame order"""
+    numeric = pd.concat([future.result() for future in plan['numeric']])
+    value_counts = {}
+    other_unique = {}
+    for col, future in plan['columns'].items():
+        result = future.result()
+        if col in plan['object_cols']:
+            value_counts[col] = result
+            other_unique[col] = len(result)
+        else:
+            other_unique[col] = result
+
+    return build_profile(
+        numeric, plan['other_nulls'], pd.Series(other_unique, dtype=np.int64),
+        plan['dtypes'], value_counts, plan['duplicates'].result(), plan['row_count']
+    )
+
+def build_profile(numeric, other_nulls, other_unique, dtypes, value_counts,
+                  duplicate_rows, row_count):
+    """Assemble the profile dict shared by the report sections"""
+    columns = dtypes.index
+    null_count = pd.concat([numeric['null_count'], other_nulls]).reindex(columns)
+    unique = pd.concat([numeric['unique'], other_unique]).reindex(columns)
+
+    return {
+        'numeric': numeric,
+        'null_count': null_count.astype(np.int64),
+        'non_null_count': (row_count - null_count).astype(np.int64),
+        'unique': unique.astype(np.int64),
+        'dtypes': dtypes,
+        'value_counts': value_counts,
+        'duplicate_rows': duplicate_rows,
+        'row_count': row_count
+    }
@@ -0,0 +1,351 @@
+"""
+Data Quality Rules for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Declarative constraints on the cleaned datasets, checked on every profile
+run. Each dataset lists its rules in QUALITY_RULES:
+
+  - range:     values of a column lie within [min, max] (either bound optional)
+  - not_null:  a column has no missing values
+  - unique:    a combination of columns identifies each row
+  - reference: every key of the dataset also appears in another dataset
+
+Rules are compiled into functions that return a boolean mask of the
+violating rows. Every mask of a dataset is computed straight from the column
+arrays. Key rules work on the shared integer codes of merge_engine, counted
+in a dense table when the codes allow it, so a check costs a few vectorized
+operations whatever the row count. The report
+gives each rule's violation count and the first few violating rows.
+
+RuleState checks the same rules over a stream of chunks for the streaming
+profile: row rules chunk by chunk, key rules over the key columns kept from
+every chunk. check_rule_states turns the merged states into the report
+check_rules gives for the whole frames.
+"""
+
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+from merge_engine import encode_keys
+from schemas import OPTIONAL_COLUMNS, legacy_layout
+
+# Violating rows kept per rule in the report
+SAMPLE_ROWS = 5
+
+KEYS = ['country', 'year']
+
+# Rules that compare rows with each other rather than checking each row alone
+KEY_RULES = ('unique', 'reference')
+
+# Composite key codes are counted in a dense table when their range is at
+# most this many times the row count, and hashed otherwise
+DENSE_KEY_FACTOR = 4
+
+QUALITY_RULES = {
+    'happiness_clean': [
+        {'rule': 'not_null', 'column': 'country'},
+        {'rule': 'not_null', 'column': 'year'},
+        {'rule': 'not_null', 'column': 'happiness_score'},
+        {'rule': 'range', 'column': 'happiness_score', 'min': 0, 'max': 10},
+        {'rule': 'range', 'column': 'happiness_rank', 'min': 1},
+        {'rule': 'range', 'column': 'happiness_gdp_contribution', 'min': 0},
+        {'rule': 'range', 'column': 'social_support', 'min': 0},
+        {'rule': 'range', 'column': 'happiness_life_exp_contribution', 'min': 0},
+        {'rule': 'range', 'column': 'freedom', 'min': 0},
+        {'rule': 'range', 'column': 'generosity', 'min': 0},
+        {'rule': 'range', 'column': 'corruption_perception', 'min': 0},
+        {'rule': 'unique', 'columns': KEYS},
+        {'rule': 'reference', 'columns': KEYS, 'dataset': 'gapminder_clean'}
+    ],
+    'gapminder_clean': [
+        {'rule': 'not_null', 'column': 'country'},
+        {'rule': 'not_null', 'column': 'continent'},
+        {'rule': 'not_null', 'column': 'year'},
+        {'rule': 'range', 'column': 'life_expectancy', 'min': 0, 'max': 120},
+        {'rule': 'range', 'column': 'hdi', 'min': 0, 'max': 1},
+        {'rule': 'range', 'column': 'co2_per_capita', 'min': 0},
+        {'rule': 'range', 'column': 'gdp_per_capita', 'min': 0},
+        {'rule': 'range', 'column': 'service_workers_pct', 'min': 0, 'max': 100},
+        {'rule': 'unique', 'columns': KEYS}
+    ]
+}
+
+def describe_rule(rule):
+    """One-line description of a rule, used as its name in the report"""
+    kind = rule['rule']
+    if kind == 'range':
+        low = rule.get('min', '-inf')
+        high = rule.get('max', 'inf')
+        return f"{rule['column']} in [{low}, {high}]"
+    if kind == 'not_null':
+        return f"{rule['column']} not null"
+    if kind == 'unique':
+        return f"({', '.join(rule['columns'])}) unique"
+    return f"({', '.join(rule['columns'])}) found in {rule['dataset']}"
+
+def _range_check(column, low, high):
+    def check(df, frames):
+        values = df[column].to_numpy()
+        # Bounds are cast to the column type, so a float32 0.9 is not above 0.9
+        violates = np.zeros(len(values), dtype=bool)
+        if low is not None:
+            violates |= values < np.asarray(low, dtype=values.dtype)
+        if high is not None:
+            violates |= values > np.asarray(high, dtype=values.dtype)
+        return violates
+    return check
+
+def _not_null_check(column):
+    def check(df, frames):
+        return df[column].isnull().to_numpy()
+    return check
+
+def _dense(codes, *others):
+    """Whether key codes span a range small enough for a dense table"""
+    rows = sum(len(c) for c in (codes, *others))
+    return rows > 0 and max(c.max(initial=0) for c in (codes, *others)) < DENSE_KEY_FACTOR * rows
+
+def _unique_check(columns):
+    def check(df, frames):
+        codes, _ = encode_keys(df, df.iloc[:0], columns)
+        if _dense(codes):
+            return np.bincount(codes)[codes] > 1
+        return pd.Series(codes).duplicated(keep=False).to_numpy()
+    return check
+
+def _reference_check(columns, dataset):
+    def check(df, frames):
+        codes, reference_codes = encode_keys(df, frames[dataset], columns)
+        if _dense(codes, reference_codes):
+            present = np.zeros(max(codes.max(initial=0), reference_codes.max(initial=0)) + 1,
+                               dtype=bool)
+            present[reference_codes] = True
+            return ~present[codes]
+        return ~np.isin(codes, reference_codes)
+    return check
+
+def compile_rule(rule, df, frames):
+    """Turn a declared rule into a function (frame, frames) -> mask of violating rows
+
+    Raises ValueError for unknown rules and for columns or datasets that are
+    not there.
+    """
+    kind = rule['rule']
+    columns = rule.get('columns', [rule.get('column')])
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"{describe_rule(rule)}: missing columns {', '.join(missing)}")
+    if kind == 'range':
+        return _range_check(rule['column'], rule.get('min'), rule.get('max'))
+    if kind == 'not_null':
+        return _not_null_check(rule['column'])
+    if kind == 'unique':
+        return _unique_check(columns)
+    if kind == 'reference':
+        if rule['dataset'] not in frames:
+            raise ValueError(f"{describe_rule(rule)}: dataset {rule['dataset']} is not loaded")
+        return _reference_check(columns, rule['dataset'])
+    raise ValueError(f"Unknown quality rule {kind!r}")
+
+def sample_rows(df, rows, offset=0):
+    """Rows of a frame as JSON-ready records, with their position plus ``offset``"""
+    sample = legacy_layout(df.iloc[rows])
+    records = json.loads(sample.to_json(orient='records'))
+    return [{'row': int(row) + offset, **record} for row, record in zip(rows, records)]
+
+def applicable_rules(df, rules):
+    """The rules of a dataset, without those on optional columns the frame lacks"""
+    return [
+        rule for rule in rules
+        if not any(col in OPTIONAL_COLUMNS and col not in df.columns
+                   for col in rule.get('columns', [rule.get('column')]))
+    ]
+
+@traced
+def check_rules(frames, rules=QUALITY_RULES, sample_size=SAMPLE_ROWS):
+    """Check the declared rules of every loaded dataset
+
+    ``frames`` maps dataset names to frames. Rules on an optional column
+    (schemas.OPTIONAL_COLUMNS) that the frame lacks are skipped. Returns, per
+    dataset, the row count, the number of rows breaking any rule and, per
+    rule, its violation count and a sample of up to ``sample_size`` violating
+    rows.
+    """
+    report = {}
+    for dataset, df in frames.items():
+        compiled = [(describe_rule(rule), rule, compile_rule(rule, df, frames))
+                    for rule in applicable_rules(df, rules.get(dataset, []))]
+
+        any_violation = np.zeros(len(df), dtype=bool)
+        results = []
+        for name, rule, check in compiled:
+            mask = check(df, frames)
+            any_violation |= mask
+            rows = np.flatnonzero(mask)
+            results.append({
+                'name': name,
+                **rule,
+                'violations': int(len(rows)),
+                'sample': sample_rows(df, rows[:sample_size]) if len(rows) else []
+            })
+        report[dataset] = {
+            'rows': len(df),
+            'rows_with_violations': int(any_violation.sum()),
+            'rules': results
+        }
+    return report
+
+class RuleState:
+    """Mergeable running state of one dataset's rule checks over chunks of rows
+
+    Range and not-null rules are checked chunk by chunk, keeping their
+    violation counts, the positions of the violating rows and the first
+    sampled rows. Unique and reference rules need every key at once, so the
+    key columns of each chunk are kept (categoricals as their codes) and the
+    rules are checked over them by check_rule_states.
+    """
+
+    def __init__(self, dataset, rules=QUALITY_RULES, sample_size=SAMPLE_ROWS):
+        self.dataset = dataset
+        self.all_rules = rules
+        self.sample_size = sample_size
+        # Key columns of this dataset's key rules and of the rules referring to it
+        self.key_columns = list(dict.fromkeys(
+            col for name, dataset_rules in rules.items() for rule in dataset_rules
+            if rule['rule'] in KEY_RULES and dataset in (name, rule.get('dataset'))
+            for col in rule['columns']
+        ))
+        self.rules = None
+        self.results = None
+        self.violating_rows = np.empty(0, dtype=np.int64)
+        self.keys = []
+        self.row_count = 0
+
+    def update(self, chunk):
+        """Check the row rules on one chunk and keep its keys"""
+        if self.rules is None:
+            self.rules = applicable_rules(chunk, self.all_rules.get(self.dataset, []))
+            self.results = [{'violations': 0, 'sample': []} for _ in self.rules]
+        violating = np.zeros(len(chunk), dtype=bool)
+        for rule, result in zip(self.rules, self.results):
+            if rule['rule'] in KEY_RULES:
+                continue
+            check = compile_rule(rule, chunk, {})
+            mask = check(chunk, {})
+            violating |= mask
+            rows = np.flatnonzero(mask)
+            result['violations'] += int(len(rows))
+            missing = self.sample_size - len(result['sample'])
+            if missing > 0 and len(rows):
+                result['sample'] += sample_rows(chunk, rows[:missing], self.row_count)
+        self.violating_rows = np.concatenate(
+            [self.violating_rows, np.flatnonzero(violating) + self.row_count]
+        )
+        self.keys.append(chunk[self.key_columns].copy())
+        self.row_count += len(chunk)
+        return self
+
+    def merge(self, other):
+        """Fold the state of the row range that follows this one into it"""
+        if other.rules is None:
+            return self
+        if self.rules is None:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            return self
+        for result, theirs in zip(self.results, other.results):
+            result['violations'] += theirs['violations']
+            missing = self.sample_size - len(result['sample'])
+            result['sample'] += [{**record, 'row': record['row'] + self.row_count}
+                                 for record in theirs['sample'][:max(missing, 0)]]
+        self.violating_rows = np.concatenate(
+            [self.violating_rows, other.violating_rows + self.row_count]
+        )
+        self.keys += other.keys
+        self.row_count += other.row_count
+        return self
+
+    def key_frame(self):
+        """The kept key columns of every row, in row order"""
+        if not self.keys:
+            return pd.DataFrame(columns=self.key_columns)
+        return pd.concat(self.keys, ignore_index=True)
+
+def merge_rule_states(states):
+    """Merge the RuleStates of consecutive row ranges of one dataset, in order"""
+    states = list(states)
+    merged = RuleState(states[0].dataset, states[0].all_rules, states[0].sample_size)
+    for state in states:
+        merged.merge(state)
+    return merged
+
+def _read_rows(chunks, rows):
+    """Read the given sorted row positions back from a chunk iterator as records"""
+    records = []
+    offset = 0
+    for chunk in chunks:
+        wanted = rows[(rows >= offset) & (rows < offset + len(chunk))]
+        if len(wanted):
+            records += sample_rows(chunk, wanted - offset, offset)
+        offset += len(chunk)
+        if offset > rows[-1]:
+            break
+    return {record['row']: record for record in records}
+
+@traced
+def check_rule_states(states, read_chunks):
+    """Finish streamed rule checks into the report check_rules gives for whole frames
+
+    ``states`` maps dataset names to the RuleState of all their rows and
+    ``read_chunks`` maps them to functions returning a new iterator over the
+    same chunks. Key rules are checked over the kept keys; the rows they
+    sample are read back through ``read_chunks``, stopping after the last
+    sampled row.
+    """
+    key_frames = {dataset: state.key_frame() for dataset, state in states.items()}
+    report = {}
+    for dataset, state in states.items():
+        keys = key_frames[dataset]
+        violating = [state.violating_rows]
+        results = []
+        for rule, result in zip(state.rules or [], state.results or []):
+            if rule['rule'] in KEY_RULES:
+                rows = np.flatnonzero(compile_rule(rule, keys, key_frames)(keys, key_frames))
+                violating.append(rows)
+                result = {'violations': int(len(rows)), 'sample': rows[:state.sample_size]}
+            results.append({'name': describe_rule(rule), **rule, **result})
+
+        sampled = np.unique(np.concatenate(
+            [np.empty(0, dtype=np.int64)] +
+            [result['sample'] for result in results if isinstance(result['sample'], np.ndarray)]
+        ))
+        records = _read_rows(read_chunks[dataset](), sampled) if len(sampled) else {}
+        for result in results:
+            if isinstance(result['sample'], np.ndarray):
+                result['sample'] = [records[row] for row in result['sample']]
+
+        report[dataset] = {
+            'rows': state.row_count,
+            'rows_with_violations': int(len(np.unique(np.concatenate(violating)))),
+            'rules': results
+        }
+    return report
+
+def print_rule_report(report):
+    """Print the violation counts of every rule"""
+    print("\n" + "="*60)
+    print("DATA QUALITY RULES")
+    print("="*60)
+    for dataset, section in report.items():
+        print(f"\n{dataset}: {section['rows_with_violations']} of {section['rows']} rows "
+              f"break at least one rule")
+        for result in section['rules']:
+            mark = '✓' if result['violations'] == 0 else '✗'
+            print(f"  {mark} {result['name']:<45} {result['violations']} violations")
+            for record in result['sample'][:3]:
+                keys = ', '.join(str(record.get(col)) for col in KEYS if col in record)
+                print(f"      row {record['row']}: {keys}")
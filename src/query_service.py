@@ -0,0 +1,356 @@
+"""
+Query Service for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+A small local HTTP/JSON service over the merged dataset. The year partitions
+are loaded once into a typed in-memory frame and queries are answered from
+it: filter by continent, country, year and indicator ranges, group by any of
+continent, country and year, and aggregate any numeric indicator.
+
+Answers are kept in an LRU cache keyed by the normalized query. Before each
+request the service stats the partition files; when any of them changed
+(size, modification time or inode, as in fingerprint), the dataset is
+reloaded and the cache is cleared.
+
+Endpoints:
+    GET /health                  service status and dataset version
+    GET /columns                 columns, types, years and row count
+    GET /query?...               filtered, grouped aggregates
+    GET /summary                 countries and mean indicators per continent
+
+Query parameters:
+    group_by=continent,year      columns to group by (continent, country, year)
+    agg=happiness_score:mean,count
+                                 aggregates as column:function, or count;
+                                 functions: count, sum, mean, median, min, max, std
+    continent=Europe&continent=Asia
+                                 keep these continents (likewise country=...);
+                                 repeat the parameter for several names, as
+                                 names may contain commas ("Congo, Rep.")
+    year=2016-2018               keep these years (same syntax as --years)
+    min.gdp_per_capita=10000     keep rows whose indicator is at least this
+    max.hdi=0.8                  keep rows whose indicator is at most this
+
+Usage:
+    python src/query_service.py --port 8765
+    curl 'http://127.0.0.1:8765/query?group_by=continent&agg=count,happiness_score:mean'
+"""
+
+import sys
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from fingerprint import stat_key
+from schemas import to_float64
+from storage import (
+    DEFAULT_FORMAT, DEFAULT_YEARS, INTERMEDIATE_FORMATS, check_format, format_years, parse_years,
+    partition_paths, read_partitions
+)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 256
+
+GROUP_COLUMNS = ['continent', 'country', 'year']
+NAME_FILTERS = ['continent', 'country']
+AGGREGATES = ['count', 'sum', 'mean', 'median', 'min', 'max', 'std']
+DEFAULT_AGGREGATES = ['count', 'happiness_score:mean']
+SUMMARY_INDICATORS = ['happiness_score', 'gdp_per_capita', 'life_expectancy', 'hdi']
+
+class QueryError(ValueError):
+    """A query that cannot be answered; reported to the client as a 400"""
+
+class LRUCache:
+    """Thread-safe least-recently-used cache of query results"""
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.entries), 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses}
+
+def _json_value(value):
+    """Convert a NumPy or pandas scalar to a JSON value, NaN becoming null"""
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+def _split(value):
+    """Split a comma-separated list of column or aggregate names"""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+class QueryService:
+    """The merged dataset in memory, with cached aggregate queries"""
+
+    def __init__(self, years=DEFAULT_YEARS, fmt=DEFAULT_FORMAT, processed_dir='data/processed',
+                 cache_size=DEFAULT_CACHE_SIZE):
+        self.years = list(years)
+        self.fmt = check_format(fmt)
+        self.processed_dir = processed_dir
+        self.paths = partition_paths('merged', self.years, processed_dir, fmt)
+        self.cache = LRUCache(cache_size)
+        self.lock = threading.Lock()
+        self.frame = None
+        self.signature = None
+        self.version = 0
+
+    def _signature(self):
+        try:
+            return tuple(tuple(stat_key(path)) for path in self.paths)
+        except FileNotFoundError as exc:
+            raise QueryError(f"Merged dataset not found: {exc.filename}; run the workflow first") from None
+
+    def refresh(self):
+        """Reload the dataset and clear the cache if its files changed since the last load"""
+        signature = self._signature()
+        if signature == self.signature:
+            return False
+        with self.lock:
+            if signature == self.signature:
+                return False
+            df = read_partitions('merged', self.years, self.processed_dir, self.fmt)
+            # float32 indicators are widened at their decimal values once, not per query
+            self.frame = df.assign(**{
+                col: to_float64(df[col].to_numpy())
+                for col in df.select_dtypes(include=[np.floating]).columns
+            })
+            self.signature = signature
+            self.version += 1
+            self.cache.clear()
+        print(f"Loaded {len(self.frame)} merged rows ({format_years(self.years)}), "
+              f"version {self.version}")
+        return True
+
+    def numeric_columns(self):
+        return [col for col in self.frame.select_dtypes(include=[np.number]).columns
+                if col != 'year']
+
+    def columns(self):
+        """Describe the columns, years and row count of the loaded dataset"""
+        self.refresh()
+        return {
+            'version': self.version,
+            'rows': len(self.frame),
+            'years': sorted(int(year) for year in self.frame['year'].unique()),
+            'columns': {col: str(dtype) for col, dtype in self.frame.dtypes.items()},
+            'group_by': GROUP_COLUMNS,
+            'aggregates': AGGREGATES
+        }
+
+    def _filter_mask(self, filters):
+        df = self.frame
+        mask = np.ones(len(df), dtype=bool)
+        numeric = set(self.numeric_columns())
+        # Names may contain commas ("Congo, Rep."), so several names are given
+        # as repeated parameters and any of them matches
+        names = {}
+        for key, value in filters:
+            if key in NAME_FILTERS:
+                names.setdefault(key, []).append(value.strip())
+            elif key == 'year':
+                try:
+                    years = parse_years(value)
+                except ValueError as exc:
+                    raise QueryError(str(exc)) from None
+                mask &= df['year'].isin(years).to_numpy()
+            elif key.startswith(('min.', 'max.')):
+                bound, col = key.split('.', 1)
+                if col not in numeric:
+                    raise QueryError(f"Unknown indicator in {key}; see /columns")
+                try:
+                    limit = float(value)
+                except ValueError:
+                    raise QueryError(f"{key} needs a number, got {value!r}") from None
+                values = df[col].to_numpy()
+                mask &= values >= limit if bound == 'min' else values <= limit
+            else:
+                raise QueryError(f"Unknown query parameter {key!r}")
+        for key, values in names.items():
+            mask &= df[key].isin(values).to_numpy()
+        return mask
+
+    def _aggregates(self, specs):
+        numeric = set(self.numeric_columns())
+        aggregates = []
+        for spec in specs:
+            if spec == 'count':
+                aggregates.append(('count', None, 'count'))
+                continue
+            col, _, func = spec.partition(':')
+            if col not in numeric:
+                raise QueryError(f"Unknown indicator {col!r} in agg; see /columns")
+            if func not in AGGREGATES:
+                raise QueryError(f"Unknown aggregate {func!r}; choose from {', '.join(AGGREGATES)}")
+            aggregates.append((f"{col}_{func}", col, func))
+        return aggregates
+
+    def _compute(self, group_by, aggregates, filters):
+        df = self.frame[self._filter_mask(filters)]
+        if not group_by:
+            row = {}
+            for name, col, func in aggregates:
+                row[name] = len(df) if col is None else getattr(df[col], func)()
+            rows = [row]
+        else:
+            grouped = df.groupby(group_by, observed=True, sort=True)
+            table = pd.DataFrame({
+                name: grouped.size() if col is None else grouped[col].agg(func)
+                for name, col, func in aggregates
+            }).reset_index()
+            rows = table.to_dict('records')
+        return {
+            'matched_rows': len(df),
+            'rows': [{key: _json_value(value) for key, value in row.items()} for row in rows]
+        }
+
+    def query(self, params):
+        """Answer a query given as (name, value) pairs; returns a JSON-ready dict"""
+        self.refresh()
+        group_by, specs, filters = [], None, []
+        for key, value in params:
+            if key == 'group_by':
+                group_by.extend(_split(value))
+            elif key == 'agg':
+                specs = (specs or []) + _split(value)
+            else:
+                filters.append((key, value))
+        unknown = [col for col in group_by if col not in GROUP_COLUMNS]
+        if unknown:
+            raise QueryError(f"Cannot group by {', '.join(unknown)}; choose from {', '.join(GROUP_COLUMNS)}")
+        aggregates = self._aggregates(specs or DEFAULT_AGGREGATES)
+
+        key = (self.version, tuple(group_by), tuple(aggregates), tuple(sorted(filters)))
+        result = self.cache.get(key)
+        cached = result is not None
+        if not cached:
+            result = self._compute(group_by, aggregates, filters)
+            self.cache.put(key, result)
+        return {'version': self.version, 'cached': cached, **result}
+
+    def summary(self):
+        """Countries and mean indicators per continent, as printed by merge_data"""
+        self.refresh()
+        indicators = [col for col in SUMMARY_INDICATORS if col in self.numeric_columns()]
+        return self.query([('group_by', 'continent'),
+                           ('agg', ','.join(['count'] + [f'{col}:mean' for col in indicators]))])
+
+    def health(self):
+        self.refresh()
+        return {'status': 'ok', 'version': self.version, 'rows': len(self.frame),
+                'cache': self.cache.stats()}
+
+def make_handler(service):
+    """Build a request handler class answering from the given service"""
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        routes = {
+            '/health': lambda params: service.health(),
+            '/columns': lambda params: service.columns(),
+            '/query': service.query,
+            '/summary': lambda params: service.summary()
+        }
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            route = self.routes.get(url.path.rstrip('/') or '/')
+            if route is None:
+                self.send_json(404, {'error': f"Unknown path {url.path}",
+                                     'paths': sorted(self.routes)})
+                return
+            try:
+                self.send_json(200, route(parse_qsl(url.query, keep_blank_values=True)))
+            except QueryError as exc:
+                self.send_json(400, {'error': str(exc)})
+            except Exception as exc:
+                print(f"Error answering {self.path}: {exc!r}")
+                self.send_json(500, {'error': f"Internal error: {exc}"})
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Polling dashboards would flood the console with access lines
+            pass
+
+    return QueryHandler
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Create a threaded HTTP server for the service; port 0 picks a free port"""
+    return ThreadingHTTPServer((host, port), make_handler(service))
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description='Serve JSON queries over the merged dataset.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'address to bind (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'port (default: {DEFAULT_PORT})')
+    parser.add_argument('--years', type=parse_years, default=DEFAULT_YEARS,
+                        help='merged years to serve, e.g. 2018 or 2015-2019 (default: 2018)')
+    parser.add_argument('--format', choices=list(INTERMEDIATE_FORMATS), default=DEFAULT_FORMAT,
+                        help='storage format of the merged dataset (default: csv)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f'query results kept in the LRU cache (default: {DEFAULT_CACHE_SIZE})')
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    args = parse_args()
+    service = QueryService(args.years, args.format, cache_size=args.cache_size)
+    try:
+        service.refresh()
+    except QueryError as exc:
+        print(f"✗ {exc}")
+        sys.exit(1)
+
+    server = create_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Serving the merged dataset on http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping the query service")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
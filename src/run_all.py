@@ -3,15 +3,43 @@ Complete Workflow Automation Script
 Global Happiness and Economic Development Project 2018
 
 This script runs the entire analysis pipeline from data cleaning through visualization.
+All stages run in a single Python process and hand their DataFrames to each other
+in memory; only the published artifacts are written to disk. Stages whose
+inputs, code and parameters are unchanged since the last run are skipped.
+Stages form a dependency graph through their declared inputs and outputs, so
+independent stages (profiling and merging) can run at the same time.
 
 Author: Gregorius Aviantoro, Rishi Akula
 Date: December 2025
 """
 
-import subprocess
+import argparse
 import sys
 import os
+import threading
+import traceback
 from datetime import datetime
+from importlib.util import find_spec
+
+import instrumentation
+import scheduler
+from storage import (
+    DEFAULT_FORMAT, DEFAULT_YEARS, INTERMEDIATE_FORMATS, figure_output_dirs, format_years,
+    happiness_raw_paths, parse_years, partition_paths
+)
+
+RAW_DATA_DIR = 'data/raw'
+PROCESSED_DIR = 'data/processed'
+RESULTS_DIR = 'results'
+GAPMINDER_RAW = os.path.join(RAW_DATA_DIR, 'gapminder_data_graphs.csv')
+FIGURE_FILES = [
+    'gdp_happiness_scatter.png',
+    'life_exp_happiness_scatter.png',
+    'correlation_heatmap.png'
+]
+
+# Guards the shared context when stages run concurrently
+_context_lock = threading.Lock()
 
 def print_header(message):
     """Print a formatted header message"""
@@ -19,41 +47,412 @@ def print_header(message):
     print(message)
     print("="*70 + "\n")
 
-def run_script(script_path, script_name):
-    """Run a Python script and handle errors"""
-    print(f"Running {script_name}...")
+def run_stage(stage_func, stage_name, context):
+    """Run a pipeline stage in-process and handle errors"""
+    print(f"Running {stage_name}...")
     try:
-        result = subprocess.run(
-            [sys.executable, script_path],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print(result.stdout)
-        if result.stderr:
-            print("Warnings:", result.stderr)
-        print(f"✓ {script_name} completed successfully\n")
+        stage_func(context)
+        print(f"✓ {stage_name} completed successfully\n")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"✗ Error running {script_name}:")
-        print(e.stdout)
-        print(e.stderr)
-        return False
-    except FileNotFoundError:
-        print(f"✗ Error: {script_path} not found")
+    except Exception:
+        print(f"✗ Error running {stage_name}:")
+        traceback.print_exc(file=sys.stdout)
         return False
 
-def check_dependencies():
-    """Check if required packages are installed"""
+def clean_stage(context):
+    """Clean the raw datasets and keep the cleaned frames in memory"""
+    import clean_data
+    
+    happiness_clean, gapminder_clean = clean_data.run_cleaning(
+        happiness_raw_paths(context['years'], RAW_DATA_DIR), GAPMINDER_RAW, PROCESSED_DIR,
+        context['format'], context['export_csv'], context['impute'], context['impute_methods'],
+        context['impute_window'], context['features'], context['feature_lags'],
+        context['feature_windows']
+    )
+    clean_data.print_cleaning_summary(happiness_clean, gapminder_clean)
+    instrumentation.note_frames('out', happiness_clean, gapminder_clean)
+    
+    context['happiness_clean'] = happiness_clean
+    context['gapminder_clean'] = gapminder_clean
+
+def cleaned_frames(context):
+    """Return the cleaned frames, loading them from disk if cleaning was skipped"""
+    with _context_lock:
+        if 'happiness_clean' not in context:
+            import profile_data
+            happiness_df, gapminder_df = profile_data.load_cleaned_data(
+                context['years'], context['format']
+            )
+            context['happiness_clean'] = happiness_df
+            context['gapminder_clean'] = gapminder_df
+    return context['happiness_clean'], context['gapminder_clean']
+
+def profile_stage(context):
+    """Profile the cleaned frames handed over by the cleaning stage"""
+    import profile_data
+    
+    if context['profile_mode'] == 'streaming':
+        profile_data.generate_streaming_profile_report(
+            context['years'], PROCESSED_DIR, context['format'], context['chunksize']
+        )
+        return
+    
+    happiness_df, gapminder_df = cleaned_frames(context)
+    instrumentation.note_frames('in', happiness_df, gapminder_df)
+    profile_data.generate_profile_report(
+        happiness_df, gapminder_df, PROCESSED_DIR, context['workers'], context['executor']
+    )
+    profile_data.print_profile_summary(happiness_df, gapminder_df)
+
+def merge_stage(context):
+    """Merge the cleaned frames handed over by the cleaning stage"""
+    import merge_data
+    
+    happiness_df, gapminder_df = cleaned_frames(context)
+    instrumentation.note_frames('in', happiness_df, gapminder_df)
+    context['merged_df'] = merge_data.run_integration(
+        happiness_df, gapminder_df, PROCESSED_DIR,
+        context['format'], context['export_csv']
+    )
+    instrumentation.note_frames('out', context['merged_df'])
+
+def merged_frame(context):
+    """Return the merged frame, loading it from disk if merging was skipped"""
+    with _context_lock:
+        if 'merged_df' not in context:
+            import visualize
+            context['merged_df'] = visualize.load_merged_data(
+                context['years'], context['format']
+            )
+    return context['merged_df']
+
+def analyze_stage(context):
+    """Correlate the indicators of the merged frame with bootstrap intervals"""
+    import analysis
+    
+    merged_df = merged_frame(context)
+    instrumentation.note_frames('in', merged_df)
+    analysis.run_analysis(
+        merged_df, PROCESSED_DIR, context['breakdown'], context['bootstrap'],
+        context['confidence'], context['seed']
+    )
+
+def visualize_stage(context):
+    """Render the figures from the merged frame"""
+    import visualize
+    
+    merged_df = merged_frame(context)
+    instrumentation.note_frames('in', merged_df)
+    visualize.run_visualization(merged_df, RESULTS_DIR, context['workers'])
+
+def build_workflow(options):
+    """Declare the workflow stages with their code, inputs, outputs and parameters
+
+    ``options`` holds the parsed command-line options; each stage's parameters
+    are the options that affect its outputs.
+    """
+    years = options['years']
+    fmt = options['format']
+    happiness_raw = list(happiness_raw_paths(years, RAW_DATA_DIR).values())
+    happiness_clean = partition_paths('happiness_clean', years, PROCESSED_DIR, fmt)
+    gapminder_clean = partition_paths('gapminder_clean', years, PROCESSED_DIR, fmt)
+    merged = partition_paths('merged', years, PROCESSED_DIR, fmt)
+    export_csv = options['export_csv'] and fmt != 'csv'
+    csv_exports = {
+        dataset: partition_paths(dataset, years, PROCESSED_DIR, 'csv') if export_csv else []
+        for dataset in ('happiness_clean', 'gapminder_clean', 'merged')
+    }
+    figures = [
+        os.path.join(figure_dir, filename)
+        for figure_dir in figure_output_dirs(years, RESULTS_DIR).values()
+        for filename in FIGURE_FILES
+    ]
+    stored = {'years': list(years), 'format': fmt}
+    impute = (
+        {'methods': options['impute_methods'], 'window': options['impute_window']}
+        if options['impute'] else None
+    )
+    imputation_log = [os.path.join(PROCESSED_DIR, 'imputed_cells.csv')] if impute else []
+    features = (
+        {'kinds': options['features'], 'lags': options['feature_lags'],
+         'windows': options['feature_windows']}
+        if options['features'] else None
+    )
+    
+    return [
+        {
+            'id': 'clean',
+            'name': 'Data Cleaning',
+            'run': clean_stage,
+            'code': ['src/clean_data.py', 'src/country_resolver.py', 'src/imputation.py',
+                     'src/features.py', 'src/fingerprint.py', 'src/schemas.py', 'src/storage.py'],
+            'inputs': happiness_raw + [GAPMINDER_RAW],
+            'outputs': happiness_clean + gapminder_clean
+                       + csv_exports['happiness_clean'] + csv_exports['gapminder_clean']
+                       + [os.path.join(PROCESSED_DIR, 'cleaning_provenance.json')]
+                       + imputation_log,
+            'params': dict(stored, export_csv=export_csv, impute=impute, features=features)
+        },
+        {
+            'id': 'profile',
+            'name': 'Data Profiling',
+            'run': profile_stage,
+            'code': ['src/profile_data.py', 'src/profile_engine.py', 'src/streaming_profile.py',
+                     'src/quality_rules.py', 'src/merge_engine.py', 'src/schemas.py',
+                     'src/storage.py'],
+            'inputs': happiness_clean + gapminder_clean,
+            'outputs': [os.path.join(PROCESSED_DIR, 'data_profile_report.json')],
+            'params': dict(stored, profile_mode=options['profile_mode'],
+                           chunksize=options['chunksize'])
+        },
+        {
+            'id': 'merge',
+            'name': 'Data Integration',
+            'run': merge_stage,
+            'code': ['src/merge_data.py', 'src/merge_engine.py', 'src/country_resolver.py',
+                     'src/schemas.py', 'src/storage.py'],
+            'inputs': happiness_clean + gapminder_clean,
+            'outputs': merged + csv_exports['merged']
+                       + [os.path.join(PROCESSED_DIR, 'merge_report.json')],
+            'params': dict(stored, export_csv=export_csv)
+        },
+        {
+            'id': 'analyze',
+            'name': 'Statistical Analysis',
+            'run': analyze_stage,
+            'code': ['src/analysis.py', 'src/profile_engine.py', 'src/schemas.py',
+                     'src/storage.py'],
+            'inputs': merged,
+            'outputs': [os.path.join(PROCESSED_DIR, 'correlations.csv'),
+                        os.path.join(PROCESSED_DIR, 'correlation_report.json')],
+            'params': dict(stored, breakdown=options['breakdown'], bootstrap=options['bootstrap'],
+                           confidence=options['confidence'], seed=options['seed'])
+        },
+        {
+            'id': 'visualize',
+            'name': 'Visualization Generation',
+            'run': visualize_stage,
+            'code': ['src/visualize.py', 'src/analysis.py', 'src/profile_engine.py',
+                     'src/schemas.py', 'src/storage.py'],
+            'inputs': merged,
+            'outputs': figures,
+            'params': stored
+        }
+    ]
+
+def execute_workflow(workflow_steps, options):
+    """Run the stage graph, skipping stages whose fingerprint is unchanged
+
+    Stages start as soon as the stages producing their inputs are done, up to
+    ``stage_workers`` at a time; a failed stage only blocks the stages that
+    depend on it. Stages share the options and their DataFrames through one
+    context dict and report into the active run trace, if any. Returns
+    whether every stage succeeded, and the schedule of each stage.
+    """
+    import stage_cache
+    
+    cache = stage_cache.load_stage_cache(PROCESSED_DIR)
+    context = dict(options)
+    
+    def run(stage):
+        # A stage's inputs are final once the stages producing them are done
+        fingerprint = stage_cache.compute_stage_fingerprint(stage, PROCESSED_DIR)
+        if not options['force'] and stage_cache.is_stage_up_to_date(stage, fingerprint, cache):
+            print(f"↷ {stage['name']} is up to date, skipping\n")
+            with instrumentation.span(stage['id'], kind='stage') as record:
+                record['status'] = 'skipped'
+            return 'skipped'
+        
+        with instrumentation.span(stage['id'], kind='stage') as record:
+            stage_ok = run_stage(stage['run'], stage['name'], context)
+            if not stage_ok:
+                record['status'] = 'failed'
+        if not stage_ok:
+            return 'failed'
+        
+        with _context_lock:
+            stage_cache.record_stage_run(stage, fingerprint, cache)
+            stage_cache.save_stage_cache(cache, PROCESSED_DIR)
+        return 'ok'
+    
+    schedule = scheduler.run_stage_graph(workflow_steps, run, options['stage_workers'])
+    names = {stage['id']: stage['name'] for stage in workflow_steps}
+    for stage_id, result in schedule.items():
+        if result['status'] == 'failed':
+            print(f"\n✗ Workflow failed at: {names[stage_id]}")
+        elif result['status'] == 'blocked':
+            blockers = ', '.join(names[dep] for dep in result['blocked_by'])
+            print(f"✗ {names[stage_id]} was not run because {blockers} did not complete")
+    
+    success = all(result['status'] in ('ok', 'skipped') for result in schedule.values())
+    return success, schedule
+
+def print_schedule(workflow_steps, schedule):
+    """Print when each stage ran and the critical path through the stage graph"""
+    dependencies = scheduler.stage_dependencies(workflow_steps)
+    seconds = {stage_id: result['seconds'] for stage_id, result in schedule.items()}
+    path, path_seconds = scheduler.critical_path(workflow_steps, dependencies, seconds)
+    
+    print(f"{'Stage':<12}{'After':<20}{'Status':<10}{'Start (s)':>10}{'End (s)':>10}")
+    for stage in workflow_steps:
+        result = schedule[stage['id']]
+        after = ', '.join(dependencies[stage['id']]) or '-'
+        start = f"{result['start']:>10.2f}{result['end']:>10.2f}" if 'start' in result else ''
+        print(f"{stage['id']:<12}{after:<20}{result['status']:<10}{start}")
+    
+    wall = max((result.get('end', 0.0) for result in schedule.values()), default=0.0)
+    print(f"\nCritical path: {' → '.join(path)} ({path_seconds:.2f}s)")
+    print(f"Stage time: {sum(seconds.values()):.2f}s, wall time: {wall:.2f}s")
+    return {'critical_path': path, 'critical_path_seconds': round(path_seconds, 4),
+            'wall_seconds': round(wall, 4), 'stages': schedule}
+
+def plan_workflow(workflow_steps, options):
+    """Report which stages a run would execute, without running anything"""
+    import stage_cache
+    
+    cache = stage_cache.load_stage_cache(PROCESSED_DIR)
+    dependencies = scheduler.stage_dependencies(workflow_steps)
+    pending_outputs = set()
+    for stage in scheduler.topological_order(workflow_steps, dependencies):
+        fingerprint = stage_cache.compute_stage_fingerprint(stage, PROCESSED_DIR)
+        if options['force']:
+            status = "would run (--force)"
+        elif pending_outputs.intersection(stage['inputs']):
+            status = "would run if an earlier stage changes its inputs"
+        elif stage_cache.is_stage_up_to_date(stage, fingerprint, cache):
+            print(f"↷ {stage['name']}: up to date, would be skipped")
+            continue
+        else:
+            status = "would run (inputs, code, parameters or outputs changed)"
+        after = f" (after {', '.join(dependencies[stage['id']])})" if dependencies[stage['id']] else ''
+        print(f"▶ {stage['name']}{after}: {status}")
+        pending_outputs.update(stage['outputs'])
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(
+        description='Run the complete happiness and economic development workflow.'
+    )
+    parser.add_argument(
+        '--years', type=parse_years, default=DEFAULT_YEARS,
+        help="years to process, e.g. 2018, 2015-2019 or 2015,2017 (default: 2018); "
+             "each year needs data/raw/<year>.csv"
+    )
+    parser.add_argument(
+        '--format', choices=list(INTERMEDIATE_FORMATS), default=DEFAULT_FORMAT,
+        help='storage format of the cleaned and merged datasets (default: csv); '
+             'feather and parquet need pyarrow'
+    )
+    parser.add_argument(
+        '--export-csv', action='store_true',
+        help='also write CSV copies of the cleaned and merged datasets when using a columnar format'
+    )
+    parser.add_argument(
+        '--impute', action='store_true',
+        help='fill gaps in the Gapminder indicators from the full multi-year panel and '
+             'log the imputed cells to data/processed/imputed_cells.csv'
+    )
+    parser.add_argument(
+        '--impute-methods', nargs='+', choices=['interpolate', 'ffill', 'bfill', 'median'],
+        default=['interpolate', 'ffill', 'bfill', 'median'],
+        help='imputation methods, tried in order for each gap (default: interpolate ffill '
+             'bfill median); median is the continent-year median'
+    )
+    parser.add_argument(
+        '--impute-window', type=int, default=3,
+        help='years an interpolated or filled value may reach from an observation (default: 3)'
+    )
+    parser.add_argument(
+        '--features', nargs='+', choices=['lag', 'change', 'growth', 'mean', 'std'], default=[],
+        help='derive time-series features of the Gapminder indicators from the full panel '
+             'and carry them into the merged data: lags, year-over-year change and growth, '
+             'rolling mean and standard deviation'
+    )
+    parser.add_argument(
+        '--feature-lags', nargs='+', type=int, default=[1],
+        help='lags in years for the lag features (default: 1)'
+    )
+    parser.add_argument(
+        '--feature-windows', nargs='+', type=int, default=[5],
+        help='window lengths in years for the rolling features (default: 5)'
+    )
+    parser.add_argument(
+        '--profile-mode', choices=['full', 'streaming'], default='full',
+        help='profile the cleaned data fully in memory (default) or stream it in chunks '
+             'with mergeable sketches for data larger than memory'
+    )
+    parser.add_argument(
+        '--chunksize', type=int, default=100_000,
+        help='rows per chunk in streaming profile mode (default: 100000)'
+    )
+    parser.add_argument(
+        '--bootstrap', type=int, default=1000,
+        help='bootstrap resamples for the correlation confidence intervals (default: 1000; '
+             '0 skips the intervals)'
+    )
+    parser.add_argument(
+        '--confidence', type=float, default=0.95,
+        help='confidence level of the correlation intervals (default: 0.95)'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='random seed of the bootstrap resamples (default: 0)'
+    )
+    parser.add_argument(
+        '--breakdown', nargs='*', choices=['continent', 'year'], default=[],
+        help='also correlate the indicators within each continent and/or year'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='workers used to profile datasets and column groups and to render figures '
+             'in parallel (default: 1)'
+    )
+    parser.add_argument(
+        '--executor', choices=['thread', 'process'], default='thread',
+        help='pool type used for parallel profiling (default: thread); figures always '
+             'render in worker processes'
+    )
+    parser.add_argument(
+        '--stage-workers', type=int, default=2,
+        help='stages run at the same time when their inputs are ready, e.g. profiling '
+             'and merging (default: 2; 1 runs the stages one after another)'
+    )
+    parser.add_argument(
+        '--trace-memory', action='store_true',
+        help='record tracemalloc allocation peaks in the run trace; this slows the '
+             'run down about threefold'
+    )
+    parser.add_argument(
+        '--cprofile', action='store_true',
+        help='profile the run with cProfile; the dump and the hottest functions go '
+             'next to the run trace'
+    )
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help='show which stages would run or be skipped, without running them'
+    )
+    parser.add_argument(
+        '--force', action='store_true',
+        help='re-run every stage even if its inputs, code and parameters are unchanged'
+    )
+    return parser.parse_args(argv)
+
+def check_dependencies(fmt=DEFAULT_FORMAT):
+    """Check if required packages are installed
+
+    Packages are located without importing them; the stages import what they
+    use when they run.
+    """
     print_header("CHECKING DEPENDENCIES")
     required_packages = ['pandas', 'numpy', 'matplotlib', 'seaborn']
+    if fmt != 'csv':
+        required_packages.append('pyarrow')
     missing_packages = []
     
     for package in required_packages:
-        try:
-            __import__(package)
+        if find_spec(package) is not None:
             print(f"✓ {package} is installed")
-        except ImportError:
+        else:
             print(f"✗ {package} is NOT installed")
             missing_packages.append(package)
     
@@ -65,13 +464,10 @@ def check_dependencies():
     print("\n✓ All dependencies are installed")
     return True
 
-def check_input_data():
+def check_input_data(years=DEFAULT_YEARS):
     """Check if required input data files exist"""
     print_header("CHECKING INPUT DATA")
-    required_files = [
-        'data/raw/2018.csv',
-        'data/raw/gapminder_data_graphs.csv'
-    ]
+    required_files = list(happiness_raw_paths(years, RAW_DATA_DIR).values()) + [GAPMINDER_RAW]
     
     all_exist = True
     for file_path in required_files:
@@ -89,25 +485,15 @@ def check_input_data():
     print("\n✓ All input data files are present")
     return True
 
-def verify_outputs():
+def verify_outputs(workflow_steps):
     """Verify that expected output files were created"""
     print_header("VERIFYING OUTPUTS")
     
-    expected_files = {
-        'Processed Data': [
-            'data/processed/happiness_2018_cleaned.csv',
-            'data/processed/gapminder_2018_cleaned.csv',
-            'data/processed/happiness_economy_2018.csv',
-            'data/processed/cleaning_provenance.json',
-            'data/processed/data_profile_report.json',
-            'data/processed/merge_report.json'
-        ],
-        'Visualizations': [
-            'results/gdp_happiness_scatter.png',
-            'results/life_exp_happiness_scatter.png',
-            'results/correlation_heatmap.png'
-        ]
-    }
+    expected_files = {'Processed Data': [], 'Visualizations': []}
+    for stage in workflow_steps:
+        for file_path in stage['outputs']:
+            category = 'Visualizations' if file_path.startswith(RESULTS_DIR) else 'Processed Data'
+            expected_files[category].append(file_path)
     
     all_created = True
     for category, files in expected_files.items():
@@ -124,45 +510,56 @@ def verify_outputs():
 
 def main():
     """Main execution function"""
+    args = parse_args()
     start_time = datetime.now()
     
     print_header("GLOBAL HAPPINESS AND ECONOMIC DEVELOPMENT PROJECT")
     print("Complete Workflow Automation")
-    print(f"Started at: {start_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+    print(f"Started at: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Years: {format_years(args.years)}\n")
     
     # Check dependencies
-    if not check_dependencies():
+    if not check_dependencies(args.format):
         print("\n✗ Dependency check failed. Exiting.")
         sys.exit(1)
     
     # Check input data
-    if not check_input_data():
+    if not check_input_data(args.years):
         print("\n✗ Input data check failed. Exiting.")
         sys.exit(1)
     
     # Define workflow steps
-    workflow_steps = [
-        ('src/clean_data.py', 'Data Cleaning'),
-        ('src/profile_data.py', 'Data Profiling'),
-        ('src/merge_data.py', 'Data Integration'),
-        ('src/visualize.py', 'Visualization Generation')
-    ]
+    options = vars(args)
+    workflow_steps = build_workflow(options)
     
-    # Execute workflow
+    if args.dry_run:
+        print_header("DRY RUN")
+        plan_workflow(workflow_steps, options)
+        return
+    
+    # Execute workflow; stages share DataFrames through an in-memory context
     print_header("EXECUTING WORKFLOW")
     
-    success = True
-    for script_path, script_name in workflow_steps:
-        if not run_script(script_path, script_name):
-            success = False
-            print(f"\n✗ Workflow failed at: {script_name}")
-            break
+    trace = instrumentation.RunTrace(
+        trace_memory=args.trace_memory, cprofile=args.cprofile,
+        metadata={'options': options}
+    )
+    with trace.activate():
+        success, schedule = execute_workflow(workflow_steps, options)
+    
+    print_header("STAGE SCHEDULE")
+    trace.metadata['schedule'] = print_schedule(workflow_steps, schedule)
+    trace_path = trace.save(PROCESSED_DIR)
+    
+    print_header("RUN TRACE")
+    instrumentation.print_trace_summary(trace)
+    print(f"\nRun trace saved to: {trace_path}")
     
     if success:
         print_header("WORKFLOW COMPLETED SUCCESSFULLY")
         
         # Verify outputs
-        if verify_outputs():
+        if verify_outputs(workflow_steps):
             print("\n✓ All expected output files were created")
         else:
             print("\n⚠ Some output files may be missing")
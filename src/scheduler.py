@@ -0,0 +1,201 @@
+"""
+Stage Scheduler for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Runs the workflow stages as a dependency graph instead of a fixed list. A
+stage depends on every stage that produces one of its declared inputs, so
+profiling and merging, which both read only the cleaned data, can run side
+by side once cleaning is done.
+
+Ready stages run on a thread pool up to a worker limit. A failed stage only
+blocks the stages downstream of it; the other branches run to completion.
+While several stages run at once, each stage's output is buffered and
+printed as one block when the stage finishes, so their logs do not
+interleave. After the run, the critical path (the chain of dependent stages
+with the largest total time) shows the shortest wall time the graph allows.
+
+Stages run on threads, so an exception escaping ``run`` fails that stage
+only. Stages that start process pools while other stage threads run must
+not fork them, since the child would inherit locks other threads hold;
+process_pool_context gives them a forkserver (or spawn) start method.
+"""
+
+import io
+import os
+import sys
+import time
+import threading
+import traceback
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+def stage_dependencies(stages):
+    """Map each stage id to the ids of the stages producing its inputs, in stage order"""
+    producers = {}
+    for stage in stages:
+        for path in stage['outputs']:
+            producers[path] = stage['id']
+    return {
+        stage['id']: [
+            other['id'] for other in stages
+            if other['id'] != stage['id'] and other['id'] in
+            {producers.get(path) for path in stage['inputs']}
+        ]
+        for stage in stages
+    }
+
+def topological_order(stages, dependencies):
+    """Order stages so each comes after its dependencies, keeping the declared order otherwise"""
+    ordered, placed = [], set()
+    remaining = list(stages)
+    while remaining:
+        ready = [stage for stage in remaining
+                 if all(dep in placed for dep in dependencies[stage['id']])]
+        if not ready:
+            cycle = ', '.join(stage['id'] for stage in remaining)
+            raise ValueError(f"Workflow stages depend on each other in a cycle: {cycle}")
+        stage = ready[0]
+        ordered.append(stage)
+        placed.add(stage['id'])
+        remaining.remove(stage)
+    return ordered
+
+def critical_path(stages, dependencies, seconds):
+    """Return the chain of dependent stages with the largest total time, and that time"""
+    finish, previous = {}, {}
+    for stage in topological_order(stages, dependencies):
+        stage_id = stage['id']
+        before = max(dependencies[stage_id], key=lambda dep: finish[dep], default=None)
+        previous[stage_id] = before
+        finish[stage_id] = seconds.get(stage_id, 0.0) + (finish[before] if before else 0.0)
+    if not finish:
+        return [], 0.0
+
+    stage_id = max(finish, key=finish.get)
+    total = finish[stage_id]
+    path = []
+    while stage_id is not None:
+        path.append(stage_id)
+        stage_id = previous[stage_id]
+    return path[::-1], total
+
+class ThreadBufferedOutput:
+    """Stream proxy that holds the writes of capturing threads until they are released
+
+    Threads that are not capturing, and forked worker processes, write
+    straight through to the wrapped stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.pid = os.getpid()
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    def capture(self):
+        """Start buffering the calling thread's output"""
+        self.buffers[threading.get_ident()] = io.StringIO()
+
+    def release(self):
+        """Stop buffering the calling thread's output and print it as one block"""
+        buffer = self.buffers.pop(threading.get_ident(), None)
+        if buffer is not None:
+            with self.lock:
+                self.stream.write(buffer.getvalue())
+                self.stream.flush()
+
+    def write(self, text):
+        buffer = self.buffers.get(threading.get_ident()) if os.getpid() == self.pid else None
+        if buffer is None:
+            return self.stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+@contextmanager
+def buffered_stdout():
+    """Route sys.stdout through a ThreadBufferedOutput for the duration of the block"""
+    original = sys.stdout
+    output = ThreadBufferedOutput(original)
+    sys.stdout = output
+    try:
+        yield output
+    finally:
+        sys.stdout = original
+
+def process_pool_context():
+    """Multiprocessing context for process pools started from stage threads"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def run_stage_graph(stages, run, workers=1):
+    """Run stages in dependency order, up to ``workers`` at a time
+
+    ``run(stage)`` executes one stage and returns its status ('ok', 'skipped'
+    or 'failed'); it is called from a pool thread when ``workers`` is above 1.
+    An exception raised by ``run`` fails that stage only.
+    Stages downstream of a failure are not run and get the status 'blocked'.
+    Returns a dict of stage id -> {'status', 'start', 'end', 'seconds'}, with
+    times in seconds from the start of the run, in topological order.
+    """
+    dependencies = stage_dependencies(stages)
+    pending = topological_order(stages, dependencies)
+    results = {}
+    run_start = time.perf_counter()
+
+    def timed(stage, output=None):
+        if output is not None:
+            output.capture()
+        start = time.perf_counter() - run_start
+        try:
+            status = run(stage)
+        except Exception:
+            print(f"✗ Error running stage {stage['id']}:")
+            traceback.print_exc(file=sys.stdout)
+            status = 'failed'
+        finally:
+            if output is not None:
+                output.release()
+        end = time.perf_counter() - run_start
+        return {'status': status, 'start': round(start, 4), 'end': round(end, 4),
+                'seconds': round(end - start, 4)}
+
+    def settle_blocked():
+        for stage in list(pending):
+            failed = [dep for dep in dependencies[stage['id']]
+                      if results.get(dep, {}).get('status') in ('failed', 'blocked')]
+            if failed:
+                pending.remove(stage)
+                results[stage['id']] = {'status': 'blocked', 'blocked_by': failed, 'seconds': 0.0}
+
+    if workers <= 1:
+        while pending:
+            settle_blocked()
+            if pending:
+                stage = pending.pop(0)
+                results[stage['id']] = timed(stage)
+        return {stage['id']: results[stage['id']] for stage in topological_order(stages, dependencies)}
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool, buffered_stdout() as output:
+        while pending or running:
+            settle_blocked()
+            ready = [stage for stage in pending
+                     if all(dep in results for dep in dependencies[stage['id']])]
+            for stage in ready[:workers - len(running)]:
+                pending.remove(stage)
+                running[pool.submit(timed, stage, output)] = stage
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                results[stage['id']] = future.result()
+
+    return {stage['id']: results[stage['id']] for stage in topological_order(stages, dependencies)}
@@ -0,0 +1,231 @@
+"""
+Typed Schemas for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Declares the in-memory column types of the cleaned and merged datasets:
+
+  - repeated strings (country, continent) as categoricals, so each name is
+    stored once and every row holds a small integer code
+  - measurements as float32; the sources report at most six significant
+    digits, which float32 keeps exactly
+  - ranks and years as int16
+
+Frames are cast to their schema when they are cleaned, merged or read back
+from storage, and the cast validates the frame: missing columns, missing or
+out-of-range integers and out-of-range floats raise a SchemaError.
+memory_usage_report compares a typed frame with the object/float64/int64
+layout pandas infers from CSV; memory_usage_from_counts gives the same report
+from the value and null counts a streamed profile keeps.
+
+float32 values are widened back to the float64 of their shortest decimal
+form before statistics are computed, so reports show 7.632 rather than the
+7.631999969482422 a plain cast gives.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+HAPPINESS_SCHEMA = {
+    'happiness_rank': 'int16',
+    'country': 'category',
+    'happiness_score': 'float32',
+    'happiness_gdp_contribution': 'float32',
+    'social_support': 'float32',
+    'happiness_life_exp_contribution': 'float32',
+    'freedom': 'float32',
+    'generosity': 'float32',
+    'corruption_perception': 'float32',
+    'year': 'int16'
+}
+
+GAPMINDER_SCHEMA = {
+    'country': 'category',
+    'continent': 'category',
+    'year': 'int16',
+    'life_expectancy': 'float32',
+    'hdi': 'float32',
+    'co2_per_capita': 'float32',
+    'gdp_per_capita': 'float32',
+    'service_workers_pct': 'float32'
+}
+
+SCHEMAS = {
+    'happiness_clean': HAPPINESS_SCHEMA,
+    'gapminder_clean': GAPMINDER_SCHEMA,
+    'merged': {
+        **HAPPINESS_SCHEMA,
+        **{col: dtype for col, dtype in GAPMINDER_SCHEMA.items() if col not in ('country', 'year')}
+    }
+}
+
+# Columns older Happiness releases may lack; they are typed when present
+OPTIONAL_COLUMNS = {'social_support', 'generosity', 'corruption_perception'}
+
+# Nine significant digits identify every float32 value; powers of ten up to
+# 1e22 are exact in float64
+FLOAT32_DIGITS = 9
+EXACT_POWER = 22
+
+# Bytes per row of an object column's pointer and of an int64/float64 value
+OBJECT_POINTER_BYTES = np.dtype(object).itemsize
+LEGACY_ITEM_BYTES = 8
+
+class SchemaError(ValueError):
+    """A frame does not fit its declared schema"""
+
+def _cast_integer(series, dtype, col):
+    if series.isnull().any():
+        raise SchemaError(f"{col}: {int(series.isnull().sum())} missing values in an {dtype} column")
+    values = series.to_numpy()
+    if len(values) and not np.array_equal(values, np.round(values)):
+        raise SchemaError(f"{col}: non-integer values in an {dtype} column")
+    limits = np.iinfo(dtype)
+    if len(values) and (values.min() < limits.min or values.max() > limits.max):
+        raise SchemaError(
+            f"{col}: values outside the {dtype} range [{limits.min}, {limits.max}]"
+        )
+    return series.astype(dtype)
+
+def _cast_float(series, dtype, col):
+    values = pd.to_numeric(series, errors='raise').to_numpy(dtype=np.float64)
+    limit = np.finfo(dtype).max
+    if np.any(np.abs(values[np.isfinite(values)]) > limit):
+        raise SchemaError(f"{col}: values outside the {dtype} range")
+    return series.astype(dtype)
+
+def apply_schema(df, dataset):
+    """Cast a frame to the declared schema of a dataset, validating every column
+
+    Columns outside the schema are kept as they are. Returns a new frame.
+    """
+    schema = SCHEMAS[dataset]
+    missing = [col for col in schema if col not in df.columns and col not in OPTIONAL_COLUMNS]
+    if missing:
+        raise SchemaError(f"{dataset}: missing columns {', '.join(missing)}")
+
+    casts = {}
+    for col, dtype in schema.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        try:
+            if dtype == 'category':
+                casts[col] = df[col].astype('category')
+            elif dtype.startswith('int'):
+                casts[col] = _cast_integer(df[col], dtype, col)
+            else:
+                casts[col] = _cast_float(df[col], dtype, col)
+        except (TypeError, ValueError) as exc:
+            if isinstance(exc, SchemaError):
+                raise SchemaError(f"{dataset}: {exc}") from None
+            raise SchemaError(f"{dataset}: {col} cannot be read as {dtype}: {exc}") from None
+    return df.assign(**casts) if casts else df
+
+def legacy_layout(df):
+    """Return the frame with the object/float64/int64 types pandas infers from CSV"""
+    casts = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            casts[col] = df[col].astype(object)
+        elif pd.api.types.is_float_dtype(dtype) and dtype != np.float64:
+            casts[col] = to_float64(df[col].to_numpy())
+        elif pd.api.types.is_integer_dtype(dtype) and dtype != np.int64:
+            casts[col] = df[col].astype(np.int64)
+    return df.assign(**casts) if casts else df
+
+def _object_bytes(values, counts=None):
+    """Deep bytes of an object array: one pointer per value plus the objects it points to"""
+    sizes = np.array([sys.getsizeof(value) for value in values], dtype=np.int64)
+    counts = np.ones(len(values), dtype=np.int64) if counts is None else np.asarray(counts)
+    return int(OBJECT_POINTER_BYTES * counts.sum() + sizes @ counts)
+
+def _categorical_bytes(series):
+    # Codes plus the category values; the lookup table pandas builds on the
+    # categories when they are first searched is left out, as it depends on
+    # which operations ran before
+    return series.cat.codes.nbytes + _object_bytes(series.cat.categories.to_numpy(dtype=object))
+
+def _usage_report(dtypes, typed, legacy):
+    total_typed, total_legacy = int(sum(typed.values())), int(sum(legacy.values()))
+    return {
+        'columns': {
+            col: {
+                'dtype': str(dtype),
+                'bytes': int(typed[col]),
+                'legacy_bytes': int(legacy[col])
+            }
+            for col, dtype in dtypes.items()
+        },
+        'total_bytes': total_typed,
+        'legacy_total_bytes': total_legacy,
+        'saved_pct': round(100 * (1 - total_typed / total_legacy), 1) if total_legacy else 0.0
+    }
+
+def memory_usage_report(df):
+    """Compare a frame's memory with its legacy layout, per column and in total (bytes)"""
+    typed = {
+        col: _categorical_bytes(df[col]) if isinstance(dtype, pd.CategoricalDtype)
+        else df[col].memory_usage(deep=True, index=False)
+        for col, dtype in df.dtypes.items()
+    }
+    legacy = legacy_layout(df).memory_usage(deep=True, index=False).to_dict()
+    return _usage_report(df.dtypes, typed, legacy)
+
+def memory_usage_from_counts(dtypes, row_count, value_counts, null_count):
+    """memory_usage_report computed from column types and counts instead of a frame
+
+    ``value_counts`` holds the counts of every categorical and object column
+    and ``null_count`` the missing values of each column, as a streamed
+    profile keeps them. Categoricals are taken to hold only the categories
+    that occur, as apply_schema leaves them, so the result equals
+    memory_usage_report of the whole frame.
+    """
+    typed, legacy = {}, {}
+    for col, dtype in dtypes.items():
+        if col in value_counts:
+            counts = value_counts[col]
+            counts = counts[counts > 0]
+            values = counts.index.to_numpy(dtype=object)
+            # Missing values become NaN objects in the legacy layout
+            legacy[col] = (_object_bytes(values, counts.to_numpy())
+                           + int(null_count[col]) * (OBJECT_POINTER_BYTES + sys.getsizeof(np.nan)))
+            if isinstance(dtype, pd.CategoricalDtype):
+                code_bytes = pd.Categorical(values).codes.itemsize
+                typed[col] = code_bytes * row_count + _object_bytes(values)
+            else:
+                typed[col] = legacy[col]
+        else:
+            typed[col] = np.dtype(dtype).itemsize * row_count
+            legacy[col] = LEGACY_ITEM_BYTES * row_count
+    return _usage_report(dtypes, typed, legacy)
+
+def to_float64(values):
+    """Widen values to float64, taking float32 values at their shortest decimal form
+
+    Each float32 value becomes the float64 nearest to the shortest decimal
+    that rounds to it, which is what parsing its repr would give. Values
+    beyond about 1e±22 are widened as they are.
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values.astype(np.float64)
+
+    wide = values.astype(np.float64)
+    result = wide.copy()
+    pending = np.flatnonzero(np.isfinite(wide) & (wide != 0))
+    exponent = np.floor(np.log10(np.abs(wide[pending]))).astype(np.int64)
+    for digits in range(1, FLOAT32_DIGITS + 1):
+        if not len(pending):
+            break
+        scale = digits - 1 - exponent
+        # Scale by exact powers of ten so the final division or product is
+        # correctly rounded, as parsing the decimal would be
+        up = np.power(10.0, np.maximum(scale, 0))
+        down = np.power(10.0, np.maximum(-scale, 0))
+        candidate = np.round(wide[pending] * up / down) * down / up
+        fits = (candidate.astype(np.float32) == values[pending]) & (np.abs(scale) <= EXACT_POWER)
+        result[pending[fits]] = candidate[fits]
+        pending, exponent = pending[~fits], exponent[~fits]
+    return result
@@ -0,0 +1,77 @@
+"""
+Stage Fingerprint Cache for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Records a fingerprint of every workflow stage (input file hashes, stage code
+hash and parameters) so that run_all.py can skip stages whose fingerprint
+matches the last successful run and whose outputs still exist.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from fingerprint import calculate_file_hashes
+
+CACHE_FILENAME = 'stage_fingerprints.json'
+
+def load_stage_cache(cache_dir):
+    """Load the fingerprints recorded by previous runs"""
+    cache_path = os.path.join(cache_dir, CACHE_FILENAME)
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt cache only costs a full rebuild
+        return {}
+
+def save_stage_cache(cache, cache_dir):
+    """Persist the stage fingerprints"""
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, CACHE_FILENAME)
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+def compute_stage_fingerprint(stage, cache_dir=None):
+    """Hash the stage's code files, input files and parameters into one digest
+
+    Returns None when an input or code file is missing, which forces the
+    stage to run. File digests are reused from cache_dir's hash cache for
+    files that have not changed since they were last hashed.
+    """
+    paths = stage.get('code', []) + stage.get('inputs', [])
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    digests = calculate_file_hashes(paths, cache_dir)
+    parts = {
+        'code': {path: digests[path] for path in stage.get('code', [])},
+        'inputs': {path: digests[path] for path in stage.get('inputs', [])},
+        'params': stage.get('params', {})
+    }
+    
+    payload = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+def is_stage_up_to_date(stage, fingerprint, cache):
+    """Check whether a stage can be skipped"""
+    if fingerprint is None:
+        return False
+    entry = cache.get(stage['id'])
+    if not entry or entry.get('fingerprint') != fingerprint:
+        return False
+    return all(os.path.exists(path) for path in stage.get('outputs', []))
+
+def record_stage_run(stage, fingerprint, cache):
+    """Remember the fingerprint of a successful stage run"""
+    if fingerprint is None:
+        cache.pop(stage['id'], None)
+        return
+    cache[stage['id']] = {
+        'fingerprint': fingerprint,
+        'outputs': list(stage.get('outputs', [])),
+        'timestamp': datetime.now().isoformat()
+    }
@@ -0,0 +1,234 @@
+"""
+Intermediate Storage Helpers for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Every processed dataset is partitioned by year: one file per year, named after
+the dataset and the year (e.g. happiness_2018_cleaned.csv).
+
+Partitions can be stored as CSV (the default, published format) or in a typed
+columnar format: Feather (Arrow IPC) or Parquet. Columnar formats need pyarrow
+and are read with memory mapping, so downstream stages skip text parsing.
+
+Partitions read back are cast to their typed schema (see schemas), since
+CSV does not keep categoricals or narrow numeric types.
+
+CSV partitions keep the column layout published before the data was
+partitioned by year: cleaned Happiness files have no year column (the year is
+in the file name) and merged files list year after continent. Partitions are
+given the working layout again when they are read.
+
+The workflow runner imports this module at startup, so pandas is only
+imported by the functions that read data.
+"""
+
+import os
+from importlib.util import find_spec
+
+from instrumentation import traced
+
+DEFAULT_YEARS = [2018]
+
+INTERMEDIATE_FORMATS = {
+    'csv': '.csv',
+    'feather': '.feather',
+    'parquet': '.parquet'
+}
+DEFAULT_FORMAT = 'csv'
+
+PARTITION_TEMPLATES = {
+    'happiness_clean': 'happiness_{year}_cleaned',
+    'gapminder_clean': 'gapminder_{year}_cleaned',
+    'merged': 'happiness_economy_{year}'
+}
+
+def parse_years(text):
+    """Parse a year specification such as '2018', '2015-2019' or '2015,2017'"""
+    years = set()
+    for part in str(text).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+            if start > end:
+                raise ValueError(f"Invalid year range: {part}")
+            years.update(range(start, end + 1))
+        else:
+            years.add(int(part))
+    if not years:
+        raise ValueError(f"No years given in: {text!r}")
+    return sorted(years)
+
+def format_years(years):
+    """Format a list of years for titles and log messages"""
+    years = sorted(years)
+    if len(years) == 1:
+        return str(years[0])
+    if years == list(range(years[0], years[-1] + 1)):
+        return f"{years[0]}-{years[-1]}"
+    return ", ".join(str(year) for year in years)
+
+def years_argument(years):
+    """Format years as a --years value parse_years reads back, e.g. '2015-2017,2019'"""
+    years = sorted(set(years))
+    runs = []
+    for year in years:
+        if runs and year == runs[-1][1] + 1:
+            runs[-1][1] = year
+        else:
+            runs.append([year, year])
+    return ','.join(str(start) if start == end else f"{start}-{end}" for start, end in runs)
+
+def happiness_raw_paths(years=DEFAULT_YEARS, raw_dir='data/raw'):
+    """Map each year to its World Happiness Report file (data/raw/<year>.csv)"""
+    return {year: os.path.join(raw_dir, f'{year}.csv') for year in sorted(years)}
+
+def check_format(fmt):
+    """Validate an intermediate format and make sure its dependencies are installed"""
+    if fmt not in INTERMEDIATE_FORMATS:
+        raise ValueError(
+            f"Unknown intermediate format {fmt!r}; choose from {', '.join(INTERMEDIATE_FORMATS)}"
+        )
+    if fmt != 'csv' and find_spec('pyarrow') is None:
+        raise ImportError(
+            f"The {fmt} intermediate format requires pyarrow. "
+            "Please run: pip install pyarrow"
+        )
+    return fmt
+
+def partition_path(dataset, year, directory='data/processed', fmt=DEFAULT_FORMAT):
+    """Return the file path of one year partition of a processed dataset"""
+    filename = PARTITION_TEMPLATES[dataset].format(year=year) + INTERMEDIATE_FORMATS[fmt]
+    return os.path.join(directory, filename)
+
+def partition_paths(dataset, years, directory='data/processed', fmt=DEFAULT_FORMAT):
+    """Return the file paths of several year partitions of a processed dataset"""
+    return [partition_path(dataset, year, directory, fmt) for year in sorted(years)]
+
+def write_frame(df, path, fmt=DEFAULT_FORMAT):
+    """Write a single frame in the given format"""
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+    elif fmt == 'feather':
+        # Uncompressed Arrow IPC can be memory-mapped without decoding
+        df.reset_index(drop=True).to_feather(path, compression='uncompressed')
+    elif fmt == 'parquet':
+        df.to_parquet(path, index=False)
+
+def read_frame(path, fmt=DEFAULT_FORMAT):
+    """Read a single frame, memory-mapping columnar files"""
+    import pandas as pd
+    
+    if fmt == 'csv':
+        return pd.read_csv(path)
+    if fmt == 'feather':
+        from pyarrow import feather
+        table = feather.read_table(path, memory_map=True)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    return pd.read_parquet(path, memory_map=True)
+
+def iter_frame_chunks(path, fmt=DEFAULT_FORMAT, chunksize=100_000):
+    """Yield a stored frame in chunks without loading the whole file"""
+    if fmt == 'csv':
+        import pandas as pd
+        yield from pd.read_csv(path, chunksize=chunksize)
+    elif fmt == 'feather':
+        from pyarrow import feather
+        table = feather.read_table(path, memory_map=True)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+def _move_column(df, col, anchor, offset):
+    """Place a column just before (offset 0) or after (offset 1) another one"""
+    if col not in df.columns or anchor not in df.columns:
+        return df
+    columns = [c for c in df.columns if c != col]
+    position = columns.index(anchor) + offset
+    return df[columns[:position] + [col] + columns[position:]]
+
+def published_layout(df, dataset):
+    """Return a partition in the column layout of the published CSV files"""
+    if dataset == 'happiness_clean':
+        return df.drop(columns='year')
+    if dataset == 'merged':
+        return _move_column(df, 'year', 'continent', 1)
+    return df
+
+def working_layout(df, dataset, year):
+    """Return a partition read from a published CSV file in the working layout"""
+    if dataset == 'happiness_clean' and 'year' not in df.columns:
+        return df.assign(year=year)
+    if dataset == 'merged':
+        return _move_column(df, 'year', 'continent', 0)
+    return df
+
+@traced
+def write_partitions(df, dataset, directory='data/processed', fmt=DEFAULT_FORMAT,
+                     export_csv=False):
+    """Write a frame as one file per year and return the written paths
+
+    With ``export_csv`` a CSV copy of every partition is written alongside
+    the columnar files. CSV files get the published layout (see
+    published_layout).
+    """
+    check_format(fmt)
+    os.makedirs(directory, exist_ok=True)
+    formats = [fmt] + (['csv'] if export_csv and fmt != 'csv' else [])
+    paths = []
+    for year, partition in df.groupby('year', sort=True):
+        for f in formats:
+            path = partition_path(dataset, year, directory, f)
+            write_frame(published_layout(partition, dataset) if f == 'csv' else partition,
+                        path, f)
+            paths.append(path)
+    return paths
+
+def _read_partition(dataset, year, directory, fmt):
+    df = read_frame(partition_path(dataset, year, directory, fmt), fmt)
+    return working_layout(df, dataset, year) if fmt == 'csv' else df
+
+@traced
+def read_partitions(dataset, years=DEFAULT_YEARS, directory='data/processed',
+                    fmt=DEFAULT_FORMAT):
+    """Read the requested year partitions of a dataset into one validated, typed frame"""
+    from schemas import apply_schema
+    
+    check_format(fmt)
+    frames = [
+        _read_partition(dataset, year, directory, fmt)
+        for year in sorted(years)
+    ]
+    if len(frames) == 1:
+        return apply_schema(frames[0], dataset)
+    
+    import pandas as pd
+    # Categoricals of different partitions concatenate to object; re-type after
+    return apply_schema(pd.concat(frames, ignore_index=True), dataset)
+
+def iter_partition_chunks(dataset, years=DEFAULT_YEARS, directory='data/processed',
+                          fmt=DEFAULT_FORMAT, chunksize=100_000):
+    """Yield the requested year partitions of a dataset chunk by chunk, each typed"""
+    from schemas import apply_schema
+    
+    check_format(fmt)
+    for year in sorted(years):
+        for chunk in iter_frame_chunks(partition_path(dataset, year, directory, fmt), fmt, chunksize):
+            if fmt == 'csv':
+                chunk = working_layout(chunk, dataset, year)
+            yield apply_schema(chunk, dataset)
+
+def figure_output_dirs(years, output_dir='results'):
+    """Map each year to the directory its figures are rendered into
+
+    A single year renders straight into output_dir; several years render
+    into one sub-directory per year (e.g. results/2016/).
+    """
+    years = sorted(years)
+    if len(years) == 1:
+        return {years[0]: output_dir}
+    return {year: os.path.join(output_dir, str(year)) for year in years}
@@ -0,0 +1,401 @@
+"""
+Streaming Profiler for Global Happiness and Economic Development Project
+Author: Gregorius Aviantoro
+Date: December 2025
+
+Profiles a dataset chunk by chunk, keeping only mergeable running state:
+
+  - central moments (count, mean, M2, M3, M4), combined with the parallel
+    update formulas of Chan et al. / Pebay, for mean, std, skewness, kurtosis
+  - a compacting quantile sketch per numeric column for quartiles, the median
+    and the IQR outlier bounds (exact until a column outgrows its capacity)
+  - a HyperLogLog sketch per numeric column for Unique_Values (exact while
+    the column has few distinct values)
+  - exact null, negative and categorical value counts
+  - a HyperLogLog sketch of 64-bit row hashes for the duplicate row count
+    (exact up to 2**ROW_HLL_PRECISION / 4 distinct rows; beyond that the
+    count is reported as unknown, None, since the sketch error would exceed it)
+
+Two states built on different chunks can be merged, and the final state is
+turned into the same profile dict as profile_engine.compute_profile, so
+profile_data renders exactly the same data_profile_report.json schema.
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+from profile_engine import QUANTILES, build_profile, numeric_block, sort_value_counts
+
+DEFAULT_SKETCH_CAPACITY = 4096
+DEFAULT_HLL_PRECISION = 14
+
+# Row hashes are counted exactly up to 65,536 distinct rows, in 256 KB of registers beyond
+ROW_HLL_PRECISION = 18
+
+class QuantileSketch:
+    """Mergeable compacting quantile sketch
+
+    Items live in levels; an item at level i stands for 2**i input values.
+    When a level outgrows the capacity it is sorted and every other item is
+    promoted to the next level. While nothing has been compacted the sketch
+    holds every value and answers queries exactly.
+    """
+
+    def __init__(self, capacity=DEFAULT_SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.offsets = [0]
+
+    def update(self, values):
+        """Add an array of non-missing values"""
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=np.float64)])
+        self._compact()
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+                self.offsets.append(0)
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compact()
+
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity:
+                items = np.sort(items)
+                keep = items[len(items) - len(items) % 2:]
+                pairs = items[:len(items) - len(items) % 2]
+                # Alternate the offset so promotions do not bias low or high
+                promoted = pairs[self.offsets[level]::2]
+                self.offsets[level] ^= 1
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                    self.offsets.append(0)
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def is_exact(self):
+        """True while every input value is still held at level 0"""
+        return all(len(items) == 0 for items in self.levels[1:])
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantile(self, q):
+        """Estimate a quantile with the same linear interpolation as pandas when exact"""
+        if self.is_exact():
+            items = self.levels[0]
+            return float(np.percentile(items, q * 100)) if len(items) else np.nan
+        items, weights = self._weighted_items()
+        cumulative = np.cumsum(weights)
+        rank = q * (cumulative[-1] - 1)
+        return float(items[np.searchsorted(cumulative, rank, side='right')])
+
+    def median(self):
+        """Estimate the median, computed like numpy.median when exact"""
+        if self.is_exact():
+            items = self.levels[0]
+            return float(np.median(items)) if len(items) else np.nan
+        return self.quantile(0.5)
+
+    def count_below(self, value):
+        """Estimated number of values strictly below ``value``"""
+        items, weights = self._weighted_items()
+        return int(round(weights[items < value].sum()))
+
+    def count_above(self, value):
+        """Estimated number of values strictly above ``value``"""
+        items, weights = self._weighted_items()
+        return int(round(weights[items > value].sum()))
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over 64-bit hashes
+
+    Small cardinalities are counted exactly from the set of hashes (a sparse
+    representation); once that set outgrows a quarter of the register count it
+    is folded into the dense HyperLogLog registers.
+    """
+
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        self.precision = precision
+        self.sparse_limit = 2 ** precision // 4
+        self.sparse = np.empty(0, dtype=np.uint64)
+        self.registers = None
+
+    def update(self, values):
+        """Add an array of non-missing values"""
+        if len(values) == 0:
+            return
+        self._add_hashes(pd.util.hash_array(np.asarray(values)))
+
+    def _add_hashes(self, hashes):
+        if self.registers is None:
+            self.sparse = np.union1d(self.sparse, hashes)
+            if len(self.sparse) <= self.sparse_limit:
+                return
+            hashes, self.sparse = self.sparse, np.empty(0, dtype=np.uint64)
+            self.registers = np.zeros(2 ** self.precision, dtype=np.uint8)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # Guard bit keeps the rank bounded when the remaining bits are all zero
+        rest = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        high = (rest >> np.uint64(32)).astype(np.float64)
+        low = (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        bit_length = np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+        rank = (65 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        if other.registers is None:
+            self._add_hashes(other.sparse)
+            return
+        if self.registers is None:
+            sparse = self.sparse
+            self.sparse = np.empty(0, dtype=np.uint64)
+            self.registers = other.registers.copy()
+            self._add_hashes(sparse)
+            return
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        """Estimated number of distinct values (exact in sparse mode)"""
+        if self.registers is None:
+            return len(self.sparse)
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and zeros > 0:
+            # Linear counting is far more accurate at small cardinalities
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+def _add_counts(counts, more):
+    """Add value counts, keeping values in order of first occurrence
+
+    pandas orders tied counts by first occurrence, so keeping that order lets
+    sort_value_counts give the same top values as a whole-frame value_counts.
+    """
+    new = more.index[~more.index.isin(counts.index)]
+    index = counts.index.append(new)
+    return (counts.reindex(index, fill_value=0)
+            + more.reindex(index, fill_value=0)).astype(np.int64)
+
+def _chunk_moments(block, valid):
+    """Count, mean and central moment sums of every column of a chunk"""
+    counts = valid.sum(axis=0).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(valid, block, 0.0).sum(axis=0) / counts
+    means = np.where(counts > 0, means, 0.0)
+    centered = np.where(valid, block - means, 0.0)
+    squared = centered ** 2
+    return counts, means, squared.sum(axis=0), (squared * centered).sum(axis=0), (squared ** 2).sum(axis=0)
+
+def _merge_moments(a, b):
+    """Combine two sets of moments with the parallel (Pebay) update formulas"""
+    n_a, mean_a, m2_a, m3_a, m4_a = a
+    n_b, mean_b, m2_b, m3_b, m4_b = b
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        delta_n = np.where(n > 0, delta / n, 0.0)
+        mean = mean_a + delta_n * n_b
+        m2 = m2_a + m2_b + delta * delta_n * n_a * n_b
+        m3 = (m3_a + m3_b
+              + delta * delta_n ** 2 * n_a * n_b * (n_a - n_b)
+              + 3 * delta_n * (n_a * m2_b - n_b * m2_a))
+        m4 = (m4_a + m4_b
+              + delta * delta_n ** 3 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b)
+              + 6 * delta_n ** 2 * (n_a * n_a * m2_b + n_b * n_b * m2_a)
+              + 4 * delta_n * (n_a * m3_b - n_b * m3_a))
+    return n, np.where(n > 0, mean, 0.0), m2, m3, m4
+
+class StreamingProfile:
+    """Running, mergeable profile state of one dataset"""
+
+    def __init__(self, sketch_capacity=DEFAULT_SKETCH_CAPACITY,
+                 hll_precision=DEFAULT_HLL_PRECISION):
+        self.sketch_capacity = sketch_capacity
+        self.hll_precision = hll_precision
+        self.dtypes = None
+        self.numeric_columns = []
+        self.row_count = 0
+
+    def _initialize(self, chunk):
+        self.dtypes = chunk.dtypes.copy()
+        self.numeric_columns = list(chunk.select_dtypes(include=[np.number]).columns)
+        k = len(self.numeric_columns)
+        self.moments = tuple(np.zeros(k) for _ in range(5))
+        self.minimum = np.full(k, np.inf)
+        self.maximum = np.full(k, -np.inf)
+        self.negative_count = np.zeros(k, dtype=np.int64)
+        self.null_count = pd.Series(0, index=chunk.columns, dtype=np.int64)
+        self.sketches = [QuantileSketch(self.sketch_capacity) for _ in range(k)]
+        self.distinct = [HyperLogLog(self.hll_precision) for _ in range(k)]
+        self.value_counts = {
+            col: pd.Series(dtype=np.int64)
+            for col in chunk.select_dtypes(include=['object', 'category']).columns
+        }
+        self.rows = HyperLogLog(ROW_HLL_PRECISION)
+
+    def _row_hashes(self, chunk):
+        # Hash numeric columns as float64 so a column parsed as int in one
+        # chunk and float in another still hashes identically
+        normalized = chunk.astype({col: np.float64 for col in self.numeric_columns})
+        return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+    def update(self, chunk):
+        """Fold one chunk of rows into the running state"""
+        if self.dtypes is None:
+            self._initialize(chunk)
+        else:
+            # A column parsed as int in early chunks may turn float once NaNs appear
+            for col in self.numeric_columns:
+                self.dtypes[col] = np.result_type(self.dtypes[col], chunk[col].dtype)
+        if len(chunk) == 0:
+            return self
+
+        block = numeric_block(chunk, self.numeric_columns)
+        valid = ~np.isnan(block)
+        self.moments = _merge_moments(self.moments, _chunk_moments(block, valid))
+        self.minimum = np.minimum(self.minimum, np.where(valid, block, np.inf).min(axis=0))
+        self.maximum = np.maximum(self.maximum, np.where(valid, block, -np.inf).max(axis=0))
+        with np.errstate(invalid='ignore'):
+            self.negative_count += (block < 0).sum(axis=0)
+        self.null_count += chunk.isnull().sum()
+
+        for i in range(len(self.numeric_columns)):
+            values = block[valid[:, i], i]
+            self.sketches[i].update(values)
+            self.distinct[i].update(values)
+
+        for col in self.value_counts:
+            values = chunk[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Chunks carry different categories; count them as plain values
+                values = values.astype(object)
+            self.value_counts[col] = _add_counts(
+                self.value_counts[col], values.value_counts(sort=False)
+            )
+
+        self.rows._add_hashes(np.unique(self._row_hashes(chunk)))
+        self.row_count += len(chunk)
+        return self
+
+    def merge(self, other):
+        """Fold the state of another chunk range of the same dataset into this one"""
+        if other.dtypes is None:
+            return self
+        if self.dtypes is None:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            return self
+        for col in self.numeric_columns:
+            self.dtypes[col] = np.result_type(self.dtypes[col], other.dtypes[col])
+        self.moments = _merge_moments(self.moments, other.moments)
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        self.negative_count = self.negative_count + other.negative_count
+        self.null_count = self.null_count + other.null_count
+        for mine, theirs in zip(self.sketches, other.sketches):
+            mine.merge(theirs)
+        for mine, theirs in zip(self.distinct, other.distinct):
+            mine.merge(theirs)
+        for col in self.value_counts:
+            self.value_counts[col] = _add_counts(self.value_counts[col], other.value_counts[col])
+        self.rows.merge(other.rows)
+        self.row_count += other.row_count
+        return self
+
+    def _numeric_statistics(self):
+        counts, means, m2, m3, m4 = self.moments
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(counts > 1, np.sqrt(m2 / (counts - 1)), np.nan)
+            skewness = (counts * (counts - 1) ** 0.5 / (counts - 2)) * (m3 / m2 ** 1.5)
+            skewness = np.where(m2 == 0, 0.0, skewness)
+            skewness = np.where(counts < 3, np.nan, skewness)
+            numerator = counts * (counts + 1) * (counts - 1) * m4
+            denominator = (counts - 2) * (counts - 3) * m2 ** 2
+            adjustment = 3 * (counts - 1) ** 2 / ((counts - 2) * (counts - 3))
+            kurtosis = np.where(denominator == 0, 0.0, numerator / denominator - adjustment)
+            kurtosis = np.where(counts < 4, np.nan, kurtosis)
+
+        empty = counts == 0
+        quantiles = {
+            q: np.array([sketch.quantile(q) for sketch in self.sketches]) for q in QUANTILES
+        }
+        iqr = quantiles[0.75] - quantiles[0.25]
+        outliers = [
+            sketch.count_below(low) + sketch.count_above(high) if not np.isnan(low) else 0
+            for sketch, low, high in zip(
+                self.sketches, quantiles[0.25] - 1.5 * iqr, quantiles[0.75] + 1.5 * iqr
+            )
+        ]
+
+        return pd.DataFrame({
+            'count': counts,
+            'mean': np.where(empty, np.nan, means),
+            'std': std,
+            'min': np.where(empty, np.nan, self.minimum),
+            '25%': quantiles[0.25],
+            '50%': quantiles[0.5],
+            '75%': quantiles[0.75],
+            'max': np.where(empty, np.nan, self.maximum),
+            'median': [sketch.median() for sketch in self.sketches],
+            'skewness': skewness,
+            'kurtosis': kurtosis,
+            'null_count': self.null_count[self.numeric_columns].to_numpy(),
+            'unique': [hll.estimate() for hll in self.distinct],
+            'negative_count': self.negative_count,
+            'outlier_count': np.asarray(outliers, dtype=np.int64)
+        }, index=pd.Index(self.numeric_columns))
+
+    def to_profile(self):
+        """Return the profile dict consumed by the profile_data report sections"""
+        numeric = self._numeric_statistics()
+        other_cols = self.dtypes.index.difference(self.numeric_columns, sort=False)
+        other_unique = pd.Series(
+            {col: len(self.value_counts.get(col, ())) for col in other_cols}, dtype=np.int64
+        )
+        value_counts = {
+            col: sort_value_counts(counts[counts > 0])
+            for col, counts in self.value_counts.items()
+        }
+        # Past its exact range the row sketch's error exceeds any plausible
+        # duplicate count, so the count is reported as unknown
+        duplicate_rows = None if self.rows.registers is not None else (
+            self.row_count - self.rows.estimate()
+        )
+        return build_profile(
+            numeric, self.null_count[other_cols], other_unique, self.dtypes, value_counts,
+            duplicate_rows, self.row_count
+        )
+
+@traced
+def profile_chunks(chunks, sketch_capacity=DEFAULT_SKETCH_CAPACITY,
+                   hll_precision=DEFAULT_HLL_PRECISION):
+    """Build a StreamingProfile from an iterable of DataFrame chunks"""
+    state = StreamingProfile(sketch_capacity, hll_precision)
+    for chunk in chunks:
+        state.update(chunk)
+    return state
+
+def merge_profiles(profiles, sketch_capacity=DEFAULT_SKETCH_CAPACITY,
+                   hll_precision=DEFAULT_HLL_PRECISION):
+    """Merge the StreamingProfiles of consecutive row ranges, in order"""
+    state = StreamingProfile(sketch_capacity, hll_precision)
+    for profile in profiles:
+        state.merge(profile)
+    return state
@@ -2,75 +2,103 @@
 Visualization Script for Global Happiness and Economic Development Project
 Author: Gregorius Aviantoro
 Date: November 2025
+
+Figures are drawn with the object-oriented Figure API and rendered by the Agg
+backend, without touching pyplot's global state. Independent figures can be
+rendered in parallel worker processes; each worker receives the merged frame
+once through the pool initializer instead of re-reading it.
 """
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 import os
 
-def load_merged_data():
-    """Load the merged dataset"""
+from analysis import correlation_matrix
+from instrumentation import traced
+from scheduler import process_pool_context
+from schemas import to_float64
+from storage import (
+    DEFAULT_FORMAT, DEFAULT_YEARS, figure_output_dirs, format_years, read_partitions
+)
+
+CONTINENT_COLORS = {'Africa': 'red', 'Americas': 'blue', 'Asia': 'green',
+                    'Europe': 'purple', 'Oceania': 'orange'}
+
+def load_merged_data(years=DEFAULT_YEARS, fmt=DEFAULT_FORMAT):
+    """Load the merged dataset for the requested years"""
     print("Loading merged dataset...")
     processed_dir = 'data/processed'
-    merged_path = os.path.join(processed_dir, 'happiness_economy_2018.csv')
-    df = pd.read_csv(merged_path)
+    df = read_partitions('merged', years, processed_dir, fmt)
     print(f"Loaded {len(df)} countries")
     return df
 
+def year_label(df):
+    """Return the year(s) covered by a frame, for plot titles"""
+    return format_years(df['year'].unique())
+
+def new_figure(figsize):
+    """Create a standalone figure rendered by the Agg backend"""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def save_figure(fig, output_dir, filename):
+    """Save a figure as a 300 dpi PNG and report where it went"""
+    output_path = os.path.join(output_dir, filename)
+    fig.savefig(output_path, dpi=300, bbox_inches='tight')
+    print(f"Saved to: {output_path}")
+
+def create_grouped_scatter(df, output_dir, x, y, x_label, y_label, title, filename,
+                           group='continent', colors=CONTINENT_COLORS):
+    """Create a scatterplot of any two columns, coloured by group
+
+    Groups are factorized once and every point gets its colour from the group
+    codes, so the whole plot is a single scatter collection. The legend uses
+    one proxy marker per group, in order of first appearance.
+    """
+    fig = new_figure((12, 8))
+    ax = fig.add_subplot()
+    
+    codes, groups = pd.factorize(df[group])
+    palette = to_rgba_array([colors.get(name, 'gray') for name in groups] or ['gray'])
+    grouped = codes >= 0
+    ax.scatter(to_float64(df[x].to_numpy())[grouped], to_float64(df[y].to_numpy())[grouped],
+               c=palette[codes[grouped]], alpha=0.6, s=100)
+    
+    handles = [Line2D([], [], linestyle='', marker='o', markersize=np.sqrt(100),
+                      color=color, alpha=0.6, label=name)
+               for name, color in zip(groups, palette)]
+    
+    ax.set_xlabel(x_label, fontsize=12)
+    ax.set_ylabel(y_label, fontsize=12)
+    ax.set_title(f'{title} ({year_label(df)})', fontsize=14)
+    ax.legend(handles=handles, title=group.capitalize())
+    ax.grid(True, alpha=0.3)
+    
+    save_figure(fig, output_dir, filename)
+
 def create_gdp_happiness_scatter(df, output_dir):
     """Create scatterplot: GDP per capita vs Happiness Score"""
     print("\nCreating GDP vs Happiness scatterplot...")
-    
-    plt.figure(figsize=(12, 8))
-    
-    continents = df['continent'].unique()
-    colors = {'Africa': 'red', 'Americas': 'blue', 'Asia': 'green', 
-              'Europe': 'purple', 'Oceania': 'orange'}
-    
-    for continent in continents:
-        data = df[df['continent'] == continent]
-        plt.scatter(data['gdp_per_capita'], data['happiness_score'], 
-                   label=continent, alpha=0.6, s=100, 
-                   color=colors.get(continent, 'gray'))
-    
-    plt.xlabel('GDP per Capita (USD)', fontsize=12)
-    plt.ylabel('Happiness Score', fontsize=12)
-    plt.title('GDP per Capita vs Happiness Score by Continent (2018)', fontsize=14)
-    plt.legend(title='Continent')
-    plt.grid(True, alpha=0.3)
-    
-    output_path = os.path.join(output_dir, 'gdp_happiness_scatter.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    print(f"Saved to: {output_path}")
-    plt.close()
+    create_grouped_scatter(
+        df, output_dir, 'gdp_per_capita', 'happiness_score',
+        'GDP per Capita (USD)', 'Happiness Score',
+        'GDP per Capita vs Happiness Score by Continent', 'gdp_happiness_scatter.png'
+    )
 
 def create_life_exp_happiness_scatter(df, output_dir):
     """Create scatterplot: Life Expectancy vs Happiness Score"""
     print("\nCreating Life Expectancy vs Happiness scatterplot...")
-    
-    plt.figure(figsize=(12, 8))
-    
-    continents = df['continent'].unique()
-    colors = {'Africa': 'red', 'Americas': 'blue', 'Asia': 'green', 
-              'Europe': 'purple', 'Oceania': 'orange'}
-    
-    for continent in continents:
-        data = df[df['continent'] == continent]
-        plt.scatter(data['life_expectancy'], data['happiness_score'], 
-                   label=continent, alpha=0.6, s=100, 
-                   color=colors.get(continent, 'gray'))
-    
-    plt.xlabel('Life Expectancy (years)', fontsize=12)
-    plt.ylabel('Happiness Score', fontsize=12)
-    plt.title('Life Expectancy vs Happiness Score by Continent (2018)', fontsize=14)
-    plt.legend(title='Continent')
-    plt.grid(True, alpha=0.3)
-    
-    output_path = os.path.join(output_dir, 'life_exp_happiness_scatter.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    print(f"Saved to: {output_path}")
-    plt.close()
+    create_grouped_scatter(
+        df, output_dir, 'life_expectancy', 'happiness_score',
+        'Life Expectancy (years)', 'Happiness Score',
+        'Life Expectancy vs Happiness Score by Continent', 'life_exp_happiness_scatter.png'
+    )
 
 def create_correlation_heatmap(df, output_dir):
     """Create correlation heatmap for numeric variables"""
@@ -79,38 +107,78 @@ def create_correlation_heatmap(df, output_dir):
     numeric_cols = ['happiness_score', 'gdp_per_capita', 'life_expectancy', 
                    'hdi', 'social_support', 'freedom', 'generosity']
     
-    correlation_matrix = df[numeric_cols].corr()
+    matrix = correlation_matrix(df, numeric_cols)
     
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0,
-                fmt='.2f', square=True, linewidths=1)
-    plt.title('Correlation Matrix: Happiness and Economic Indicators (2018)', fontsize=14)
-    plt.tight_layout()
+    # seaborn is only needed here, so it is imported on first use
+    import seaborn as sns
     
-    output_path = os.path.join(output_dir, 'correlation_heatmap.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    print(f"Saved to: {output_path}")
-    plt.close()
-
-def main():
-    """Main execution function"""
-    results_dir = 'results'
-    os.makedirs(results_dir, exist_ok=True)
+    fig = new_figure((10, 8))
+    ax = fig.add_subplot()
+    sns.heatmap(matrix, annot=True, cmap='coolwarm', center=0,
+                fmt='.2f', square=True, linewidths=1, ax=ax)
+    ax.set_title(f'Correlation Matrix: Happiness and Economic Indicators ({year_label(df)})', fontsize=14)
+    fig.tight_layout()
     
-    df = load_merged_data()
+    save_figure(fig, output_dir, 'correlation_heatmap.png')
+
+FIGURES = [
+    create_gdp_happiness_scatter,
+    create_life_exp_happiness_scatter,
+    create_correlation_heatmap
+]
+
+_worker_df = None
+
+def _init_render_worker(df):
+    """Keep the merged frame in the worker so tasks only carry a year"""
+    global _worker_df
+    _worker_df = df
+
+def _render_in_worker(create_figure, year, output_dir):
+    """Render one figure for one year from the worker's copy of the frame"""
+    create_figure(_worker_df[_worker_df['year'] == year], output_dir)
+
+@traced
+def render_figures(df, output_dirs, workers=1):
+    """Render every figure for every year, in parallel when ``workers`` > 1"""
+    if workers <= 1:
+        for year, year_df in df.groupby('year', sort=True):
+            for create_figure in FIGURES:
+                create_figure(year_df, output_dirs[year])
+        return
+    
+    tasks = [(create_figure, year, output_dirs[year])
+             for year in sorted(output_dirs) for create_figure in FIGURES]
+    print(f"\nRendering {len(tasks)} figures with {workers} worker processes...")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=process_pool_context(),
+                             initializer=_init_render_worker, initargs=(df,)) as pool:
+        futures = [pool.submit(_render_in_worker, *task) for task in tasks]
+        for future in futures:
+            future.result()
+
+def run_visualization(df, output_dir, workers=1):
+    """Render every figure for each year of the merged dataset"""
+    output_dirs = figure_output_dirs(df['year'].unique(), output_dir)
+    for year_dir in output_dirs.values():
+        os.makedirs(year_dir, exist_ok=True)
     
-    create_gdp_happiness_scatter(df, results_dir)
-    create_life_exp_happiness_scatter(df, results_dir)
-    create_correlation_heatmap(df, results_dir)
+    render_figures(df, output_dirs, workers)
     
     print("\n" + "="*60)
     print("VISUALIZATION COMPLETE")
     print("="*60)
-    print(f"\nAll visualizations saved to: {results_dir}/")
+    print(f"\nAll visualizations saved to: {', '.join(d + '/' for d in output_dirs.values())}")
     print("Files created:")
     print("  - gdp_happiness_scatter.png")
     print("  - life_exp_happiness_scatter.png")
     print("  - correlation_heatmap.png")
 
+def main():
+    """Main execution function"""
+    results_dir = 'results'
+    
+    df = load_merged_data()
+    run_visualization(df, results_dir)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file